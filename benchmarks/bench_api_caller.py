@@ -0,0 +1,120 @@
+"""
+OnebotAPI 调用者查找的性能测试
+对比改动前每次调用API都会执行的traceback.extract_stack()（调用三次）、inspect.stack()遍历（get_caller_plugin_data的做法）
+以及现在仅在开启debug日志时才执行的sys._getframe遍历（_get_caller_name）
+用法: python benchmarks/bench_api_caller.py
+"""
+import inspect
+import os
+import sys
+import tempfile
+import timeit
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+from murainbot.core import OnebotAPI, PluginManager  # noqa: E402
+
+DEPTHS = (15, 50)
+
+# 模拟一个插件：插件中的代码经过若干层调用后调用API
+_PLUGIN_SOURCE = '''
+def call(depth, lookup):
+    if depth <= 1:
+        return lookup()
+    return call(depth - 1, lookup)
+'''
+
+
+def _load_plugin():
+    """
+    在临时插件目录中创建插件文件并注册到found_plugins
+    Returns:
+        插件中的call函数, 插件文件路径
+    """
+    plugin_path = os.path.join(_paths.paths.PLUGINS_PATH, "BenchPlugin")
+    os.makedirs(plugin_path, exist_ok=True)
+    file_path = os.path.join(plugin_path, "__init__.py")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(_PLUGIN_SOURCE)
+    PluginManager.found_plugins.append(
+        {"name": "BenchPlugin", "plugin": None, "info": None, "file_path": file_path, "path": plugin_path}
+    )
+    PluginManager.get_plugin_data_by_file.cache_clear()
+    namespace = {}
+    exec(compile(_PLUGIN_SOURCE, file_path, "exec"), namespace)
+    return namespace["call"], file_path
+
+
+def by_extract_stack():
+    """
+    改动前OnebotAPI.get中的写法
+    """
+    if traceback.extract_stack()[-1].filename == traceback.extract_stack()[-2].filename:
+        return traceback.extract_stack()[-3].filename
+    else:
+        return traceback.extract_stack()[-2].filename
+
+
+def by_inspect_stack():
+    """
+    get_caller_plugin_data中的写法
+    """
+    for frame_info in inspect.stack()[1:]:
+        plugin = PluginManager.get_plugin_data_by_file(frame_info.filename)
+        if plugin is not None:
+            return plugin["name"]
+    return None
+
+
+def by_getframe():
+    """
+    现在OnebotAPI.get中的写法
+    """
+    return OnebotAPI._get_caller_name()
+
+
+LOOKUPS = {
+    "extract_stack x3": by_extract_stack,
+    "inspect.stack()": by_inspect_stack,
+    "sys._getframe": by_getframe,
+}
+
+
+def bench(func) -> float:
+    """
+    测量单次调用的耗时
+    Args:
+        func: 被测函数
+    Returns:
+        单次调用的耗时（微秒）
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    call, file_path = _load_plugin()
+    assert call(15, by_extract_stack) == file_path
+    assert call(15, by_inspect_stack) == call(15, by_getframe) == "BenchPlugin"
+
+    print(f"{'frames':<8}" + "".join(f"{name:>20}" for name in LOOKUPS))
+    for depth in DEPTHS:
+        print(f"{depth:<8}" + "".join(
+            f"{bench(lambda: call(depth, lookup)):>17.1f} us" for lookup in LOOKUPS.values()
+        ))
+    print(f"{'(none)':<8}" + f"{bench(lambda: call(DEPTHS[0], lambda: None)):>17.1f} us  (仅递归本身)")
+
+
+if __name__ == "__main__":
+    main()
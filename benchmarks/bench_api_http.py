@@ -0,0 +1,87 @@
+"""
+OnebotAPI HTTP调用的性能测试
+在本地启动testing.py中的虚拟onebot实现端，对比改动前每次调用都新建连接的requests.post、复用连接池的session.post以及现在的OnebotAPI.get
+用法: python benchmarks/bench_api_http.py
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+import requests  # noqa: E402
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+
+import testing  # noqa: E402
+from murainbot.core import OnebotAPI, ThreadPool  # noqa: E402
+
+
+def start_server() -> int:
+    """
+    在后台线程中启动虚拟onebot实现端
+    Returns:
+        监听的端口
+    """
+    logging.getLogger("werkzeug").disabled = True
+    # onebot实现端一般支持keep-alive
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    server = make_server("127.0.0.1", 0, testing.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port
+
+
+def bench(func) -> float:
+    """
+    测量单次调用的耗时
+    Args:
+        func: 被测函数
+    Returns:
+        单次调用的耗时（微秒）
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    ThreadPool.init()
+    port = start_server()
+    url = f"http://127.0.0.1:{port}/get_version_info"
+    api = OnebotAPI.OnebotAPI(host="127.0.0.1", port=port)
+
+    def by_requests_post():
+        # 改动前OnebotAPI.get中的写法
+        return requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps({})).json()["data"]
+
+    def by_session_post():
+        return api.session.post(url, headers={"Content-Type": "application/json"}, data=b"{}").json()["data"]
+
+    def by_onebot_api():
+        return api.get("/get_version_info")
+
+    assert by_requests_post() == by_session_post() == by_onebot_api()
+
+    for name, func in {
+        "requests.post": by_requests_post,
+        "session.post": by_session_post,
+        "OnebotAPI.get": by_onebot_api,
+    }.items():
+        print(f"{name:<24}{bench(func):>10.0f} us/call")
+    api.close()
+
+
+if __name__ == "__main__":
+    main()
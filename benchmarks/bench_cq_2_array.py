@@ -0,0 +1,67 @@
+"""
+cq_2_array 的性能测试
+对比逐字符解析（_cq_2_array_by_char）、按块扫描（_cq_2_array_fast）以及实际使用的cq_2_array（编译了C扩展时使用C扩展）
+用法: python benchmarks/bench_cq_2_array.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+from murainbot.utils import QQRichText  # noqa: E402
+
+CASES = {
+    "chat message": "[CQ:reply,id=123456][CQ:at,qq=10001] 你好啊[CQ:face,id=178]今天吃什么",
+    "command": "/help",
+    "4 KB text": QQRichText.cq_encode("这是一段很长的聊天消息，包含[方括号]和&符号。" * 150)[:4096],
+    "20 images": "".join(
+        f"[CQ:image,file=https://example.com/img/{i}.png,"
+        f"url=https://multimedia.nt.qq.com.cn/download?appid=1407&amp;fileid={i:064x}&amp;rkey=abc]看看"
+        for i in range(20)
+    ),
+    "json card": '[CQ:json,data={"app":"com.tencent.miniapp"&#44;"desc":""&#44;"view":"notification"'
+                 '&#44;"ver":"1.0.0.11"}]',
+}
+
+PARSERS = {
+    "by char": QQRichText._cq_2_array_by_char,
+    "fast": QQRichText._cq_2_array_fast,
+    "cq_2_array" + (" (C)" if QQRichText._cqcode is not None else ""): QQRichText.cq_2_array,
+}
+
+
+def bench(func, cq: str) -> float:
+    """
+    测量单次调用的耗时
+    Args:
+        func: 解析函数
+        cq: CQ码字符串
+    Returns:
+        单次调用的耗时（微秒）
+    """
+    timer = timeit.Timer(lambda: func(cq))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    print(f"{'case':<14}{'chars':>7}" + "".join(f"{name:>20}" for name in PARSERS))
+    for case, cq in CASES.items():
+        expected = QQRichText._cq_2_array_by_char(cq)
+        assert all(parser(cq) == expected for parser in PARSERS.values()), case
+        print(f"{case:<14}{len(cq):>7}" + "".join(f"{bench(parser, cq):>17.1f} us" for parser in PARSERS.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Event.call 的性能测试
+测量事件有1、10、100个事件处理器时单次Event.call的耗时，以及注册了一个Hook事件处理器（不拦截）时的耗时
+在改动前后的提交上分别运行即可对比
+用法: python benchmarks/bench_event_call.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+from murainbot.core import EventManager  # noqa: E402
+
+LISTENER_COUNTS = (1, 10, 100)
+
+
+def make_event(count: int) -> EventManager.Event:
+    """
+    创建一个有count个空事件处理器（优先级各不相同）的事件
+    """
+    event_class = type(f"BenchEvent{count}", (EventManager.Event,), {})
+    for i in range(count):
+        EventManager.event_listener(event_class, priority=i % 7)(lambda event: None)
+    return event_class()
+
+
+def bench(func) -> float:
+    """
+    测量单次调用的耗时
+    Args:
+        func: 被测函数
+    Returns:
+        单次调用的耗时（微秒）
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def on_hook(event):
+    return False
+
+
+def main():
+    events = {count: make_event(count) for count in LISTENER_COUNTS}
+    results = {count: [bench(event.call)] for count, event in events.items()}
+
+    EventManager.event_listener(EventManager.Hook)(on_hook)
+    for count, event in events.items():
+        results[count].append(bench(event.call))
+    EventManager.unregister_listener(EventManager.Hook, on_hook)
+
+    print(f"{'listeners':<12}{'no Hook':>14}{'with Hook':>14}")
+    for count, (without_hook, with_hook) in results.items():
+        print(f"{count:<12}{without_hook:>11.2f} us{with_hook:>11.2f} us")
+
+
+if __name__ == "__main__":
+    main()
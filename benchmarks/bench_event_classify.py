@@ -0,0 +1,91 @@
+"""
+事件分类的性能测试
+对比改动前on_escalation中逐个比较已注册事件类型的线性扫描与现在的分类索引（get_event_classes），
+并测量插件额外注册200个事件类型后的耗时
+用法: python benchmarks/bench_event_classify.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+from murainbot.utils import EventClassifier  # noqa: E402
+
+CASES = {
+    "group message": {"post_type": "message", "message_type": "group", "sub_type": "normal", "group_id": 1},
+    "heartbeat": {"post_type": "meta_event", "meta_event_type": "heartbeat"},
+    "honor notice": {"post_type": "notice", "notice_type": "notify", "sub_type": "honor", "honor_type": "emotion"},
+}
+
+EXTRA_EVENTS = 200
+
+
+def linear_scan(event_data: dict) -> list:
+    """
+    改动前on_escalation中的写法
+    """
+    return [
+        event_cls_data['cls'] for event_cls_data in EventClassifier.events
+        if (
+                event_data["post_type"] == event_cls_data['post_type'] and
+                all(k in event_data and event_data[k] == v for k, v in event_cls_data['rules'].items())
+        )
+    ]
+
+
+CLASSIFIERS = {
+    "linear scan": linear_scan,
+    "get_event_classes": EventClassifier.get_event_classes,
+}
+
+
+def register_extra_events(count: int):
+    """
+    模拟插件注册的事件类型
+    """
+    for i in range(count):
+        event_class = type(f"BenchNoticeEvent{i}", (EventClassifier.NoticeEvent,), {})
+        EventClassifier.register_event("notice", notice_type=f"bench_{i}", sub_type="bench")(event_class)
+
+
+def bench(func, event_data: dict) -> float:
+    """
+    测量单次调用的耗时
+    Args:
+        func: 分类函数
+        event_data: 事件数据
+    Returns:
+        单次调用的耗时（微秒）
+    """
+    timer = timeit.Timer(lambda: func(event_data))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def run():
+    print(f"{len(EventClassifier.events)} event classes")
+    for case, event_data in CASES.items():
+        assert all(func(event_data) == linear_scan(event_data) for func in CLASSIFIERS.values()), case
+        print(f"{case:<16}" + "".join(f"{bench(func, event_data):>17.2f} us" for func in CLASSIFIERS.values()))
+
+
+def main():
+    print(f"{'case':<16}" + "".join(f"{name:>20}" for name in CLASSIFIERS))
+    run()
+    register_extra_events(EXTRA_EVENTS)
+    run()
+
+
+if __name__ == "__main__":
+    main()
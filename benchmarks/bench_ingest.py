@@ -0,0 +1,226 @@
+"""
+上报接收的吞吐量测试
+每种服务器在单独的子进程中启动（ListenerServer在导入时根据配置选择服务器），由当前进程模拟Onebot实现端发送上报，
+统计从开始发送到全部上报都触发EscalationEvent的耗时
+用法: python benchmarks/bench_ingest.py [上报数]
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+HEARTBEAT = {"time": 0, "self_id": 1, "post_type": "meta_event", "meta_event_type": "heartbeat",
+             "status": {}, "interval": 5000}
+GROUP_MESSAGE = {"time": 0, "self_id": 1, "post_type": "message", "message_type": "group", "sub_type": "normal",
+                 "message_id": 1, "group_id": 1234567890, "user_id": 11111111, "anonymous": None,
+                 "message": "hello", "raw_message": "hello", "font": 0,
+                 "sender": {"user_id": 11111111, "nickname": "测试用户", "card": "测试群昵称", "sex": "unknown",
+                            "age": 0, "area": "", "role": "member", "level": 0, "title": "测试头衔"}}
+
+SENDERS = 8
+
+
+def post_client(port: int, body: bytes, count: int):
+    """
+    模拟HTTP POST上报：少量发送线程，每个上报单独建立连接
+    """
+    import requests
+
+    def post(_):
+        # 每个请求都新建连接，偶尔会有连接在收到响应前被断开，此时重新发送
+        for _ in range(3):
+            try:
+                requests.post(f"http://127.0.0.1:{port}/", data=body, headers={"Content-Type": "application/json"})
+                return
+            except requests.ConnectionError:
+                continue
+
+    with ThreadPoolExecutor(SENDERS) as executor:
+        list(executor.map(post, range(count)))
+
+
+def websocket_client(port: int, body: bytes, count: int):
+    """
+    模拟反向WebSocket上报：一条连接持续推送
+    """
+    from websockets.sync.client import connect
+
+    with connect(f"ws://127.0.0.1:{port}/", additional_headers={"X-Self-ID": "1", "X-Client-Role": "Universal"}) as ws:
+        for _ in range(count):
+            ws.send(body)
+
+
+def socket_client(port: int, body: bytes, count: int, keep_alive: bool):
+    """
+    模拟HTTP POST上报：SENDERS条连接，每条连接依次发送上报，keep_alive为False或服务器要求关闭时每个上报重新建立连接
+    """
+    request = (f"POST / HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+               ).encode("ascii") + body
+
+    def send(number: int):
+        connection = None
+        for _ in range(number):
+            # 连接在收到响应前被断开时重新建立连接并重新发送
+            for _ in range(3):
+                if connection is None:
+                    connection = socket.create_connection(("127.0.0.1", port))
+                head = b""
+                try:
+                    connection.sendall(request)
+                    while b"\r\n\r\n" not in head:
+                        chunk = connection.recv(4096)
+                        if not chunk:
+                            break
+                        head += chunk
+                except ConnectionError:
+                    pass
+                if b"\r\n\r\n" in head:
+                    break
+                connection.close()
+                connection = None
+            assert head.split(b"\r\n", 1)[0].split(b" ")[1] == b"204", head[:80]
+            if not keep_alive or b"connection: close" in head.lower():
+                connection.close()
+                connection = None
+        if connection is not None:
+            connection.close()
+
+    threads = [threading.Thread(target=send, args=(count // SENDERS + (i < count % SENDERS),)) for i in range(SENDERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+CLIENTS = {
+    "post": post_client,
+    "keep-alive": lambda port, body, count: socket_client(port, body, count, True),
+    "close": lambda port, body, count: socket_client(port, body, count, False),
+    "websocket": websocket_client,
+}
+
+# (服务器, 客户端, 上报)
+CASES = [
+    ("werkzeug", "post", HEARTBEAT),
+    ("waitress", "post", HEARTBEAT),
+    ("websocket", "websocket", HEARTBEAT),
+    ("werkzeug", "keep-alive", GROUP_MESSAGE),
+    ("waitress", "keep-alive", GROUP_MESSAGE),
+    ("asyncio", "keep-alive", GROUP_MESSAGE),
+    ("asyncio", "close", GROUP_MESSAGE),
+]
+
+
+def serve(server: str, port: int, count: int):
+    """
+    子进程：启动服务器，收到count个上报后输出收到的上报数
+    """
+    import logging
+
+    from murainbot import paths as _paths
+
+    _paths.init_paths(_work_path)
+    _paths.paths.ensure_all_dirs_exist()
+
+    from murainbot.core.ConfigManager import GlobalConfig
+
+    config = GlobalConfig()
+    config.config["server"].update(server=server, host="127.0.0.1", port=port, max_works=SENDERS)
+    # 队列容量足够容纳所有上报，避免上报被丢弃导致计数无法达到count
+    config.config["ingest_queue"]["capacity"] = max(count, 2000)
+    config.init()
+
+    from murainbot.core import EventManager, ThreadPool
+
+    ThreadPool.init()
+
+    from murainbot.core import ListenerServer
+
+    logging.getLogger("werkzeug").disabled = True
+    logging.getLogger("websockets").disabled = True
+
+    done = threading.Event()
+    lock = threading.Lock()
+    received = 0
+
+    @EventManager.event_listener(ListenerServer.EscalationEvent)
+    def on_escalation(event):
+        nonlocal received
+        with lock:
+            received += 1
+            if received == count:
+                done.set()
+
+    threading.Thread(target=ListenerServer.start_server, daemon=True).start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    print("ready", flush=True)
+    done.wait(120)
+    print(f"received {received}", flush=True)
+    # 继续运行直到被结束，避免客户端仍在发送时服务器已退出
+    threading.Event().wait()
+
+
+def _read_line(process: subprocess.Popen, prefix: str) -> str:
+    """
+    读取子进程以prefix开头的输出行（跳过日志）
+    """
+    for line in process.stdout:
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    raise RuntimeError(f"子进程已退出，未输出 {prefix!r}")
+
+
+def run_case(server: str, client: str, event: dict, count: int) -> float:
+    """
+    运行一组测试
+    Returns:
+        每秒处理的上报数
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", server, str(port), str(count)],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        _read_line(process, "ready")
+        start = time.perf_counter()
+        CLIENTS[client](port, json.dumps(event).encode("utf-8"), count)
+        received = int(_read_line(process, "received "))
+        elapsed = time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+    assert received == count, f"{server}: {received}/{count}"
+    return count / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'server':<12}{'client':<12}{'event':<12}{'events/s':>10}")
+    for server, client, event in CASES:
+        rate = run_case(server, client, event, count)
+        print(f"{server:<12}{client:<12}{event['post_type']:<12}{rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,56 @@
+"""
+QQRichText 的内存占用测试
+使用tracemalloc测量缓存10000条由5个消息段（回复、at、文本、表情、图片）组成的消息时，平均每条消息占用的内存
+在改动前后的提交上分别运行即可对比
+用法: python benchmarks/bench_rich_text_memory.py
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时工作目录中运行，避免在仓库中创建配置文件和日志
+_work_path = tempfile.mkdtemp(prefix="murainbot-bench-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+from murainbot.utils import QQRichText  # noqa: E402
+
+MESSAGE_COUNT = 10000
+
+
+def make_message(i: int) -> list[dict]:
+    """
+    生成第i条消息的消息段数组
+    """
+    return [
+        {"type": "reply", "data": {"id": str(100000 + i)}},
+        {"type": "at", "data": {"qq": str(12345678 + i)}},
+        {"type": "text", "data": {"text": f" 第{i}条消息，今天吃什么？"}},
+        {"type": "face", "data": {"id": "14"}},
+        {"type": "image", "data": {"file": f"https://example.com/{i}.png"}},
+    ]
+
+
+def main():
+    arrays = [make_message(i) for i in range(MESSAGE_COUNT)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    cache = [QQRichText.QQRichText(array) for array in arrays]
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert cache[0].get_array() == arrays[0]
+    print(f"{(after - before) / len(cache):.0f} bytes per cached message ({len(cache)} messages, 5 segments each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,16 +12,33 @@ api:  # Api设置(Onebot HTTP通信)
   host: '127.0.0.1'
   port: 5700
   access_token: ""  # HTTP的Access Token，为空则不使用（详见https://github.com/botuniverse/onebot-11/blob/master/communication/authorization.md#http-%E5%92%8C%E6%AD%A3%E5%90%91-websocket）
+  pool_size: 10  # HTTP连接池大小（同时保持的最大连接数，并发调用API较多时可适当调大）
+  connect_timeout: 5  # 连接超时时间（秒）
+  read_timeout: 60  # 读取超时时间（秒）
+  keep_alive: true  # 是否复用连接（keep-alive），关闭后每次调用API都会重新建立连接
+  transport: 'http'  # 调用API使用的通信方式（http或ws，ws为正向WebSocket，所有调用复用同一条连接，此时port需填写正向WebSocket的端口，使用ws需先pip install websockets）
 
 server:  # 监听服务器设置（Onebot HTTP POST通信）
   host: '127.0.0.1'
   port: 5701
-  server: 'werkzeug'  # 使用的服务器（werkzeug或waitress，使用waitress需先pip install waitress）
+  server: 'werkzeug'  # 使用的服务器（werkzeug、waitress、asyncio或websocket，使用waitress需先pip install waitress；asyncio为内置的轻量HTTP服务器，收到上报后直接交给线程池处理；websocket为反向WebSocket，由Onebot实现端主动连接ws://host:port/并持续推送事件，鉴权使用api.access_token，使用前需先pip install websockets）
   max_works: 4  # 最大工作线程数
+  max_pending: 100  # 反向WebSocket单个连接同时处理中的最大事件数，超出后暂停读取新事件（背压）
+  max_body_size: 10485760  # 单个上报的最大字节数，超出的上报会被拒绝（仅asyncio与websocket服务器生效）
+  max_connections: 100  # 最大同时连接数，超出时返回503（仅asyncio服务器生效）
   secret: ""  # 上报数据签名密钥（详见https://github.com/botuniverse/onebot-11/blob/master/communication/http-post.md#%E7%AD%BE%E5%90%8D）
 
+ingest_queue:  # 上报队列设置（位于收到上报与事件处理之间，防止上报过多时内存无限增长）
+  enable: true  # 是否启用上报队列
+  capacity: 2000  # 队列容量（排队中的最大上报数）
+  overflow_policy: 'drop_oldest'  # 队列满时的处理策略（drop_oldest：丢弃最早的消息；drop_by_group：丢弃排队消息最多的群/私聊中最早的消息；reject：拒绝新的上报，HTTP上报返回503），元事件、通知与请求事件优先处理且不会因消息过多而被丢弃
+
+json:  # JSON序列化设置
+  backend: 'auto'  # 使用的JSON库（auto、orjson、ujson或json，auto会依次尝试orjson、ujson，都未安装则使用标准库json）
+
 thread_pool:  # 线程池相关
   max_workers: 10  # 线程池最大线程数
+  ordered_dispatch: false  # 是否按会话顺序处理上报（同一个群/私聊的事件按收到的顺序依次处理，不同会话之间仍并行处理）
 
 qq_data_cache:  # QQ数据缓存设置
   enable: true  # 是否启用缓存（非常不推荐关闭缓存，对于对于需要无缓存的场景，推荐在插件内自行调用api来获取而非关闭此配置项）
@@ -37,4 +54,8 @@ auto_restart_onebot:  # 在Onebot实现端状态异常时自动重启Onebot实
 
 command:  # 命令相关
   command_start: ["/"]  # 命令起始符
+  suggestion_rate: 5  # 每秒最多计算几次"你的意思是"相似命令建议（超出时不再给出建议，避免刷屏的错误命令占用大量CPU），0为不限制
+
+event:  # 事件分发设置
+  mro_dispatch: false  # 是否按继承关系分发事件（开启后一个上报只创建一个事件对象（存在多个互不继承的事件类型时每个类型一个），该对象会同时触发其所有父类事件的监听器，父类事件的监听器收到的将是子类事件对象）
 """
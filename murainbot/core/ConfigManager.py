@@ -119,6 +119,11 @@ class GlobalConfig(ConfigManager):
         host: str
         port: int
         access_token: str
+        pool_size: int
+        connect_timeout: float
+        read_timeout: float
+        keep_alive: bool
+        transport: str
 
     @dataclasses.dataclass
     class Server:
@@ -129,14 +134,34 @@ class GlobalConfig(ConfigManager):
         port: int
         server: str
         max_works: int
+        max_pending: int
+        max_body_size: int
+        max_connections: int
         secret: str
 
+    @dataclasses.dataclass
+    class IngestQueue:
+        """
+        上报队列设置
+        """
+        enable: bool
+        capacity: int
+        overflow_policy: str
+
+    @dataclasses.dataclass
+    class Json:
+        """
+        JSON序列化设置
+        """
+        backend: str
+
     @dataclasses.dataclass
     class ThreadPool:
         """
         线程池相关
         """
         max_workers: int
+        ordered_dispatch: bool
 
     @dataclasses.dataclass
     class QQDataCache:
@@ -168,6 +193,14 @@ class GlobalConfig(ConfigManager):
         命令相关
         """
         command_start: list[str]
+        suggestion_rate: float
+
+    @dataclasses.dataclass
+    class Event:
+        """
+        事件分发设置
+        """
+        mro_dispatch: bool
 
     def __new__(cls):
         if not cls._instance:
@@ -178,11 +211,14 @@ class GlobalConfig(ConfigManager):
         self.account: GlobalConfig.Account = None
         self.api: GlobalConfig.Api = None
         self.server: GlobalConfig.Server = None
+        self.ingest_queue: GlobalConfig.IngestQueue = None
+        self.json: GlobalConfig.Json = None
         self.thread_pool: GlobalConfig.ThreadPool = None
         self.qq_data_cache: GlobalConfig.QQDataCache = None
         self.debug: GlobalConfig.Debug = None
         self.auto_restart_onebot: GlobalConfig.AutoRestartOnebot = None
         self.command: GlobalConfig.Command = None
+        self.event: GlobalConfig.Event = None
         if not self._init_flag:
             self._init_flag = True
             super().__init__(paths.CONFIG_PATH, DEFAULT_CONFIG)
@@ -199,17 +235,34 @@ class GlobalConfig(ConfigManager):
         self.api = self.Api(
             host=self.get("api", {}).get("host", ""),
             port=self.get("api", {}).get("port", 5700),
-            access_token=self.get("api", {}).get("access_token", "")
+            access_token=self.get("api", {}).get("access_token", ""),
+            pool_size=self.get("api", {}).get("pool_size", 10),
+            connect_timeout=self.get("api", {}).get("connect_timeout", 5),
+            read_timeout=self.get("api", {}).get("read_timeout", 60),
+            keep_alive=self.get("api", {}).get("keep_alive", True),
+            transport=self.get("api", {}).get("transport", "http").lower()
         )
         self.server = self.Server(
             host=self.get("server", {}).get("host", ""),
             port=self.get("server", {}).get("port", 5701),
             server=self.get("server", {}).get("server", "werkzeug").lower(),
             max_works=self.get("server", {}).get("max_works", 4),
+            max_pending=self.get("server", {}).get("max_pending", 100),
+            max_body_size=self.get("server", {}).get("max_body_size", 10485760),
+            max_connections=self.get("server", {}).get("max_connections", 100),
             secret=self.get("server", {}).get("secret", "")
         )
+        self.ingest_queue = self.IngestQueue(
+            enable=self.get("ingest_queue", {}).get("enable", True),
+            capacity=self.get("ingest_queue", {}).get("capacity", 2000),
+            overflow_policy=self.get("ingest_queue", {}).get("overflow_policy", "drop_oldest").lower()
+        )
+        self.json = self.Json(
+            backend=self.get("json", {}).get("backend", "auto").lower()
+        )
         self.thread_pool = self.ThreadPool(
-            max_workers=self.get("thread_pool", {}).get("max_workers", 10)
+            max_workers=self.get("thread_pool", {}).get("max_workers", 10),
+            ordered_dispatch=self.get("thread_pool", {}).get("ordered_dispatch", False)
         )
         self.qq_data_cache = self.QQDataCache(
             enable=self.get("qq_data_cache", {}).get("enable", True),
@@ -224,7 +277,11 @@ class GlobalConfig(ConfigManager):
             enable=self.get("auto_restart_onebot", {}).get("enable", True)
         )
         self.command = self.Command(
-            command_start=self.get("command", {}).get("command_start", ["/"])
+            command_start=self.get("command", {}).get("command_start", ["/"]),
+            suggestion_rate=self.get("command", {}).get("suggestion_rate", 5)
+        )
+        self.event = self.Event(
+            mro_dispatch=self.get("event", {}).get("mro_dispatch", False)
         )
 
 
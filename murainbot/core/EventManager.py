@@ -36,11 +36,9 @@ class Hook(_Event):
         """
         按优先级顺序同步触发所有监听器
         """
-        with _event_lock:
-            if self.__class__ not in event_listeners:
-                return None
-
-            listeners_list = sorted(event_listeners[self.__class__], key=lambda i: i.priority, reverse=True)
+        listeners_list = _listener_snapshots.get(self.__class__)
+        if listeners_list is None:
+            return None
 
         for listener in listeners_list:
             try:
@@ -73,6 +71,48 @@ class EventListener:
 
 # 定义监听器的类型和存储
 event_listeners: dict[type[T], list[EventListener]] = {}
+# 按优先级排好序的只读监听器快照，仅在注册/注销监听器时重建（写时复制），触发事件时无需加锁与排序
+_listener_snapshots: dict[type[T], tuple[EventListener, ...]] = {}
+# 按继承关系合并后的监听器表，键为(事件类型, 排除的类型)，注册/注销监听器时清空
+_mro_snapshots: dict[tuple[type[T], frozenset[type]], tuple[EventListener, ...]] = {}
+
+
+def _rebuild_snapshot(event_class: type[T]):
+    """
+    重建事件类型的监听器快照（需持有_event_lock）
+    Args:
+        event_class: 事件类型
+    """
+    listeners_list = event_listeners.get(event_class)
+    if listeners_list:
+        _listener_snapshots[event_class] = tuple(sorted(listeners_list, key=lambda i: i.priority, reverse=True))
+    else:
+        _listener_snapshots.pop(event_class, None)
+    _mro_snapshots.clear()
+
+
+def _get_mro_listeners(event_class: type[T], exclude: frozenset[type]) -> tuple[EventListener, ...]:
+    """
+    获取事件类型及其所有父类（Event的子类）的监听器，父类的监听器在前，同一类型内按优先级排序
+    Args:
+        event_class: 事件类型
+        exclude: 要排除的类型
+    Returns:
+        监听器
+    """
+    key = (event_class, exclude)
+    listeners_list = _mro_snapshots.get(key)
+    if listeners_list is None:
+        # 在锁内计算，避免计算期间有监听器注册导致缓存了过期的结果
+        with _event_lock:
+            listeners_list = tuple(
+                listener
+                for cls in reversed(event_class.__mro__)
+                if cls not in exclude and issubclass(cls, Event) and cls is not Event
+                for listener in _listener_snapshots.get(cls, ())
+            )
+            _mro_snapshots[key] = listeners_list
+    return listeners_list
 
 
 # 装饰器，用于注册监听器
@@ -93,6 +133,7 @@ def event_listener(event_class: type[T], priority: int = 0, **kwargs):
         listener = EventListener(priority=priority, func=func, kwargs=kwargs)
         with _event_lock:
             event_listeners.setdefault(event_class, []).append(listener)
+            _rebuild_snapshot(event_class)
         return func
 
     return wrapper
@@ -130,6 +171,8 @@ def unregister_listener(event_class: type[T], func: Callable[[T, ...], Any]):
         if not listeners_list:
             del event_listeners[event_class]
 
+        _rebuild_snapshot(event_class)
+
 
 class Event(_Event):
     """
@@ -143,15 +186,37 @@ class Event(_Event):
         """
         按优先级顺序同步触发所有监听器
         """
-        with _event_lock:
-            if self.__class__ not in event_listeners:
-                return None
+        listeners_list = _listener_snapshots.get(self.__class__)
+        if listeners_list is None:
+            return None
+
+        return self._call_listeners(listeners_list)
+
+    def call_mro(self, exclude: frozenset[type] = frozenset()) -> list[tuple[EventListener, Any]] | None:
+        """
+        同步触发此事件类型及其所有父类的监听器（父类的监听器先触发，同一类型内按优先级顺序）
+        用于让一个事件对象同时代表继承链上的所有事件类型，而不必为每个类型都创建一个事件对象
+        Args:
+            exclude: 不触发这些类型的监听器（例如已经由另一个事件对象触发过的父类）
+        """
+        listeners_list = _get_mro_listeners(self.__class__, exclude)
+        if not listeners_list:
+            return None
 
-            listeners_list = sorted(event_listeners[self.__class__], key=lambda i: i.priority, reverse=True)
+        return self._call_listeners(listeners_list)
+
+    def _call_listeners(self, listeners_list: tuple[EventListener, ...]) -> list[tuple[EventListener, Any]]:
+        """
+        依次触发监听器
+        Args:
+            listeners_list: 监听器
+        """
+        # 没有注册Hook监听器（且子类未重写_call_hook）时跳过Hook，避免为每个监听器都创建并触发一次Hook事件
+        check_hook = Hook in _listener_snapshots or type(self)._call_hook is not Event._call_hook
 
         results = []
         for listener in listeners_list:
-            if self._call_hook(listener):
+            if check_hook and self._call_hook(listener):
                 logger.debug(f"由 Hook 跳过监听器: {listener.func.__name__}")
                 continue
             try:
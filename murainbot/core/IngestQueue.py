@@ -0,0 +1,259 @@
+"""
+上报队列
+位于收到上报与事件处理之间的有界队列，上报过多时按策略丢弃，避免内存无限增长
+元事件、通知与请求事件优先处理，不会因为大量消息而被饿死
+"""
+
+import collections
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+from .ConfigManager import GlobalConfig
+from ..common import exc_logger
+from ..utils import Logger
+
+logger = Logger.get_logger()
+
+OVERFLOW_POLICIES = ["drop_oldest", "drop_by_group", "reject"]
+
+# 低优先级的上报类型，其余上报均为高优先级
+LOW_PRIORITY_POST_TYPES = ("message", "message_sent")
+
+
+def get_conversation_key(data: dict):
+    """
+    获取上报所属的会话
+    Args:
+        data: 上报的数据
+    Returns:
+        ("group", group_id) 或 ("private", user_id)，不属于任何会话（例如元事件）时为None
+    """
+    group_id = data.get("group_id")
+    if group_id is not None:
+        return "group", group_id
+    user_id = data.get("user_id")
+    if user_id is not None:
+        return "private", user_id
+    return None
+
+
+class IngestQueue:
+    """
+    有界上报队列
+    由一个分发线程从队列中取出上报并交给dispatch处理，同时处理中的上报数不超过max_workers，
+    多出的上报留在队列中，而不是堆积在线程池的无界队列里
+    ordered为真时，同一会话同时最多只有一个上报在处理，分发线程会跳过正在处理中的会话，
+    这样某个会话刷屏时也不会占满所有处理名额
+    """
+
+    def __init__(self, dispatch: Callable[[dict], Future | None], capacity: int = None,
+                 overflow_policy: str = None, max_workers: int = None, ordered: bool = None):
+        """
+        Args:
+            dispatch: 处理上报的函数，返回Future时会在其完成后才释放处理名额
+            capacity: 队列容量，默认使用配置
+            overflow_policy: 队列满时的处理策略，默认使用配置
+            max_workers: 同时处理的最大上报数，默认为线程池的最大线程数
+            ordered: 是否按会话顺序分发，默认使用配置
+        """
+        config = GlobalConfig()
+        if capacity is None:
+            capacity = config.ingest_queue.capacity
+        if overflow_policy is None:
+            overflow_policy = config.ingest_queue.overflow_policy
+        if max_workers is None:
+            max_workers = config.thread_pool.max_workers
+        if ordered is None:
+            ordered = config.thread_pool.ordered_dispatch
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的上报队列溢出策略: {overflow_policy}")
+
+        self.dispatch = dispatch
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        self.ordered = ordered
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._high: collections.deque[tuple[dict, Future, Any]] = collections.deque()
+        self._low: collections.deque[tuple[dict, Future, Any]] = collections.deque()
+        self._group_counts: collections.Counter = collections.Counter()
+        self._busy_keys: set = set()
+        self._slots = threading.Semaphore(max_workers)
+        self._dispatcher: threading.Thread | None = None
+
+        self.dropped = 0
+        self.rejected = 0
+        self.dispatched = 0
+
+    def __len__(self):
+        return len(self._high) + len(self._low)
+
+    @staticmethod
+    def _is_high_priority(data: dict) -> bool:
+        return data.get("post_type") not in LOW_PRIORITY_POST_TYPES
+
+    def _forget_group(self, key):
+        """
+        低优先级上报出队后更新各会话的排队数（需持有锁）
+        """
+        self._group_counts[key] -= 1
+        if self._group_counts[key] <= 0:
+            del self._group_counts[key]
+
+    def _drop(self, item: tuple[dict, Future, Any]):
+        """
+        丢弃一个排队中的上报（需持有锁）
+        """
+        data, future, key = item
+        if not self._is_high_priority(data):
+            self._forget_group(key)
+        future.cancel()
+        self.dropped += 1
+        if self.dropped % 100 == 1:
+            logger.warning(f"上报队列已满，已丢弃 {self.dropped} 条上报，当前策略: {self.overflow_policy}")
+
+    def _make_room(self, high_priority: bool) -> bool:
+        """
+        队列已满时按策略腾出一个位置（需持有锁）
+        Args:
+            high_priority: 新上报是否为高优先级
+        Returns:
+            是否成功腾出位置
+        """
+        if self._low:
+            if self.overflow_policy == "reject" and not high_priority:
+                return False
+            if self.overflow_policy == "drop_by_group":
+                key = self._group_counts.most_common(1)[0][0]
+                for index, item in enumerate(self._low):
+                    if item[2] == key:
+                        del self._low[index]
+                        self._drop(item)
+                        return True
+            self._drop(self._low.popleft())
+            return True
+        # 队列中全是高优先级的上报，只为新的高优先级上报腾位置
+        if high_priority and self.overflow_policy != "reject":
+            self._drop(self._high.popleft())
+            return True
+        return False
+
+    def put(self, data: dict) -> Future:
+        """
+        放入一个上报
+        Args:
+            data: 上报的数据
+        Returns:
+            Future，上报处理完成后完成，若上报被丢弃则被取消
+        Raises:
+            queue.Full: 队列已满且无法腾出位置（例如策略为reject）
+        """
+        future = Future()
+        high_priority = self._is_high_priority(data)
+        key = get_conversation_key(data)
+        with self._lock:
+            if len(self) >= self.capacity and not self._make_room(high_priority):
+                self.rejected += 1
+                if self.rejected % 100 == 1:
+                    logger.warning(f"上报队列已满，已拒绝 {self.rejected} 条上报")
+                raise queue.Full
+            if high_priority:
+                self._high.append((data, future, key))
+            else:
+                self._low.append((data, future, key))
+                self._group_counts[key] += 1
+            self._not_empty.notify()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, daemon=True, name="IngestQueue")
+                self._dispatcher.start()
+        return future
+
+    def _release(self, future: Future, key):
+        if self.ordered and key is not None:
+            with self._not_empty:
+                self._busy_keys.discard(key)
+                self._not_empty.notify()
+        self._slots.release()
+        if not future.done():
+            future.set_result(None)
+
+    def _find_ready(self, dq: collections.deque) -> int | None:
+        """
+        查找队列中第一个可以分发的上报（需持有锁）
+        Returns:
+            下标，没有可以分发的上报时为None
+        """
+        if not self.ordered:
+            return 0 if dq else None
+        for index, (_, _, key) in enumerate(dq):
+            if key is None or key not in self._busy_keys:
+                return index
+        return None
+
+    def _pop_ready(self) -> tuple[dict, Future, Any] | None:
+        """
+        取出下一个可以分发的上报，高优先级的上报优先（需持有锁）
+        Returns:
+            上报，没有可以分发的上报时为None
+        """
+        for dq in (self._high, self._low):
+            index = self._find_ready(dq)
+            if index is None:
+                continue
+            item = dq[index]
+            del dq[index]
+            key = item[2]
+            if dq is self._low:
+                self._forget_group(key)
+            if self.ordered and key is not None:
+                self._busy_keys.add(key)
+            return item
+        return None
+
+    def _run(self):
+        """
+        分发线程
+        """
+        while True:
+            self._slots.acquire()
+            with self._not_empty:
+                while (item := self._pop_ready()) is None:
+                    self._not_empty.wait()
+            data, future, key = item
+            if not future.set_running_or_notify_cancel():
+                # 排队期间已被调用方取消，不再分发
+                self._release(future, key)
+                continue
+            try:
+                result = self.dispatch(data)
+            except Exception as e:
+                exc_logger(e, "分发上报时出现异常")
+                result = None
+            else:
+                self.dispatched += 1
+            if isinstance(result, Future):
+                result.add_done_callback(lambda _, future=future, key=key: self._release(future, key))
+            else:
+                self._release(future, key)
+
+    def get_stats(self) -> dict:
+        """
+        获取队列的统计信息
+        Returns:
+            depth: 当前排队数, high_priority_depth: 高优先级排队数, low_priority_depth: 低优先级排队数,
+            capacity: 容量, dropped: 已丢弃数, rejected: 已拒绝数, dispatched: 已分发数
+        """
+        with self._lock:
+            return {
+                "depth": len(self),
+                "high_priority_depth": len(self._high),
+                "low_priority_depth": len(self._low),
+                "capacity": self.capacity,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "dispatched": self.dispatched
+            }
@@ -0,0 +1,123 @@
+"""
+JSON编解码
+根据配置选择JSON库（orjson/ujson/json），未安装时自动回退到标准库json
+"""
+
+import json
+
+from .ConfigManager import GlobalConfig
+from ..utils import Logger
+
+logger = Logger.get_logger()
+
+BACKENDS = ["orjson", "ujson", "json"]
+
+
+def _std_dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _std_dumps_bytes(obj) -> bytes:
+    return _std_dumps(obj).encode("utf-8")
+
+
+def _std_loads(data: str | bytes):
+    return json.loads(data)
+
+
+def _load_backend(name: str):
+    """
+    加载JSON库
+    Args:
+        name: 库名称
+    Returns:
+        dumps, dumps_bytes, loads
+    Raises:
+        ImportError: 库未安装
+    """
+    if name == "orjson":
+        import orjson
+
+        def _dumps_bytes(obj) -> bytes:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # orjson不支持的类型（例如超过64位的整数），回退到标准库
+                return _std_dumps_bytes(obj)
+
+        def _dumps(obj) -> str:
+            return _dumps_bytes(obj).decode("utf-8")
+
+        return _dumps, _dumps_bytes, orjson.loads
+    elif name == "ujson":
+        import ujson
+
+        def _dumps(obj) -> str:
+            return ujson.dumps(obj, ensure_ascii=False)
+
+        def _dumps_bytes(obj) -> bytes:
+            return _dumps(obj).encode("utf-8")
+
+        return _dumps, _dumps_bytes, ujson.loads
+    elif name == "json":
+        return _std_dumps, _std_dumps_bytes, _std_loads
+    else:
+        raise ValueError(f"未知的JSON库: {name}")
+
+
+def _select_backend(name: str):
+    if name == "auto":
+        candidates = BACKENDS
+    else:
+        if name not in BACKENDS:
+            logger.warning(f"未知的JSON库 {name}，将自动选择")
+            candidates = BACKENDS
+        else:
+            candidates = [name] + [_ for _ in BACKENDS if _ != name]
+
+    for candidate in candidates:
+        try:
+            return (candidate, *_load_backend(candidate))
+        except ImportError:
+            if candidate == name:
+                logger.warning(f"JSON库 {name} 未安装，将自动选择其他可用的JSON库")
+    raise RuntimeError("没有可用的JSON库")
+
+
+backend, _dumps, _dumps_bytes, _loads = _select_backend(GlobalConfig().json.backend)
+logger.debug(f"使用的JSON库: {backend}")
+
+
+def dumps(obj) -> str:
+    """
+    序列化为JSON字符串
+    Args:
+        obj: 要序列化的对象
+    Returns:
+        JSON字符串
+    """
+    return _dumps(obj)
+
+
+def dumps_bytes(obj) -> bytes:
+    """
+    序列化为UTF-8编码的JSON（可直接作为请求体发送）
+    Args:
+        obj: 要序列化的对象
+    Returns:
+        JSON bytes
+    """
+    return _dumps_bytes(obj)
+
+
+def loads(data: str | bytes):
+    """
+    反序列化JSON
+    Args:
+        data: JSON字符串或bytes
+    Returns:
+        反序列化后的对象
+    Raises:
+        ValueError: JSON格式错误
+    """
+    return _loads(data)
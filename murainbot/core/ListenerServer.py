@@ -4,15 +4,19 @@
 
 from ..utils import Logger
 from .ConfigManager import GlobalConfig
-from murainbot.core import EventManager
+from murainbot.core import EventManager, JsonCodec, IngestQueue, ThreadPool
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from wsgiref.simple_server import WSGIServer
 
 from flask import Flask, request
 import hmac
+import queue
+import threading
+import urllib.parse
 
 logger = Logger.get_logger()
+config = GlobalConfig()
 app = Flask(__name__)
 
 
@@ -25,32 +29,87 @@ class EscalationEvent(EventManager.Event):
         self.event_data = event_data
 
 
+def _dispatch(data: dict):
+    """
+    分发上报，开启了按会话顺序处理时同一会话的上报按顺序依次处理
+    Args:
+        data: 上报的数据
+    Returns:
+        事件处理的Future（线程池未初始化时不是Future）
+    """
+    event = EscalationEvent(data)
+    if config.thread_pool.ordered_dispatch and isinstance(ThreadPool.thread_pool, ThreadPoolExecutor):
+        key = IngestQueue.get_conversation_key(data)
+        if key is not None:
+            return ThreadPool.keyed_executor.submit(key, event.call)
+    return event.call_async()
+
+
+if config.ingest_queue.enable:
+    ingest_queue = IngestQueue.IngestQueue(_dispatch)
+else:
+    ingest_queue = None
+
+
 @app.route("/", methods=["POST"])
 def post_data():
     """
     上报处理
     """
+    if not _check_signature(request.get_data(), request.headers.get('X-Signature')):
+        return "", 401
+    try:
+        data = JsonCodec.loads(request.get_data())
+    except ValueError:
+        logger.warning("收到非法请求(JSON格式错误)，拒绝访问")
+        return "", 400
+    try:
+        _process_event(data)
+    except queue.Full:
+        return "", 503
+
+    return "ok", 204
+
+
+def _check_signature(body: bytes, signature: str | None) -> bool:
+    """
+    校验上报数据的签名（未设置secret时总是通过）
+    Args:
+        body: 请求体
+        signature: X-Signature请求头
+    Returns:
+        是否通过校验
+    """
     if GlobalConfig().server.secret:
-        sig = hmac.new(GlobalConfig().server.secret.encode("utf-8"), request.get_data(), 'sha1').hexdigest()
-        try:
-            received_sig = request.headers['X-Signature'][len('sha1='):]
-        except KeyError:
+        sig = hmac.new(GlobalConfig().server.secret.encode("utf-8"), body, 'sha1').hexdigest()
+        if signature is None:
             logger.warning("收到非法请求(缺少签名)，拒绝访问")
-            return "", 401
-        if sig != received_sig:
+            return False
+        if sig != signature[len('sha1='):]:
             logger.warning("收到非法请求(签名不匹配)，拒绝访问")
-            return "", 401
-    data = request.get_json()
+            return False
+    return True
+
+
+def _process_event(data: dict):
+    """
+    处理上报的事件（HTTP与反向WebSocket共用）
+    Args:
+        data: 上报的数据
+    Returns:
+        事件处理的Future（若被忽略或线程池未初始化则不是Future）
+    Raises:
+        queue.Full: 上报队列已满，上报被拒绝
+    """
     logger.debug("收到上报: %s" % data)
     if "self" in data and GlobalConfig().account.user_id != 0 and data.get("self") != GlobalConfig().account.user_id:
         logger.warning(f"收到来自其他bot的消息，忽略: {data}")
-        return "ok", 204
-    EscalationEvent(data).call_async()
+        return None
+    if ingest_queue is not None:
+        return ingest_queue.put(data)
+    return _dispatch(data)
 
-    return "ok", 204
 
-
-config = GlobalConfig()
 if config.server.server == "werkzeug":
     # 使用werkzeug服务器
     from werkzeug.serving import WSGIRequestHandler
@@ -103,5 +162,216 @@ elif config.server.server == "waitress":
     from waitress import serve
 
     start_server = lambda: serve(app, host=config.server.host, port=config.server.port, threads=config.server.max_works)
+elif config.server.server == "asyncio":
+    # 使用基于asyncio的轻量HTTP服务器，所有连接都在一个线程内处理，收到上报后直接交给线程池
+    import asyncio
+    from http import HTTPStatus
+
+    KEEP_ALIVE_TIMEOUT = 60
+
+
+    def make_response(status: int, keep_alive: bool) -> bytes:
+        """
+        生成无响应体的HTTP响应
+        """
+        response = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        if status != 204:
+            response += "Content-Length: 0\r\n"
+        response += f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        return response.encode("ascii")
+
+
+    def parse_head(head: bytes) -> tuple[str, str, str, dict[str, str]]:
+        """
+        解析请求行与请求头
+        Returns:
+            method, target, version, headers（请求头名称均为小写）
+        Raises:
+            ValueError: 格式错误
+        """
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise ValueError(f"非法的请求头: {line}")
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+
+    def handle_request(method: str, target: str, headers: dict[str, str], body: bytes) -> int:
+        """
+        处理一个请求
+        Returns:
+            状态码
+        """
+        if target.split("?", 1)[0] != "/":
+            return 404
+        if method != "POST":
+            return 405
+        if not _check_signature(body, headers.get("x-signature")):
+            return 401
+        try:
+            data = JsonCodec.loads(body)
+        except ValueError:
+            logger.warning("收到非法请求(JSON格式错误)，拒绝访问")
+            return 400
+        try:
+            _process_event(data)
+        except queue.Full:
+            return 503
+        return 204
+
+
+    connections = 0
+
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        处理一个连接（支持keep-alive）
+        """
+        global connections
+        if connections >= config.server.max_connections:
+            logger.warning("连接数已达上限，拒绝新的连接")
+            writer.write(make_response(503, False))
+            writer.close()
+            return
+        connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(make_response(431, False))
+                    break
+
+                try:
+                    method, target, version, headers = parse_head(head)
+                except ValueError:
+                    writer.write(make_response(400, False))
+                    break
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                if "transfer-encoding" in headers:
+                    # Onebot实现端的上报都带有Content-Length，不支持分块传输
+                    writer.write(make_response(411, False))
+                    break
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(make_response(400, False))
+                    break
+                if length > config.server.max_body_size:
+                    logger.warning(f"收到过大的上报({length}字节)，拒绝访问")
+                    writer.write(make_response(413, False))
+                    break
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                body = await reader.readexactly(length) if length else b""
+
+                writer.write(make_response(handle_request(method, target, headers, body), keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            connections -= 1
+            writer.close()
+
+
+    async def serve():
+        """
+        启动服务器
+        """
+        server = await asyncio.start_server(handle_connection, config.server.host, config.server.port)
+        async with server:
+            await server.serve_forever()
+
+
+    start_server = lambda: asyncio.run(serve())
+elif config.server.server == "websocket":
+    # 使用反向WebSocket，由Onebot实现端主动连接并持续推送事件
+    from http import HTTPStatus
+
+    try:
+        from websockets.exceptions import ConnectionClosed
+        from websockets.sync.server import serve
+    except ImportError as e:
+        raise ImportError("使用反向WebSocket需要 websockets，请先 pip install websockets") from e
+
+
+    def check_access_token(connection, request):
+        """
+        握手时校验Access Token
+        """
+        if not config.api.access_token:
+            return None
+        token = request.headers.get("Authorization", "")
+        for prefix in ("Bearer ", "Token "):
+            if token.startswith(prefix):
+                token = token[len(prefix):]
+                break
+        if not token:
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(request.path).query)
+            token = query.get("access_token", [""])[0]
+        if not token:
+            logger.warning("收到非法的反向WebSocket连接(缺少Access Token)，拒绝连接")
+            return connection.respond(HTTPStatus.UNAUTHORIZED, "")
+        if not hmac.compare_digest(token, config.api.access_token):
+            logger.warning("收到非法的反向WebSocket连接(Access Token不匹配)，拒绝连接")
+            return connection.respond(HTTPStatus.FORBIDDEN, "")
+        return None
+
+
+    def websocket_handler(connection):
+        """
+        处理反向WebSocket连接
+        """
+        address = connection.remote_address
+        self_id = connection.request.headers.get("X-Self-ID")
+        role = connection.request.headers.get("X-Client-Role")
+        logger.info(f"Onebot实现端已连接(反向WebSocket): {address} "
+                    f"self_id: {self_id} role: {role}")
+        # 限制单个连接处理中的事件数，达到上限时暂停读取，由TCP流量控制让实现端放慢推送
+        pending = threading.BoundedSemaphore(config.server.max_pending)
+        try:
+            for message in connection:
+                try:
+                    data = JsonCodec.loads(message)
+                except ValueError:
+                    logger.warning("收到非法数据(JSON格式错误)，已忽略")
+                    continue
+                if not isinstance(data, dict) or "post_type" not in data:
+                    # 不是事件（例如API的响应），忽略
+                    continue
+                pending.acquire()
+                try:
+                    future = _process_event(data)
+                except queue.Full:
+                    pending.release()
+                    continue
+                if isinstance(future, Future):
+                    future.add_done_callback(lambda _: pending.release())
+                else:
+                    pending.release()
+        except ConnectionClosed as e:
+            logger.warning(f"反向WebSocket连接异常断开: {repr(e)}")
+        logger.info(f"Onebot实现端已断开连接(反向WebSocket): {address} "
+                    f"self_id: {self_id}，等待其重新连接")
+
+
+    server = serve(websocket_handler, config.server.host, config.server.port,
+                   process_request=check_access_token, max_size=config.server.max_body_size)
+    start_server = lambda: server.serve_forever()
 else:
     raise ValueError("服务器类型错误: 未知服务器类型")
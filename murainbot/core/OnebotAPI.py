@@ -9,13 +9,20 @@ OnebotAPI
 可以方便的调用Onebot的API
 """
 
-import json
-import traceback
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import sys
+import threading
 import urllib.parse
+import weakref
+from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from . import EventManager, ConfigManager
+from . import EventManager, ConfigManager, PluginManager, JsonCodec
 from ..common import exc_logger
 from ..utils import Logger
 
@@ -23,6 +30,28 @@ logger = Logger.get_logger()
 config = ConfigManager.GlobalConfig()
 
 
+def _get_caller_name(depth: int = 2) -> str:
+    """
+    获取API的调用者（属于插件则为插件名，否则为文件名），用于debug日志
+    Args:
+        depth: 起始的栈深度
+    Returns:
+        调用者
+    """
+    frame = sys._getframe(depth)
+    first_filename = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__:
+            plugin = PluginManager.get_plugin_data_by_file(filename)
+            if plugin is not None:
+                return plugin["name"]
+            if first_filename is None:
+                first_filename = filename
+        frame = frame.f_back
+    return first_filename
+
+
 class CallAPIEvent(EventManager.Event):
     """
     调用API事件
@@ -33,6 +62,155 @@ class CallAPIEvent(EventManager.Event):
         self.data: dict | None = data
 
 
+class WebSocketAPIClient:
+    """
+    正向WebSocket API客户端
+    所有调用复用同一条连接，通过echo字段对应请求与响应，因此可以在一条连接上同时进行多个调用
+    连接断开后会在下一次调用时自动重连
+    使用前需要先安装websockets（pip install websockets）
+    """
+
+    def __init__(self, url: str):
+        """
+        Args:
+            url: 正向WebSocket的url
+        """
+        self.url = url
+        self._connection = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending: dict[str, concurrent.futures.Future] = {}
+        self._echo = itertools.count()
+
+    @property
+    def connected(self) -> bool:
+        """
+        是否已连接
+        """
+        return self._connection is not None
+
+    def _connect(self):
+        """
+        获取连接，不存在则建立（需在持有self._lock时调用）
+        Returns:
+            websockets.sync.client.ClientConnection
+        """
+        if self._connection is not None:
+            return self._connection
+        try:
+            from websockets.sync.client import connect
+        except ImportError as e:
+            raise ImportError("使用正向WebSocket调用API需要 websockets，请先 pip install websockets") from e
+
+        headers = {}
+        if config.api.access_token:
+            headers["Authorization"] = f"Bearer {config.api.access_token}"
+        connection = connect(self.url, additional_headers=headers, open_timeout=config.api.connect_timeout,
+                             max_size=None)
+        self._connection = connection
+        threading.Thread(target=self._recv_loop, args=(connection,), daemon=True,
+                         name="OnebotAPI-WebSocket").start()
+        logger.info(f"已连接到正向WebSocket: {self.url}")
+        return connection
+
+    def connect(self):
+        """
+        建立连接（已连接则不做任何事）
+        """
+        with self._lock:
+            self._connect()
+
+    def _recv_loop(self, connection):
+        """
+        接收并分发响应
+        Args:
+            connection: 连接
+        """
+        try:
+            for message in connection:
+                try:
+                    result = JsonCodec.loads(message)
+                except ValueError:
+                    logger.warning(f"正向WebSocket收到无法解析的数据: {message!r}")
+                    continue
+                future = self._pending.pop(result.get("echo"), None) if isinstance(result, dict) else None
+                if future is None:
+                    # 不是API的响应（例如实现端推送的事件），忽略
+                    continue
+                try:
+                    future.set_result(result)
+                except concurrent.futures.InvalidStateError:
+                    # 调用方已超时取消
+                    pass
+        except Exception as e:
+            logger.warning(f"正向WebSocket连接异常断开: {repr(e)}")
+        finally:
+            with self._lock:
+                if self._connection is connection:
+                    self._connection = None
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                try:
+                    future.set_exception(ConnectionError("正向WebSocket连接已断开"))
+                except concurrent.futures.InvalidStateError:
+                    pass
+
+    def call(self, action: str, params: dict | None) -> concurrent.futures.Future:
+        """
+        发送一次调用
+        Args:
+            action: 动作名称
+            params: 参数
+        Returns:
+            concurrent.futures.Future，结果为实现端返回的完整json
+        """
+        echo = str(next(self._echo))
+        future = concurrent.futures.Future()
+        with self._lock:
+            connection = self._connect()
+            self._pending[echo] = future
+        try:
+            message = JsonCodec.dumps({"action": action, "params": params if params is not None else {}, "echo": echo})
+            with self._send_lock:
+                connection.send(message)
+        except Exception:
+            self._pending.pop(echo, None)
+            raise
+        future.add_done_callback(lambda _: self._pending.pop(echo, None))
+        return future
+
+    def close(self):
+        """
+        关闭连接
+        """
+        with self._lock:
+            connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+
+
+_ws_clients: dict[str, WebSocketAPIClient] = {}
+_ws_clients_lock = threading.Lock()
+
+
+def get_ws_client(url: str) -> WebSocketAPIClient:
+    """
+    获取对应url的正向WebSocket客户端，同一url的所有OnebotAPI实例共用一条连接
+    Args:
+        url: 正向WebSocket的url
+    Returns:
+        WebSocketAPIClient
+    """
+    client = _ws_clients.get(url)
+    if client is None:
+        with _ws_clients_lock:
+            client = _ws_clients.get(url)
+            if client is None:
+                client = WebSocketAPIClient(url)
+                _ws_clients[url] = client
+    return client
+
+
 class OnebotAPI:
     """
     OnebotAPI
@@ -53,6 +231,28 @@ class OnebotAPI:
         self.host = host
         self.port = port
         self.original = original
+        self.session = self._create_session()
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """
+        创建带连接池的会话，同一实例的所有请求复用连接，避免每次调用都重新握手
+        Returns:
+            requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=config.api.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not config.api.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self):
+        """
+        关闭连接池
+        """
+        self.session.close()
 
     def set_url(self, host: str, port: int):
         """
@@ -64,18 +264,14 @@ class OnebotAPI:
         self.host = host
         self.port = port
 
-    def get(self, node, data: dict = None, original: bool = None):
+    def _get_url(self, node: str) -> str:
         """
-        调用api
+        检查参数并拼接请求的url
         Args:
             node: 节点
-            data: 数据
-            original: 是否返回全部json（默认只返回data内）
+        Returns:
+            url
         """
-
-        if original is None:
-            original = self.original
-
         if node == "":
             raise ValueError('The node cannot be empty.')
 
@@ -88,41 +284,115 @@ class OnebotAPI:
         if (not isinstance(port, int)) or port > 65535 or port < 0:
             raise ValueError('The port cannot be empty.')
 
-        if not (host.startswith("http://") or host.startswith("https://")):
+        if config.api.transport == "ws":
+            if host.startswith("http://"):
+                host = "ws://" + host[len("http://"):]
+            elif host.startswith("https://"):
+                host = "wss://" + host[len("https://"):]
+            elif not (host.startswith("ws://") or host.startswith("wss://")):
+                host = "ws://" + host
+        elif not (host.startswith("http://") or host.startswith("https://")):
             host = "http://" + host
 
         # 拼接url
-        url = urllib.parse.urljoin(host + ":" + str(port), node)
+        return urllib.parse.urljoin(host + ":" + str(port), node)
 
-        # 广播call_api事件
-        event = CallAPIEvent(url, node, data)
-        event.call_async()
-        if traceback.extract_stack()[-1].filename == traceback.extract_stack()[-2].filename:
-            logger.debug(f"调用 API: {node} data: {data} by: {traceback.extract_stack()[-3].filename}")
-        else:
-            logger.debug(f"调用 API: {node} data: {data} by: {traceback.extract_stack()[-2].filename}")
+    def _get_ws_client(self) -> WebSocketAPIClient:
+        """
+        获取正向WebSocket客户端
+        """
+        return get_ws_client(self._get_url("/"))
+
+    @staticmethod
+    def _get_headers() -> dict:
+        """
+        获取请求头
+        """
         headers = {
                     "Content-Type": "application/json"
         }
         if config.api.access_token:
             headers["Authorization"] = f"Bearer {config.api.access_token}"
+        return headers
+
+    @staticmethod
+    def _parse_response(status_code: int, content: bytes, original: bool):
+        """
+        解析返回内容
+        Args:
+            status_code: 状态码
+            content: 返回内容
+            original: 是否返回全部json
+        Returns:
+            返回的数据
+        """
+        if status_code != 200:
+            raise Exception(f"返回异常, 状态码: {status_code}, 返回内容: {content.decode('utf-8', 'replace')}")
+
+        result = JsonCodec.loads(content)
+        if result['status'] != 'ok' or result['retcode'] != 0:
+            raise Exception(f"返回异常, 状态码: {status_code}, 返回内容: {content.decode('utf-8', 'replace')}")
+
+        # 如果original为真，则返回原值和response
+        if original:
+            return result
+        else:
+            return result['data']
+
+    @staticmethod
+    def _parse_ws_result(result: dict, original: bool):
+        """
+        解析正向WebSocket的返回内容
+        Args:
+            result: 返回的json
+            original: 是否返回全部json
+        Returns:
+            返回的数据
+        """
+        if result.get('status') != 'ok' or result.get('retcode') != 0:
+            raise Exception(f"返回异常, 返回内容: {result}")
+
+        if original:
+            return result
+        else:
+            return result.get('data')
+
+    def get(self, node, data: dict = None, original: bool = None):
+        """
+        调用api
+        Args:
+            node: 节点
+            data: 数据
+            original: 是否返回全部json（默认只返回data内）
+        """
+
+        if original is None:
+            original = self.original
+
+        url = self._get_url(node)
+
+        # 广播call_api事件
+        event = CallAPIEvent(url, node, data)
+        event.call_async()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"调用 API: {node} data: {data} by: {_get_caller_name()}")
         # 发起get请求
-        creat_dump = True
         try:
-            response = requests.post(
+            if config.api.transport == "ws":
+                future = self._get_ws_client().call(node.lstrip("/"), data)
+                try:
+                    result = future.result(timeout=config.api.read_timeout)
+                except TimeoutError:
+                    future.cancel()
+                    raise
+                return self._parse_ws_result(result, original)
+            response = self.session.post(
                 url,
-                headers=headers,
-                data=json.dumps(data if data is not None else {})
+                headers=self._get_headers(),
+                data=JsonCodec.dumps_bytes(data if data is not None else {}),
+                timeout=(config.api.connect_timeout, config.api.read_timeout)
             )
-            if response.status_code != 200 or (response.json()['status'] != 'ok' or response.json()['retcode'] != 0):
-                creat_dump = False
-                raise Exception(f"返回异常, 状态码: {response.status_code}, 返回内容: {response.text}")
-
-            # 如果original为真，则返回原值和response
-            if original:
-                return response.json()
-            else:
-                return response.json()['data']
+            return self._parse_response(response.status_code, response.content, original)
         except Exception as e:
             exc_logger(e, f"调用 API: {node} data: {data} 异常")
             raise e
@@ -551,4 +821,96 @@ class OnebotAPI:
         return self.get("/clean_cache")
 
 
+class AsyncOnebotAPI(OnebotAPI):
+    """
+    基于asyncio的OnebotAPI，与OnebotAPI拥有相同的方法，但所有方法均返回协程，需要在事件循环中await
+    调用时不会占用线程池中的线程，可在同一个事件循环中并发大量调用
+    使用前需要先安装aiohttp（pip install aiohttp）
+    """
+
+    def __init__(self, host: str = None, port: int = None,
+                 original: bool = False):
+        """
+        Args:
+            host: 调用的ip
+            port: 调用的端口
+            original: 是否返回全部json（默认只返回data内）
+        """
+        super().__init__(host, port, original)
+        # 每个事件循环使用各自的会话（aiohttp的会话无法跨事件循环使用）
+        self._sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any] = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _create_session() -> None:
+        return None
+
+    def _get_session(self):
+        """
+        获取当前事件循环的会话，不存在则创建
+        Returns:
+            aiohttp.ClientSession
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            try:
+                import aiohttp
+            except ImportError as e:
+                raise ImportError("AsyncOnebotAPI 需要 aiohttp，请先 pip install aiohttp") from e
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=config.api.pool_size, force_close=not config.api.keep_alive),
+                timeout=aiohttp.ClientTimeout(sock_connect=config.api.connect_timeout,
+                                              sock_read=config.api.read_timeout)
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def close(self):
+        """
+        关闭当前事件循环的连接池
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    async def get(self, node, data: dict = None, original: bool = None):
+        """
+        调用api
+        Args:
+            node: 节点
+            data: 数据
+            original: 是否返回全部json（默认只返回data内）
+        """
+
+        if original is None:
+            original = self.original
+
+        url = self._get_url(node)
+
+        # 广播call_api事件
+        event = CallAPIEvent(url, node, data)
+        event.call_async()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"调用 API: {node} data: {data} by: {_get_caller_name()}")
+        try:
+            if config.api.transport == "ws":
+                client = self._get_ws_client()
+                if not client.connected:
+                    # 建立连接是阻塞的，放到线程中进行以免阻塞事件循环
+                    await asyncio.to_thread(client.connect)
+                future = asyncio.wrap_future(client.call(node.lstrip("/"), data))
+                result = await asyncio.wait_for(future, timeout=config.api.read_timeout)
+                return self._parse_ws_result(result, original)
+            async with self._get_session().post(
+                    url,
+                    headers=self._get_headers(),
+                    data=JsonCodec.dumps_bytes(data if data is not None else {})
+            ) as response:
+                content = await response.read()
+            return self._parse_response(response.status, content, original)
+        except Exception as e:
+            exc_logger(e, f"调用 API: {node} data: {data} 异常")
+            raise e
+
+
 api = OnebotAPI()
@@ -3,6 +3,7 @@
 """
 
 import dataclasses
+import functools
 import importlib
 import inspect
 import os
@@ -135,6 +136,8 @@ def load_plugins():
         plugin = {"name": name, "plugin": None, "info": None, "file_path": file_path, "path": full_path}
         found_plugins.append(plugin)
 
+    get_plugin_data_by_file.cache_clear()
+
     plugins = []
 
     for plugin in found_plugins:
@@ -197,6 +200,35 @@ def requirement_plugin(plugin_name: str):
         raise FileNotFoundError(f"插件 {plugin_name} 不存在或不符合要求，无法加载依赖")
 
 
+@functools.lru_cache(maxsize=1024)
+def get_plugin_data_by_file(filename: str) -> PluginDict | None:
+    """
+    获取文件所属的插件数据（结果会被缓存，插件列表刷新时自动清空）
+    Args:
+        filename: 文件路径
+    Returns:
+        plugin_data: dict | None
+    """
+    normalized_filename = os.path.normpath(filename)
+    normalized_plugins_path = os.path.normpath(paths.PLUGINS_PATH)
+
+    if not normalized_filename.startswith(normalized_plugins_path):
+        return None
+
+    for plugin in found_plugins:
+        normalized_plugin_file_path = os.path.normpath(plugin["file_path"])
+        plugin_dir, plugin_file = os.path.split(normalized_plugin_file_path)
+
+        if plugin_dir == normalized_plugins_path:
+            if normalized_plugin_file_path != normalized_filename:
+                continue
+        else:
+            if not normalized_filename.startswith(plugin_dir):
+                continue
+        return plugin
+    return None
+
+
 def get_caller_plugin_data(ignore_self=False):
     """
     获取调用者的插件数据
@@ -210,25 +242,12 @@ def get_caller_plugin_data(ignore_self=False):
 
     stack = inspect.stack()[1:]
     for frame_info in stack:
-        filename = frame_info.filename
-
-        normalized_filename = os.path.normpath(filename)
-        normalized_plugins_path = os.path.normpath(paths.PLUGINS_PATH)
-
-        if normalized_filename.startswith(normalized_plugins_path):
-            for plugin in found_plugins:
-                normalized_plugin_file_path = os.path.normpath(plugin["file_path"])
-                plugin_dir, plugin_file = os.path.split(normalized_plugin_file_path)
-
-                if plugin_dir == normalized_plugins_path:
-                    if normalized_plugin_file_path != normalized_filename:
-                        continue
-                else:
-                    if not normalized_filename.startswith(plugin_dir):
-                        continue
-                if skip_self_flag is None:
-                    skip_self_flag = plugin
-                else:
-                    if plugin != skip_self_flag:
-                        return plugin
+        plugin = get_plugin_data_by_file(frame_info.filename)
+        if plugin is None:
+            continue
+        if skip_self_flag is None:
+            skip_self_flag = plugin
+        else:
+            if plugin != skip_self_flag:
+                return plugin
     return None
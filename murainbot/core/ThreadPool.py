@@ -4,7 +4,11 @@ Created by BigCookie233
 """
 
 import atexit
-from concurrent.futures import ThreadPoolExecutor
+import collections
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
 
 from murainbot.common import exc_logger
 from murainbot.core.ConfigManager import GlobalConfig
@@ -56,3 +60,74 @@ def async_task(func):
             return func(*args, **kwargs)
 
     return wrapper
+
+
+class KeyedExecutor:
+    """
+    按key分组的执行器
+    同一key的任务按提交顺序依次执行，不同key的任务在线程池中并行执行
+    每个key同一时间最多占用线程池中的一个线程，执行完一个任务后重新排队，避免某个key长期占用线程
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 存在于此字典中的key表示其任务正在执行或已在线程池中排队
+        self._queues: dict[Any, collections.deque] = {}
+
+    def submit(self, key, func, *args, **kwargs) -> Future:
+        """
+        提交任务
+        Args:
+            key: 任务的key
+            func: 任务函数
+            *args: 参数
+            **kwargs: 参数
+        Returns:
+            Future，结果为任务的返回值（发生异常时为None）
+        """
+        future = Future()
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.append((future, func, args, kwargs))
+                return future
+            self._queues[key] = collections.deque([(future, func, args, kwargs)])
+        thread_pool.submit(self._run, key)
+        return future
+
+    def _run(self, key):
+        with self._lock:
+            future, func, args, kwargs = self._queues[key].popleft()
+        if future.set_running_or_notify_cancel():
+            future.set_result(_wrapper(func, *args, **kwargs))
+        with self._lock:
+            if not self._queues[key]:
+                del self._queues[key]
+                return
+        thread_pool.submit(self._run, key)
+
+
+keyed_executor = KeyedExecutor()
+
+
+def keyed_async_task(key: Callable[..., Any] | Any):
+    """
+    按key顺序执行的异步任务装饰器，key相同的调用按调用顺序依次执行，key不同的调用并行执行
+    例如使用 @keyed_async_task(key=lambda event: event["group_id"]) 装饰后，同一个群的事件会依次处理
+    Args:
+        key: 任务的key，可以是固定值，也可以是接受与被装饰函数相同参数并返回key的函数（返回None则不保证顺序）
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            task_key = key(*args, **kwargs) if callable(key) else key
+            if isinstance(thread_pool, ThreadPoolExecutor):
+                if task_key is None:
+                    return thread_pool.submit(_wrapper, func, *args, **kwargs)
+                return keyed_executor.submit(task_key, func, *args, **kwargs)
+            else:
+                logger.warning("Thread Pool is not initialized. Please call init() before using it.")
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,6 +1,7 @@
 """
 操作
 """
+import asyncio
 
 from murainbot.common import exc_logger
 from murainbot.core import OnebotAPI, ThreadPool
@@ -11,6 +12,7 @@ logger = Logger.get_logger()
 from typing import Generic, TypeVar, Union, Callable
 
 api = OnebotAPI.OnebotAPI()
+async_api = OnebotAPI.AsyncOnebotAPI()
 
 T = TypeVar("T")  # 成功类型
 E = TypeVar("E")  # 错误类型
@@ -84,6 +86,7 @@ class Action:
     Action基类，无实际用途，勿调用
     """
     call_func = None
+    async_call_func = None  # call_coro使用的协程函数，为空时自动从async_api中查找call_func的同名方法
 
     def __init__(self, *args, callback: Callable[[Result], ...] = None, **kwargs):
         self._result: UnCalled | Result = UnCalled
@@ -116,6 +119,40 @@ class Action:
             result = Result(self.call_func(*self.args, **self.kwargs), True)
         except Exception as e:
             result = Result(e, False)
+        self._set_result(result)
+        return self
+
+    async def call_coro(self):
+        """
+        在asyncio事件循环中调用Action，等待API返回时不占用线程池中的线程
+        Returns:
+            Action
+        """
+        try:
+            result = Result(await self._call_func_coro(), True)
+        except Exception as e:
+            result = Result(e, False)
+        self._set_result(result)
+        return self
+
+    def _call_func_coro(self):
+        """
+        获取调用Action的协程
+        """
+        if self.async_call_func is not None:
+            return self.async_call_func(*self.args, **self.kwargs)
+        call_func = self.call_func
+        if getattr(call_func, "__self__", None) is api:
+            return getattr(async_api, call_func.__name__)(*self.args, **self.kwargs)
+        # 自定义的call_func没有对应的协程版本，只能在其他线程中同步调用
+        return asyncio.to_thread(call_func, *self.args, **self.kwargs)
+
+    def _set_result(self, result: Result):
+        """
+        设置调用结果，并记录日志、执行回调函数
+        Args:
+            result: 调用结果
+        """
         self._result = result
         try:
             if self._result.is_ok:
@@ -127,7 +164,6 @@ class Action:
                 self.callback(self._result)
             except Exception as e:
                 exc_logger(e, f"执行回调函数异常")
-        return self
 
     def logger(self, *args, **kwargs):
         """
@@ -965,4 +1001,14 @@ if __name__ == "__main__":
         print(res.unwrap())
     else:
         print(res.unwrap_err())
+
+    # 在事件循环中并发调用（不占用线程池）
+    async def main(group_ids):
+        actions = await asyncio.gather(*(
+            SendGroupMsg(group_id=group_id, message="Hello World").call_coro() for group_id in group_ids
+        ))
+        return [action.get_result() for action in actions]
+
+    for res in asyncio.run(main([123456789, 987654321])):
+        print(res.unwrap() if res.is_ok else res.unwrap_err())
 """
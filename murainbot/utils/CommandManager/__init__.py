@@ -2,14 +2,31 @@
 命令管理器
 """
 import ast
+import functools
+import threading
+import time
 from typing import Any
 
+from murainbot.core import ConfigManager
 from murainbot.utils import QQRichText, Logger
 
 arg_map = {}
 logger = Logger.get_logger()
 
 
+def _rich_from_segments(segments: list[QQRichText.Segment]) -> QQRichText.QQRichText:
+    """
+    直接使用已有的消息段创建QQRichText，不会像构造函数一样重新创建每个消息段
+    Args:
+        segments: 消息段列表（其中的消息段会被冻结）
+    Returns:
+        QQRichText
+    """
+    rich = QQRichText.QQRichText()
+    rich.rich_array = [segment.freeze() for segment in segments]
+    return rich
+
+
 def _split_remaining_cmd(remaining_cmd: QQRichText.QQRichText) -> \
         tuple[QQRichText.Segment | None, QQRichText.QQRichText | None]:
     remaining_cmd = remaining_cmd.strip()
@@ -22,11 +39,11 @@ def _split_remaining_cmd(remaining_cmd: QQRichText.QQRichText) -> \
                 cmd, remaining_cmd_str = cmd
                 cmd = cmd.strip()
                 return (QQRichText.Text(cmd),
-                        QQRichText.QQRichText(QQRichText.Text(remaining_cmd_str), *remaining_cmd.rich_array[1:]))
+                        _rich_from_segments([QQRichText.Text(remaining_cmd_str), *remaining_cmd.rich_array[1:]]))
             else:
-                return QQRichText.Text(cmd[0].strip()), QQRichText.QQRichText(*remaining_cmd.rich_array[1:])
+                return QQRichText.Text(cmd[0].strip()), _rich_from_segments(remaining_cmd.rich_array[1:])
         else:
-            return remaining_cmd.rich_array[0], QQRichText.QQRichText(*remaining_cmd.rich_array[1:])
+            return remaining_cmd.rich_array[0], _rich_from_segments(remaining_cmd.rich_array[1:])
 
 
 def encode_arg(arg: str):
@@ -91,12 +108,29 @@ class BaseArg(metaclass=ArgMeta):
     基础命令参数类，请勿直接使用
     """
 
+    # 下一参数的匹配表，首次匹配时根据next_arg_list生成
+    _next_arg_table: "_ArgTable | None" = None
+    # 是否已被冻结，冻结后无法再添加参数
+    _frozen: bool = False
+
     def __init__(self, arg_name: str, next_arg_list=None):
         self.arg_name = arg_name
         if next_arg_list is None:
             next_arg_list = []
         self.next_arg_list = next_arg_list
 
+    @property
+    def next_arg_list(self):
+        """
+        下一参数列表，请使用add_next_arg添加参数，直接修改列表中的元素不会使匹配表失效
+        """
+        return self._next_arg_list
+
+    @next_arg_list.setter
+    def next_arg_list(self, value):
+        self._next_arg_list = value
+        self._next_arg_table = None
+
     def __str__(self):
         return f"<{self.arg_name}: {self.__class__.__module__}.{self.__class__.__name__}{self.config_str(", ")}>"
 
@@ -196,10 +230,42 @@ class BaseArg(metaclass=ArgMeta):
         Returns:
             self
 
+        Raises:
+            TypeError: 命令树已被冻结
         """
+        if self._frozen:
+            raise TypeError(f"参数 {self} 所在的命令树已被冻结（parsing_command_def返回的命令树会被缓存共用），无法添加参数")
         self.next_arg_list.append(arg)
+        self._next_arg_table = None
+        return self
+
+    def freeze(self):
+        """
+        冻结以该参数为根的命令树，冻结后无法再添加参数，可以安全地在多处共用
+        Returns:
+            self
+        """
+        if not self._frozen:
+            self._frozen = True
+            self.next_arg_list = tuple(self.next_arg_list)
+            for arg in self.next_arg_list:
+                arg.freeze()
         return self
 
+    def match_next_arg(self, remaining_cmd: QQRichText.QQRichText) -> "BaseArg | None":
+        """
+        获取第一个匹配剩余命令的下一参数
+        Args:
+            remaining_cmd: 剩余命令（需已strip）
+        Returns:
+            匹配的参数，没有则为None
+        """
+        table = self._next_arg_table
+        if table is None:
+            # 匹配表在add_next_arg或重新设置next_arg_list时失效
+            table = self._next_arg_table = _ArgTable(self.next_arg_list)
+        return table.match(remaining_cmd)
+
     def get_last_arg(self):
         """
         获取当前参数的下一个参数，如果没有则返回自己，如果当前参数的下个参数不止一个，则会报错
@@ -236,9 +302,82 @@ class BaseArg(metaclass=ArgMeta):
         return cls(arg_name, **config)
 
 
+class _ArgTable:
+    """
+    参数匹配表
+    与按顺序调用每个参数的matcher并取第一个匹配的参数等价，
+    但Literal参数会被编译为前缀表，只需对输入的开头查几次表，而不用逐个匹配
+    """
+
+    def __init__(self, args: list[BaseArg]):
+        """
+        Args:
+            args: 按匹配顺序排列的参数
+        """
+        self.args = list(args)
+        # 文本前缀 -> 使用该前缀的第一个Literal的下标
+        self.literals: dict[str, int] = {}
+        # 无法查表、需要调用matcher的参数 (下标, 参数)
+        self.others: list[tuple[int, BaseArg]] = []
+        for index, arg in enumerate(self.args):
+            if type(arg).matcher is Literal.matcher:
+                for command in arg.command_list:
+                    self.literals.setdefault(command, index)
+            else:
+                self.others.append((index, arg))
+                if type(arg).matcher is BaseArg.matcher:
+                    # 总是匹配，之后的参数都不可能被匹配到
+                    break
+        self.literal_lengths = sorted({len(command) for command in self.literals}, reverse=True)
+
+    def match(self, remaining_cmd: QQRichText.QQRichText) -> BaseArg | None:
+        """
+        获取第一个匹配剩余命令的参数
+        Args:
+            remaining_cmd: 剩余命令（需已strip）
+        Returns:
+            匹配的参数，没有则为None
+        """
+        literal_index = None
+        rich_array = remaining_cmd.rich_array
+        if rich_array and rich_array[0].type == "text" and rich_array[0].data.get("text", "") != rich_array[0].data.get("text", "").strip():
+            # 与Literal.matcher一致，第一个文本消息段两端仍有空白时会再strip一次
+            rich_array = remaining_cmd.strip().rich_array
+        if rich_array and rich_array[0].type == "text":
+            text = rich_array[0].data.get("text")
+            for length in self.literal_lengths:
+                index = self.literals.get(text[:length])
+                if index is not None and (literal_index is None or index < literal_index):
+                    literal_index = index
+
+        for index, arg in self.others:
+            if literal_index is not None and index > literal_index:
+                break
+            if arg.matcher(remaining_cmd):
+                return arg
+        return self.args[literal_index] if literal_index is not None else None
+
+
+@functools.lru_cache(maxsize=1024)
 def parsing_command_def(command_def: str) -> BaseArg:
     """
     字符串命令转命令树
+    解析结果会被缓存，相同的命令定义会返回同一个已冻结（不可修改）的命令树
+    Args:
+        command_def: 字符串格式的命令定义
+
+    Returns:
+        命令树
+    """
+    command_tree = _parsing_command_def(command_def)
+    if command_tree is not None:
+        command_tree.freeze()
+    return command_tree
+
+
+def _parsing_command_def(command_def: str) -> BaseArg:
+    """
+    字符串命令转命令树（不使用缓存，返回的命令树可以修改）
     Args:
         command_def: 字符串格式的命令定义
 
@@ -361,48 +500,171 @@ def parsing_command_def(command_def: str) -> BaseArg:
 from murainbot.utils.CommandManager.args import *
 
 
-def levenshtein_distance(s1: str, s2: str) -> int:
+def levenshtein_distance(s1: str, s2: str, max_distance: int | None = None) -> int:
     """
     计算两个字符串之间的莱文斯坦距离（编辑距离）。
-    使用动态规划算法。
+    使用动态规划算法，只保留两行状态。
 
     Args:
         s1: 第一个字符串。
         s2: 第二个字符串。
+        max_distance: 距离上限，距离超过上限时会提前结束计算并返回 max_distance + 1。
 
     Returns:
-        两个字符串之间的编辑距离。
+        两个字符串之间的编辑距离（超过上限时为 max_distance + 1）。
     """
     m, n = len(s1), len(s2)
+    if max_distance is not None and abs(m - n) > max_distance:
+        # 长度差本身就是距离的下界
+        return max_distance + 1
 
-    # 创建一个 (m+1) x (n+1) 的矩阵来存储距离
-    # dp[i][j] 表示 s1 的前 i 个字符和 s2 的前 j 个字符之间的编辑距离
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    # 初始化矩阵的第一行和第一列
+    # previous[j] 表示 s1 的前 i-1 个字符和 s2 的前 j 个字符之间的编辑距离
     # 从空字符串转换到 s2 的前 j 个字符需要 j 次插入
-    for j in range(n + 1):
-        dp[0][j] = j
-    # 从 s1 的前 i 个字符转换到空字符串需要 i 次删除
-    for i in range(m + 1):
-        dp[i][0] = i
+    previous = list(range(n + 1))
 
-    # 填充矩阵的其余部分
     for i in range(1, m + 1):
+        # 从 s1 的前 i 个字符转换到空字符串需要 i 次删除
+        current = [i] + [0] * n
         for j in range(1, n + 1):
             # 如果 s1[i-1] 和 s2[j-1] 字符相同，则替换成本为 0，否则为 1
             substitution_cost = 0 if s1[i - 1] == s2[j - 1] else 1
 
-            # dp[i][j] 的值是以下三者中的最小值：
-            # 1. dp[i-1][j] + 1  (删除 s1 的第 i 个字符)
-            # 2. dp[i][j-1] + 1  (在 s1 中插入 s2 的第 j 个字符)
-            # 3. dp[i-1][j-1] + substitution_cost (替换 s1 的第 i 个字符为 s2 的第 j 个字符)
-            dp[i][j] = min(dp[i - 1][j] + 1,  # Deletion
-                           dp[i][j - 1] + 1,  # Insertion
-                           dp[i - 1][j - 1] + substitution_cost)  # Substitution
+            # 取以下三者中的最小值：
+            # 1. previous[j] + 1  (删除 s1 的第 i 个字符)
+            # 2. current[j-1] + 1  (在 s1 中插入 s2 的第 j 个字符)
+            # 3. previous[j-1] + substitution_cost (替换 s1 的第 i 个字符为 s2 的第 j 个字符)
+            current[j] = min(previous[j] + 1,  # Deletion
+                             current[j - 1] + 1,  # Insertion
+                             previous[j - 1] + substitution_cost)  # Substitution
+        if max_distance is not None and min(current) > max_distance:
+            # 每一行的最小值不会在之后的行中变小
+            return max_distance + 1
+        previous = current
+
+    # 最终结果位于最后一行的末尾
+    if max_distance is not None and previous[n] > max_distance:
+        return max_distance + 1
+    return previous[n]
+
+
+class _BKTreeNode:
+    """
+    BK树的节点
+    """
+    __slots__ = ("word", "rank", "children")
+
+    def __init__(self, word: str, rank: int):
+        self.word = word
+        self.rank = rank
+        # 与该节点的编辑距离 -> 子节点
+        self.children: dict[int, _BKTreeNode] = {}
+
+
+class _BKTree:
+    """
+    以编辑距离为度量的BK树，用于快速查找与输入最接近的命令
+    利用三角不等式，查找时只需计算少数节点的距离
+    """
+
+    def __init__(self):
+        self.root: _BKTreeNode | None = None
+
+    def add(self, word: str, rank: int):
+        """
+        添加一个词
+        Args:
+            word: 词
+            rank: 排名，距离相同时排名小的优先
+        """
+        if self.root is None:
+            self.root = _BKTreeNode(word, rank)
+            return
+        node = self.root
+        while True:
+            dist = levenshtein_distance(word, node.word)
+            if dist == 0:
+                node.rank = min(node.rank, rank)
+                return
+            if dist not in node.children:
+                node.children[dist] = _BKTreeNode(word, rank)
+                return
+            node = node.children[dist]
+
+    def search(self, word: str, max_distance: int) -> str | None:
+        """
+        查找与输入最接近的词
+        Args:
+            word: 输入
+            max_distance: 最大距离
+        Returns:
+            距离最小的词（距离相同时取排名最小的），没有距离不超过max_distance的词时为None
+        """
+        best = None
+        best_key = (max_distance + 1, 0)
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            tolerance = best_key[0]
+            # 距离超过 tolerance + 最大子节点距离时，没有子节点需要查找，可以提前结束计算
+            max_key = max(node.children, default=0)
+            dist = levenshtein_distance(word, node.word, tolerance + max_key)
+            if (dist, node.rank) < best_key:
+                best, best_key = node.word, (dist, node.rank)
+                tolerance = dist
+            for key, child in node.children.items():
+                if dist - tolerance <= key <= dist + tolerance:
+                    stack.append(child)
+        return best
+
+
+class _TokenBucket:
+    """
+    令牌桶
+    """
 
-    # 最终结果位于矩阵的右下角
-    return dp[m][n]
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒生成的令牌数
+            capacity: 桶的容量
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self) -> bool:
+        """
+        尝试取出一个令牌
+        Returns:
+            是否成功
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+            self.last_time = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+_suggestion_bucket: _TokenBucket | None = None
+
+
+def _can_suggest() -> bool:
+    """
+    是否可以计算相似命令建议（所有命令管理器共用一个令牌桶，避免刷屏的错误命令占用大量CPU）
+    """
+    global _suggestion_bucket
+    if _suggestion_bucket is None:
+        rate = ConfigManager.GlobalConfig().command.suggestion_rate
+        # 容量至少为1，否则速率小于1时令牌永远攒不够一个
+        _suggestion_bucket = _TokenBucket(rate, max(1.0, rate))
+    if _suggestion_bucket.rate <= 0:
+        return True
+    return _suggestion_bucket.consume()
 
 
 def get_all_optional_args_recursive(start_node: BaseArg):
@@ -423,7 +685,23 @@ class CommandManager:
     """
 
     def __init__(self):
+        self._command_table: _ArgTable | None = None
         self.command_list: list[BaseArg] = []
+        self._literal_names: list[str] = []
+        self._literal_tree = _BKTree()
+        self._command_list_str = ""
+
+    @property
+    def command_list(self) -> list[BaseArg]:
+        """
+        已注册的命令树列表，请使用register_command注册命令，直接修改列表中的元素不会使匹配表失效
+        """
+        return self._command_list
+
+    @command_list.setter
+    def command_list(self, value: list[BaseArg]):
+        self._command_list = value
+        self._command_table = None
 
     def register_command(self, command: BaseArg):
         """
@@ -437,9 +715,26 @@ class CommandManager:
         # if callback_func is not None:
         #     command.get_last_arg().callback_func = callback_func
         self.command_list.append(command)
+        self._compile()
 
         return self
 
+    def _compile(self):
+        """
+        对命令列表排序并生成匹配表
+        """
+        # 第一个是literal的放前面，然后再根据literal的长度排序
+        self.command_list.sort(
+            key=lambda x: max(len(c) for c in x.command_list) if isinstance(x, Literal) else 0, reverse=True
+        )
+        self._command_table = _ArgTable(self.command_list)
+        self._literal_names = [_.arg_name for _ in self.command_list if isinstance(_, Literal)]
+        literal_tree = _BKTree()
+        for rank, name in enumerate(self._literal_names):
+            literal_tree.add(name, rank)
+        self._literal_tree = literal_tree
+        self._command_list_str = ", ".join([str(_) for _ in self.command_list])
+
     def run_command(self, command: QQRichText.QQRichText):
         """
         执行命令
@@ -451,39 +746,29 @@ class CommandManager:
         """
         kwargs = {}
         command = command.strip()
-        # 先对command_list重排序，第一个是literal的放前面，然后再根据literal的长度排序
-        self.command_list.sort(
-            key=lambda x: max(len(c) for c in x.command_list) if isinstance(x, Literal) else 0, reverse=True
-        )
-        for command_def in self.command_list:
-            if command_def.matcher(command):
-                now_command_def = command_def
-                break
+        if self._command_table is None:
+            # command_list被重新设置过
+            self._compile()
+        command_def = self._command_table.match(command)
+        if command_def is not None:
+            now_command_def = command_def
         else:
-            literals = [_.arg_name for _ in self.command_list if isinstance(_, Literal)]
+            literals = self._literal_names
             user_input = command.rich_array[0]
             if user_input.type == "text":
                 user_input = user_input.data.get("text")
                 if len(literals) == 1:
                     raise NotMatchCommandError(f'命令不匹配任何命令定义: '
-                                               f'{", ".join([str(_) for _ in self.command_list])}'
+                                               f'{self._command_list_str}'
                                                f'你的意思是: {literals[0]}？')
-                elif literals:
-                    closest_command = None
-                    min_dist = float('inf')
-
-                    for command in literals:
-                        dist = levenshtein_distance(user_input, command)
-
-                        if dist < min_dist and dist <= 3:
-                            min_dist = dist
-                            closest_command = command
+                elif literals and _can_suggest():
+                    closest_command = self._literal_tree.search(user_input, 3)
                     if closest_command:
                         raise NotMatchCommandError(f'命令不匹配任何命令定义: '
-                                                   f'{", ".join([str(_) for _ in self.command_list])}\n'
+                                                   f'{self._command_list_str}\n'
                                                    f'你的意思是: {closest_command}？')
             raise NotMatchCommandError(f'命令不匹配任何命令定义: '
-                                       f'{", ".join([str(_) for _ in self.command_list])}')
+                                       f'{self._command_list_str}')
         try:
             new_kwargs, command = now_command_def.handler(command)
         except ValueError as e:
@@ -506,10 +791,9 @@ class CommandManager:
             if not now_command_def.next_arg_list:
                 raise CommandMatchError(f'命令参数均已匹配，但仍剩余命令: "{command}"', command_def)
 
-            for next_command in now_command_def.next_arg_list:
-                if next_command.matcher(command):
-                    now_command_def = next_command
-                    break
+            next_command = now_command_def.match_next_arg(command)
+            if next_command is not None:
+                now_command_def = next_command
             else:
                 raise CommandMatchError(f'剩余命令: "{command}" 不匹配任何命令定义: '
                                         f'{", ".join([str(_) for _ in now_command_def.next_arg_list])}', command_def)
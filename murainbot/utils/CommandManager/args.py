@@ -4,7 +4,7 @@
 import ast
 from typing import Union, Any
 
-from murainbot.utils.CommandManager import BaseArg, parsing_command_def, logger
+from murainbot.utils.CommandManager import BaseArg, _parsing_command_def, logger, _rich_from_segments
 from murainbot.utils import QQRichText
 
 __all__ = [
@@ -29,6 +29,7 @@ class Literal(BaseArg):
             aliases = set()
         self.aliases = aliases
         self.command_list = {self.arg_name, *self.aliases}
+        self._sorted_command_list = sorted(self.command_list, key=len, reverse=True)
 
     def get_config(self) -> dict:
         """
@@ -47,10 +48,8 @@ class Literal(BaseArg):
     def handler(self, remaining_cmd: QQRichText.QQRichText) -> tuple[dict[str, Any], QQRichText.QQRichText | None]:
         text_to_match = remaining_cmd.strip().rich_array[0].data.get("text", "")
 
-        sorted_commands = sorted(self.command_list, key=len, reverse=True)
-
         matched_command = None
-        for command in sorted_commands:
+        for command in self._sorted_command_list:
             if text_to_match.startswith(command):
                 matched_command = command
                 break
@@ -58,9 +57,10 @@ class Literal(BaseArg):
         if matched_command is None:
             raise ValueError(f"命令不匹配当前任意参数: {', '.join(self.command_list)}")
 
-        return {}, QQRichText.QQRichText(
+        return {}, _rich_from_segments([
             QQRichText.Text(text_to_match.split(matched_command, 1)[-1]),
-            *remaining_cmd.rich_array[1:])
+            *remaining_cmd.rich_array[1:]
+        ])
 
 
 class OptionalArg(BaseArg):
@@ -81,6 +81,21 @@ class OptionalArg(BaseArg):
         # 可选参数也可能有自己的子节点
         self.next_arg_list = self.wrapped_arg.next_arg_list
 
+    def freeze(self):
+        self.wrapped_arg.freeze()
+        self.next_arg_list = self.wrapped_arg.next_arg_list
+        return super().freeze()
+
+    def add_next_arg(self, arg):
+        # 与被包装的参数共用next_arg_list，交给被包装的参数添加，使其匹配表失效
+        self.wrapped_arg.add_next_arg(arg)
+        return self
+
+    def match_next_arg(self, remaining_cmd: QQRichText.QQRichText) -> BaseArg | None:
+        if self.next_arg_list is self.wrapped_arg.next_arg_list:
+            return self.wrapped_arg.match_next_arg(remaining_cmd)
+        return super().match_next_arg(remaining_cmd)
+
     def node_str(self):
         return f"Optional({self.wrapped_arg.node_str()}, default={self.default!r})"
 
@@ -116,9 +131,25 @@ class SkipOptionalArg(BaseArg):
             for k, v in config.items()
         }
         # print(config["arg"])
-        config["arg"] = parsing_command_def(config["arg"])
+        # 不使用缓存，被包装的参数会与该参数共用next_arg_list，之后还需要添加参数
+        config["arg"] = _parsing_command_def(config["arg"])
         return cls(**config)
 
+    def freeze(self):
+        self.wrapped_arg.freeze()
+        self.next_arg_list = self.wrapped_arg.next_arg_list
+        return super().freeze()
+
+    def add_next_arg(self, arg):
+        # 与被包装的参数共用next_arg_list，交给被包装的参数添加，使其匹配表失效
+        self.wrapped_arg.add_next_arg(arg)
+        return self
+
+    def match_next_arg(self, remaining_cmd: QQRichText.QQRichText) -> BaseArg | None:
+        if self.next_arg_list is self.wrapped_arg.next_arg_list:
+            return self.wrapped_arg.match_next_arg(remaining_cmd)
+        return super().match_next_arg(remaining_cmd)
+
     def node_str(self):
         return f"SkipOptional({self.wrapped_arg.node_str()}, default={self.default!r})"
 
@@ -158,7 +189,7 @@ class GreedyTextArg(BaseArg):
     def handler(self, remaining_cmd):
         if remaining_cmd.type == "text":
             return ({self.arg_name: remaining_cmd.data.get("text")},
-                    QQRichText.QQRichText(*remaining_cmd.rich_array[1:]))
+                    _rich_from_segments(remaining_cmd.rich_array[1:]))
         else:
             raise ValueError(f"参数 {self.arg_name} 的类型必须是文本")
 
@@ -192,6 +223,11 @@ class EnumArg(BaseArg):
     def get_config(self):
         return {"enum_list": [str(enum) for enum in self.enum_list]}
 
+    def freeze(self):
+        for enum in self.enum_list:
+            enum.freeze()
+        return super().freeze()
+
     @classmethod
     def get_instance_from_config(cls, arg_name, config: dict[str, str]) -> "BaseArg":
         config = {
@@ -199,7 +235,7 @@ class EnumArg(BaseArg):
             for k, v in config.items()
         }
         config["enum_list"] = [
-            parsing_command_def(enum)
+            _parsing_command_def(enum)
             for enum in config["enum_list"]
         ]
         return cls(arg_name, **config)
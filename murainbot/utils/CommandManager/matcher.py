@@ -2,6 +2,7 @@
 命令管理器的命令匹配器
 """
 import dataclasses
+import threading
 from typing import Generator, Any, Callable
 
 from murainbot.common import inject_dependencies, exc_logger
@@ -14,7 +15,10 @@ __all__ = [
     "CommandMatcher",
     "WaitCommand",
     "CommandEvent",
-    "on_command"
+    "on_command",
+    "register_matcher",
+    "unregister_matcher",
+    "get_matchers"
 ]
 
 from murainbot.utils.SessionManager import WaitAction, TriggerEvent
@@ -308,12 +312,209 @@ class CommandMatcher(EventHandlers.Matcher):
 
 
 # command_manager = CommandManager()
-matchers: list[tuple[int, EventHandlers.Matcher]] = []
+# 已注册的匹配器，请通过register_matcher与unregister_matcher修改
+_matchers: list[tuple[int, EventHandlers.Matcher]] = []
+_matchers_lock = threading.Lock()
+
+
+class _CommandTrieNode:
+    """
+    命令前缀树的节点
+    """
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: dict[str, _CommandTrieNode] = {}
+        # (匹配器, 是否需要@机器人, 是否可包含回复)
+        self.entries: list[tuple[EventHandlers.Matcher, bool, bool]] = []
+
+
+class _CommandTrie:
+    """
+    命令前缀树
+    以 命令起始符 + 命令/别名（@机器人时为 命令/别名）为键索引所有通过on_command注册的匹配器，
+    收到消息时只需沿消息的开头走一遍即可得到可能匹配的匹配器，而不用逐个检查
+    """
+
+    def __init__(self):
+        self.root = _CommandTrieNode()
+        # 匹配器 -> 为其插入的命令前缀
+        self.matchers: dict[EventHandlers.Matcher, list[str]] = {}
+
+    def insert(self, key: str, matcher: EventHandlers.Matcher, at_only: bool, reply: bool):
+        """
+        插入一个命令前缀
+        Args:
+            key: 命令前缀
+            matcher: 匹配器
+            at_only: 是否仅在@机器人时有效
+            reply: 是否可包含回复
+        """
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _CommandTrieNode())
+        node.entries.append((matcher, at_only, reply))
+        self.matchers.setdefault(matcher, []).append(key)
+
+    def remove(self, matcher: EventHandlers.Matcher):
+        """
+        移除一个匹配器的所有命令前缀
+        Args:
+            matcher: 匹配器
+        """
+        for key in self.matchers.pop(matcher, ()):
+            path = [self.root]
+            for char in key:
+                node = path[-1].children.get(char)
+                if node is None:
+                    break
+                path.append(node)
+            else:
+                node = path[-1]
+                # 生成新的列表而不是原地修改，不影响正在遍历该节点的_walk
+                node.entries = [entry for entry in node.entries if entry[0] is not matcher]
+                # 删除不再有用的节点
+                for char, parent in zip(reversed(key), reversed(path[:-1])):
+                    if node.entries or node.children:
+                        break
+                    del parent.children[char]
+                    node = parent
+
+    def add_command_rule(self, rule: EventHandlers.CommandRule, matcher: EventHandlers.Matcher):
+        """
+        索引一个命令规则
+        Args:
+            rule: 命令规则
+            matcher: 规则所属的匹配器
+        """
+        for name in [rule.command, *rule.aliases]:
+            for start in rule.command_start:
+                self.insert(start + name, matcher, False, rule.reply)
+            # 消息前面有at时不需要命令起始符
+            self.insert(name, matcher, True, rule.reply)
+
+    def _walk(self, head: str, has_more: bool) -> Generator[tuple[EventHandlers.Matcher, bool, bool], None, None]:
+        """
+        获取所有可能是消息前缀的命令前缀对应的条目
+        Args:
+            head: 消息的开头部分
+            has_more: 消息是否可能比开头部分更长
+        """
+        node = self.root
+        yield from node.entries
+        for char in head:
+            node = node.children.get(char)
+            if node is None:
+                return
+            yield from node.entries
+        if has_more:
+            # 消息的开头部分已走完，但后面还有内容，以它为前缀的命令前缀都可能匹配
+            stack = list(node.children.values())
+            while stack:
+                node = stack.pop()
+                yield from node.entries
+                stack.extend(node.children.values())
+
+    def lookup(self, event_data: CommandEvent) -> set[EventHandlers.Matcher]:
+        """
+        查找可能匹配消息的匹配器（结果可能多于实际匹配的匹配器，但不会遗漏）
+        Args:
+            event_data: 事件数据
+        Returns:
+            可能匹配的匹配器
+        """
+        segments = event_data.message.rich_array
+        views = [(segments, False)]
+        if segments and isinstance(segments[0], QQRichText.Reply):
+            # 仅可包含回复的命令规则会去除开头的回复消息段
+            views.append((segments[1:], True))
+
+        candidates = set()
+        for view, reply_removed in views:
+            is_at = (
+                    len(view) > 0 and
+                    isinstance(view[0], QQRichText.At) and
+                    str(view[0].data.get("qq")) == str(event_data.self_id)
+            )
+            if is_at:
+                view = view[1:]
+            head, has_more = EventHandlers.CommandRule.get_command_head(view)
+            for matcher, at_only, reply in self._walk(head, has_more):
+                if (at_only and not is_at) or (reply_removed and not reply):
+                    continue
+                candidates.add(matcher)
+        return candidates
+
+
+_command_trie = _CommandTrie()
+# (按优先级排序后的匹配器, 匹配器在其中的位置, 未被前缀树索引的匹配器的位置)
+_matchers_snapshot: tuple[list[EventHandlers.Matcher], dict[EventHandlers.Matcher, int], list[int]] = ([], {}, [])
+
+
+def _rebuild_matchers_snapshot():
+    """
+    重新生成按优先级排序的匹配器快照（优先级相同时按注册顺序，需持有_matchers_lock）
+    """
+    global _matchers_snapshot
+    sorted_matchers = [matcher for _, matcher in sorted(_matchers, key=lambda x: x[0], reverse=True)]
+    ranks = {matcher: rank for rank, matcher in enumerate(sorted_matchers)}
+    unindexed_ranks = [rank for rank, matcher in enumerate(sorted_matchers) if matcher not in _command_trie.matchers]
+    _matchers_snapshot = (sorted_matchers, ranks, unindexed_ranks)
+
+
+def register_matcher(matcher: EventHandlers.Matcher, priority: int = 0):
+    """
+    注册命令匹配器（on_command会自动注册），匹配器的命令规则会被加入命令前缀树
+    Args:
+        matcher: 匹配器
+        priority: 优先级
+    """
+    with _matchers_lock:
+        for rule in matcher.rules:
+            # 匹配器的所有规则都需要匹配，因此按其中任意一个命令规则索引都不会遗漏
+            if type(rule) is EventHandlers.CommandRule:
+                _command_trie.add_command_rule(rule, matcher)
+        _matchers.append((priority, matcher))
+        _rebuild_matchers_snapshot()
+
+
+def unregister_matcher(matcher: EventHandlers.Matcher):
+    """
+    注销命令匹配器
+    Args:
+        matcher: 匹配器
+    Raises:
+        ValueError: 匹配器未注册
+    """
+    with _matchers_lock:
+        remaining = [item for item in _matchers if item[1] is not matcher]
+        if len(remaining) == len(_matchers):
+            raise ValueError(f"匹配器 {matcher} 未注册")
+        _matchers[:] = remaining
+        _command_trie.remove(matcher)
+        _rebuild_matchers_snapshot()
+
+
+def get_matchers() -> list[tuple[int, EventHandlers.Matcher]]:
+    """
+    获取已注册的命令匹配器
+    Returns:
+        (优先级, 匹配器) 列表的副本
+    """
+    with _matchers_lock:
+        return list(_matchers)
 
 
 def _on_event(event_data):
-    for priority, matcher in sorted(matchers, key=lambda x: x[0], reverse=True):
-        matcher_event_data = event_data.__class__(event_data.event_data)
+    sorted_matchers, ranks, unindexed_ranks = _matchers_snapshot
+    candidate_ranks = set(unindexed_ranks)
+    # 前缀树可能正在被修改，不在快照中的匹配器（刚注册或刚注销）需要跳过
+    candidate_ranks.update(ranks[matcher] for matcher in _command_trie.lookup(event_data) if matcher in ranks)
+
+    for rank in sorted(candidate_ranks):
+        matcher = sorted_matchers[rank]
+        # 每个匹配器使用事件的浅拷贝，规则对事件的修改（例如CommandRule改写message）不会影响其他匹配器
+        matcher_event_data = event_data.fork()
         is_match, rules_kwargs = matcher.check_match(matcher_event_data)
         if is_match:
             matcher.match(matcher_event_data, rules_kwargs)
@@ -346,10 +547,11 @@ def on_command(command: str,
     """
     if rules is None:
         rules = []
-    rules += [EventHandlers.CommandRule(command, aliases, command_start, reply, no_args)]
+    command_rule = EventHandlers.CommandRule(command, aliases, command_start, reply, no_args)
+    rules += [command_rule]
     if any(not isinstance(rule, EventHandlers.Rule) for rule in rules):
         raise TypeError("rules must be a list of Rule")
     plugin_data = PluginManager.get_caller_plugin_data()
     events_matcher = CommandMatcher(plugin_data, rules)
-    matchers.append((priority, events_matcher))
+    register_matcher(events_matcher, priority)
     return events_matcher
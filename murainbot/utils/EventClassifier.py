@@ -2,12 +2,16 @@
 事件分发器
 """
 
-from typing import TypedDict, NotRequired, Literal
+import collections
+import functools
+import threading
+from typing import TypedDict, NotRequired, Literal, Any
 
-from ..core import EventManager, ListenerServer
+from ..core import EventManager, ListenerServer, ConfigManager
 from . import QQRichText, QQDataCacher, Logger
 
 logger = Logger.get_logger()
+config = ConfigManager.GlobalConfig()
 
 
 class Event(EventManager.Event):
@@ -43,6 +47,16 @@ class Event(EventManager.Event):
     def __repr__(self):
         return str(self.event_data)
 
+    def fork(self):
+        """
+        创建此事件对象的浅拷贝（不会重新执行__init__），对新对象属性的重新赋值不会影响原对象
+        Returns:
+            新的事件对象
+        """
+        event = object.__new__(self.__class__)
+        event.__dict__.update(self.__dict__)
+        return event
+
     def logger(self):
         """
         发送事件日志
@@ -61,6 +75,127 @@ class EventData(TypedDict):
 
 events: list[EventData] = []
 
+# 用于区分事件类型的字段，构建索引时优先按此顺序分支，其余字段按名称排序
+DISCRIMINATING_KEYS = ["message_type", "notice_type", "request_type", "meta_event_type", "sub_type"]
+
+
+class _EventIndexNode:
+    """
+    事件分类索引的节点，在key字段上分支
+    """
+    __slots__ = ("key", "branches", "wildcard", "unhashable", "matched")
+
+    def __init__(self):
+        self.key: str | None = None  # 分支的字段，为None时为叶子节点
+        self.branches: dict[Any, _EventIndexNode] = {}  # 字段值 -> 子节点
+        self.wildcard: _EventIndexNode | None = None  # 不限制此字段的事件类型
+        self.unhashable: list[tuple[int, type[Event], dict]] = []  # 规则值不可哈希，只能逐条比较的事件类型
+        self.matched: list[tuple[int, type[Event]]] = []  # 到达此节点即匹配的事件类型
+
+
+def _build_index_node(entries: list[tuple[int, type[Event], dict]]) -> _EventIndexNode:
+    """
+    构建事件分类索引的节点
+    Args:
+        entries: (注册顺序, 事件类型, 剩余规则)
+    Returns:
+        节点
+    """
+    node = _EventIndexNode()
+    remaining_entries = []
+    for index, cls, rules in entries:
+        if rules:
+            remaining_entries.append((index, cls, rules))
+        else:
+            node.matched.append((index, cls))
+    if not remaining_entries:
+        return node
+
+    keys = {key for _, _, rules in remaining_entries for key in rules}
+    node.key = next((key for key in DISCRIMINATING_KEYS if key in keys), None) or min(keys)
+
+    branches: dict[Any, list[tuple[int, type[Event], dict]]] = {}
+    wildcard = []
+    for index, cls, rules in remaining_entries:
+        if node.key not in rules:
+            wildcard.append((index, cls, rules))
+            continue
+        try:
+            branches.setdefault(rules[node.key], []).append(
+                (index, cls, {k: v for k, v in rules.items() if k != node.key})
+            )
+        except TypeError:
+            node.unhashable.append((index, cls, rules))
+    node.branches = {value: _build_index_node(branch) for value, branch in branches.items()}
+    if wildcard:
+        node.wildcard = _build_index_node(wildcard)
+    return node
+
+
+def _lookup_index_node(node: _EventIndexNode, event_data: dict, matched: list[tuple[int, type[Event]]]):
+    """
+    在索引中查找匹配的事件类型
+    Args:
+        node: 节点
+        event_data: 事件数据
+        matched: 匹配到的(注册顺序, 事件类型)，结果会添加到此列表中
+    """
+    matched.extend(node.matched)
+    if node.key is None:
+        return
+    if node.key in event_data:
+        try:
+            child = node.branches.get(event_data[node.key])
+        except TypeError:
+            child = None
+        if child is not None:
+            _lookup_index_node(child, event_data, matched)
+        for index, cls, rules in node.unhashable:
+            if all(k in event_data and event_data[k] == v for k, v in rules.items()):
+                matched.append((index, cls))
+    if node.wildcard is not None:
+        _lookup_index_node(node.wildcard, event_data, matched)
+
+
+# post_type -> 索引根节点，在register_event时重建
+_event_index: dict[str, _EventIndexNode] = {}
+_event_index_size = 0
+
+
+def _rebuild_event_index():
+    """
+    重建事件分类索引
+    """
+    global _event_index, _event_index_size
+    entries: dict[str, list[tuple[int, type[Event], dict]]] = {}
+    for index, event_cls_data in enumerate(events):
+        entries.setdefault(event_cls_data["post_type"], []).append(
+            (index, event_cls_data["cls"], event_cls_data["rules"])
+        )
+    _event_index = {post_type: _build_index_node(entry) for post_type, entry in entries.items()}
+    _event_index_size = len(events)
+
+
+def get_event_classes(event_data: dict) -> list[type[Event]]:
+    """
+    获取与事件数据匹配的所有已注册的事件类型
+    Args:
+        event_data: 事件数据
+    Returns:
+        匹配的事件类型，按注册顺序排列
+    """
+    if _event_index_size != len(events):
+        # events被直接修改过
+        _rebuild_event_index()
+    root = _event_index.get(event_data["post_type"])
+    if root is None:
+        return []
+    matched = []
+    _lookup_index_node(root, event_data, matched)
+    if len(matched) > 1:
+        matched.sort(key=lambda item: item[0])
+    return [cls for _, cls in matched]
+
 
 def register_event(post_type: str, **other_rules):
     """
@@ -85,6 +220,7 @@ def register_event(post_type: str, **other_rules):
             "rules": other_rules
         }
         events.append(data)
+        _rebuild_event_index()
         return cls
 
     return decorator
@@ -124,6 +260,39 @@ class GroupSenderDict(TypedDict, total=False):
     title: NotRequired[str]
 
 
+# 最近解析过的消息，键为事件数据的id，值中保留事件数据本身的引用以保证id不会被复用
+_message_cache: collections.OrderedDict[int, tuple[dict, QQRichText.QQRichText]] = collections.OrderedDict()
+_message_cache_lock = threading.Lock()
+MESSAGE_CACHE_SIZE = 256
+
+
+def _get_parsed_message(event_data: dict) -> QQRichText.QQRichText:
+    """
+    获取事件数据中解析后的消息，同一份事件数据只解析一次
+    Args:
+        event_data: 事件数据
+    Returns:
+        解析后的消息（多个事件对象共用，请勿直接修改）
+    """
+    key = id(event_data)
+    with _message_cache_lock:
+        cached = _message_cache.get(key)
+        if cached is not None and cached[0] is event_data:
+            _message_cache.move_to_end(key)
+            return cached[1]
+
+    if "message" not in event_data:
+        raise KeyError(f"message not in {event_data}")
+    message = QQRichText.QQRichText(event_data["message"])
+
+    with _message_cache_lock:
+        _message_cache[key] = (event_data, message)
+        _message_cache.move_to_end(key)
+        while len(_message_cache) > MESSAGE_CACHE_SIZE:
+            _message_cache.popitem(last=False)
+    return message
+
+
 # 注册事件类
 @register_event("message")
 class MessageEvent(Event):
@@ -136,11 +305,33 @@ class MessageEvent(Event):
         self.message_type = self["message_type"]
         self.user_id: int = int(self["user_id"])
         self.sub_type: str = self["sub_type"]
-        self.message: QQRichText.QQRichText = QQRichText.QQRichText(self["message"])
         self.raw_message: str = self["raw_message"]
         self.message_id: int = int(self["message_id"])
         self.sender: SenderDict = self["sender"]
 
+    @property
+    def message(self) -> QQRichText.QQRichText:
+        """
+        消息内容，首次访问时才会解析，由同一份事件数据创建的事件对象共用解析结果
+        """
+        message = self.__dict__.get("_message")
+        if message is None:
+            # 套一层新的QQRichText，使对消息段列表的修改不会影响其他事件对象
+            message = QQRichText.QQRichText(_get_parsed_message(self.event_data))
+            self._message = message
+        return message
+
+    @message.setter
+    def message(self, value: QQRichText.QQRichText):
+        self._message = value
+
+    def fork(self):
+        event = super().fork()
+        if "_message" in self.__dict__:
+            # 已经访问过message时同样套一层新的QQRichText，避免共用同一个消息段列表
+            event._message = QQRichText.QQRichText(self._message)
+        return event
+
     @property
     def is_group(self) -> bool:
         """
@@ -1103,6 +1294,22 @@ class HeartbeatMetaEvent(MetaEvent):
         logger.debug(f"收到心跳包")
 
 
+@functools.lru_cache(maxsize=256)
+def _get_leaf_event_classes(matched_classes: tuple[type[Event], ...]) -> tuple[type[Event], ...]:
+    """
+    获取匹配到的事件类型中不是其他匹配到的类型的父类的类型（即继承链的末端）
+    Args:
+        matched_classes: 匹配到的事件类型
+    Returns:
+        继承链末端的事件类型，一个都没有时为(Event,)
+    """
+    leaf_classes = tuple(
+        cls for cls in matched_classes
+        if not any(other is not cls and issubclass(other, cls) for other in matched_classes)
+    )
+    return leaf_classes or (Event,)
+
+
 @EventManager.event_listener(ListenerServer.EscalationEvent)
 def on_escalation(event_data):
     """
@@ -1113,23 +1320,29 @@ def on_escalation(event_data):
         None
     """
     event_data = event_data.event_data
-    event = Event(event_data)
-    event_call_list = [event]
+    matched_classes = get_event_classes(event_data)
+
+    if config.event.mro_dispatch:
+        # 只为继承链的末端创建事件对象，由其触发父类事件的监听器
+        event_call_list = [cls(event_data) for cls in _get_leaf_event_classes(tuple(matched_classes))]
+    else:
+        event_call_list = [Event(event_data)] + [cls(event_data) for cls in matched_classes]
+
     matched_event = False
-    for event_cls_data in events:
-        if (
-                event_data["post_type"] == event_cls_data['post_type'] and
-                all(k in event_data and event_data[k] == v for k, v in event_cls_data['rules'].items())
-        ):
-            event = event_cls_data['cls'](event_data)
-            if not matched_event:
-                if event.logger() is not False:
-                    matched_event = True
-            event_call_list.append(event)
+    for event in event_call_list:
+        if event.logger() is not False:
+            matched_event = True
+            break
 
     if not matched_event:
         logger.warning(f"未知的上报事件: {event_data}")
 
     # 广播事件
-    for event in event_call_list:
-        event.call()
+    if config.event.mro_dispatch:
+        called_classes = frozenset()
+        for event in event_call_list:
+            event.call_mro(called_classes)
+            called_classes |= frozenset(event.__class__.__mro__)
+    else:
+        for event in event_call_list:
+            event.call()
@@ -1,7 +1,6 @@
 """
 事件处理器
 """
-import copy
 from typing import Literal, Callable, Any, Type
 
 from murainbot.common import inject_dependencies, exc_logger
@@ -191,14 +190,52 @@ class CommandRule(Rule):
         self.reply = reply
         self.no_args = no_args
 
+    @staticmethod
+    def get_command_head(segments: list[QQRichText.Segment]) -> tuple[str, bool]:
+        """
+        根据第一个消息段获取消息转换为字符串后的开头部分，用于快速判断命令前缀
+        Args:
+            segments: 去除回复和@机器人后的消息段
+        Returns:
+            开头部分, 消息是否可能比开头部分更长（为真时以开头部分为前缀的命令也可能匹配）
+        """
+        if not segments:
+            return "", False
+        if isinstance(segments[0], QQRichText.Text):
+            # 与strip一致，第一个文本消息段两端的空白都会被去除
+            head = segments[0].text.strip()
+            if not head:
+                # 空白的文本消息段会在strip时被移除，无法只通过它判断
+                return "", True
+            return QQRichText.cq_encode(head), len(segments) > 1
+        # 其他消息段转换为CQ码后都以[开头
+        return "[", True
+
+    @staticmethod
+    def _may_match(segments: list[QQRichText.Segment], commands: list[str]) -> bool:
+        """
+        根据第一个消息段判断消息是否可能以某个命令前缀开始
+        只会排除一定不匹配的消息，返回True时仍需完整匹配
+        Args:
+            segments: 去除回复和@机器人后的消息段
+            commands: 所有可能的命令前缀
+        Returns:
+            是否可能匹配
+        """
+        head, has_more = CommandRule.get_command_head(segments)
+        return any(
+            head.startswith(command) or (has_more and command.startswith(head))
+            for command in commands
+        )
+
     def match(self, event_data: EventClassifier.MessageEvent):
         # 检查是否是消息事件
         if not isinstance(event_data, EventClassifier.MessageEvent):
             logger.warning(f"event {event_data} is not a MessageEvent, cannot match command")
             return False
 
-        # 复制一份消息段
-        segments = copy.deepcopy(event_data.message.rich_array)
+        # 消息段不会被修改，无需复制
+        segments = event_data.message.rich_array
 
         # 初始化是否@了机器人以及回复消息段的变量
         is_at = False
@@ -222,8 +259,6 @@ class CommandRule(Rule):
             segments = segments[1:]
             is_at = True
 
-        string_message = str(QQRichText.QQRichText(*segments).strip())
-
         # 生成所有可能的命令前缀组合，包括命令起始符和别名
         commands = [_ + self.command for _ in self.command_start]
         if is_at:
@@ -233,6 +268,12 @@ class CommandRule(Rule):
         # 添加所有别名的命令前缀组合
         commands += [_ + alias for alias in self.aliases for _ in self.command_start]
 
+        # 先只用第一个消息段预检查命令前缀，不匹配的消息无需生成整条消息的字符串
+        if not self._may_match(segments, commands):
+            return False
+
+        string_message = str(QQRichText.QQRichText(*segments).strip())
+
         if self.no_args:
             # 检查消息是否以任何预设命令前缀开始
             if any(string_message == _ for _ in commands):
@@ -414,9 +455,11 @@ class Matcher:
 events_matchers: dict[str, dict[Type[EventClassifier.Event], list[tuple[int, Matcher]]]] = {}
 
 
-def _on_event(event_data, path):
-    for priority, matcher in sorted(events_matchers[path][event_data.__class__], key=lambda x: x[0], reverse=True):
-        matcher_event_data = event_data.__class__(event_data.event_data)
+def _on_event(event_data, path, registered_class):
+    # 按继承关系分发时event_data可能是registered_class的子类，因此需要使用注册时的事件类型查找匹配器
+    for priority, matcher in sorted(events_matchers[path][registered_class], key=lambda x: x[0], reverse=True):
+        # 每个匹配器使用事件的浅拷贝，规则对事件的修改（例如CommandRule改写message）不会影响其他匹配器
+        matcher_event_data = event_data.fork()
         is_match, rules_kwargs = matcher.check_match(matcher_event_data)
         if is_match:
             matcher.match(matcher_event_data, rules_kwargs)
@@ -444,7 +487,7 @@ def on_event(event: Type[EventClassifier.Event], priority: int = 0, rules: list[
         events_matchers[path] = {}
     if event not in events_matchers[path]:
         events_matchers[path][event] = []
-        EventManager.event_listener(event, path=path)(_on_event)
+        EventManager.event_listener(event, path=path, registered_class=event)(_on_event)
     events_matcher = Matcher(plugin_data, rules)
     events_matchers[path][event].append((priority, events_matcher))
     return events_matcher
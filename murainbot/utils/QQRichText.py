@@ -4,17 +4,23 @@ QQ富文本
 from __future__ import annotations
 
 import inspect
-import json
 import os
 import re
-from copy import deepcopy
+from copy import copy, deepcopy
 from pathlib import Path, PureWindowsPath
-from typing import Generator, Literal
+from types import MappingProxyType
+from typing import Callable, Generator, Literal
 
 from murainbot.common import save_exc_dump
-from murainbot.core import ConfigManager
+from murainbot.core import ConfigManager, JsonCodec
 from murainbot.utils import QQDataCacher, Logger
 
+try:
+    # 可选的C扩展，未编译时使用纯Python实现
+    from murainbot.utils import _cqcode
+except ImportError:
+    _cqcode = None
+
 logger = Logger.get_logger()
 
 # URL正则，参考 RFC 3986
@@ -42,6 +48,8 @@ def cq_decode(text, in_cq: bool = False) -> str:
     Returns:
         解码后的文本
     """
+    if _cqcode is not None:
+        return _cqcode.cq_decode(text, in_cq)
     text = str(text)
     if in_cq:
         return text.replace("&amp;", "&").replace("&#91;", "["). \
@@ -60,6 +68,8 @@ def cq_encode(text, in_cq: bool = False) -> str:
     Returns:
         编码后的文本
     """
+    if _cqcode is not None:
+        return _cqcode.cq_encode(text, in_cq)
     text = str(text)
     if in_cq:
         return text.replace("&", "&amp;").replace("[", "&#91;"). \
@@ -86,6 +96,71 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
     if not isinstance(cq, str):
         raise TypeError("cq_2_array: 输入类型错误")
 
+    try:
+        if _cqcode is not None:
+            return _cqcode.cq_2_array(cq)
+        return _cq_2_array_fast(cq)
+    except ValueError:
+        # 格式错误时使用逐字符解析，以给出详细的错误位置
+        return _cq_2_array_by_char(cq)
+
+
+def _cq_2_array_fast(cq: str) -> list[dict[str, dict[str, str]]]:
+    """
+    使用str.find按块扫描CQCode字符串，结果与逐字符解析完全一致
+    Args:
+        cq: CQCode字符串
+    Returns:
+        解析后的消息段数组
+    Raises:
+        ValueError: 格式错误（不包含错误位置信息）
+    """
+    cq_array = []
+    pos = 0
+    length = len(cq)
+    while pos < length:
+        cq_start_pos = cq.find("[", pos)
+        if cq_start_pos == -1:
+            cq_start_pos = length
+        if cq_start_pos > pos:
+            text = cq[pos:cq_start_pos]
+            if "]" in text:
+                raise ValueError("cq_2_array: 文本块中包含非法字符: ']'")
+            cq_array.append({"type": "text", "data": {"text": cq_decode(text)}})
+        if cq_start_pos == length:
+            break
+
+        cq_end_pos = cq.find("]", cq_start_pos + 1)
+        if cq_end_pos == -1:
+            raise ValueError("cq_2_array: CQ 码未正确结束")
+        cq_body = cq[cq_start_pos + 1:cq_end_pos]
+        if "[" in cq_body:
+            raise ValueError("cq_2_array: CQ 码中包含非法字符 '['")
+
+        segment_type, *params = cq_body.split(",")
+        if not segment_type.startswith("CQ:") or len(segment_type) == 3:
+            raise ValueError("cq_2_array: CQ 码类型错误")
+        cq_data = {}
+        for param in params:
+            key, sep, value = param.partition("=")
+            if not sep or not key or key in cq_data:
+                raise ValueError("cq_2_array: CQ 码参数错误")
+            cq_data[key] = cq_decode(value, in_cq=True)
+        cq_array.append({"type": segment_type[3:], "data": cq_data})
+        pos = cq_end_pos + 1
+    return cq_array
+
+
+def _cq_2_array_by_char(cq: str) -> list[dict[str, dict[str, str]]]:
+    """
+    逐字符解析CQCode字符串，出错时给出详细的错误位置
+    Args:
+        cq: CQCode字符串
+    Returns:
+        解析后的消息段数组
+    Raises:
+        ValueError: 如果解析过程中遇到格式错误，包含错误位置信息。
+    """
     cq_array = []
     now_state = 0  # 当前解析状态
     # 0: 不在CQ码内 (初始/普通文本)
@@ -100,9 +175,14 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
     now_segment_type = ""  # 存储当前 CQ 码的完整类型部分 (包括 CQ:) 或处理后的类型
     cq_start_pos = -1  # 记录当前 CQ 码 '[' 的位置
 
+    def error_context():
+        # 仅在出错时生成错误位置信息
+        return f"在字符 {i} ('{c}') 附近"
+
+    def cq_error_context():
+        return f"在起始于字符 {cq_start_pos} 的 CQ 码中，{error_context()}"
+
     for i, c in enumerate(cq):
-        error_context = f"在字符 {i} ('{c}') 附近"
-        cq_error_context = f"在起始于字符 {cq_start_pos} 的 CQ 码中，{error_context}"
 
         if now_state == 0:  # 解析普通文本
             if cq_start_pos == -1:  # 文本块开始
@@ -122,18 +202,18 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
                 now_key = ""
                 now_value = ""
             elif c == "]":
-                raise ValueError(f"cq_2_array: {error_context}: 文本块中包含非法字符: ']'")
+                raise ValueError(f"cq_2_array: {error_context()}: 文本块中包含非法字符: ']'")
             else:
                 segment_data["text"] += c  # 继续拼接普通文本
 
         elif now_state == 1:  # 解析类型 (包含 [CQ: 前缀)
             if c == ",":  # 类型解析结束，进入参数键解析
                 if not now_segment_type.startswith("CQ:"):
-                    raise ValueError(f"cq_2_array: {cq_error_context}: 期望 'CQ:' 前缀，但得到 '{now_segment_type}'")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: 期望 'CQ:' 前缀，但得到 '{now_segment_type}'")
 
                 actual_type = now_segment_type[3:]
                 if not actual_type:
-                    raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码类型不能为空")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码类型不能为空")
 
                 now_segment_type = actual_type  # 保存处理后的类型名
                 now_state = 2  # 进入参数键解析状态
@@ -142,18 +222,18 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
                 if not now_segment_type.startswith("CQ:"):
                     # 如果不是 CQ: 开头，根据严格程度，可以报错或当作普通文本处理
                     # 这里我们严格处理，既然进入了状态1，就必须是 CQ: 开头
-                    raise ValueError(f"cq_2_array: {cq_error_context}: 期望 'CQ:' 前缀，但得到 '{now_segment_type}'")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: 期望 'CQ:' 前缀，但得到 '{now_segment_type}'")
 
                 actual_type = now_segment_type[3:]
                 if not actual_type:
-                    raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码类型不能为空")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码类型不能为空")
 
                 # 存入无参数的 CQ 码段
                 cq_array.append({"type": actual_type, "data": {}})  # data 为空
                 now_state = 0  # 回到初始状态
                 cq_start_pos = -1  # 重置
             elif c == '[':  # 类型名中不应包含未转义的 '['
-                raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码类型 '{now_segment_type}' 中包含非法字符 '['")
+                raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码类型 '{now_segment_type}' 中包含非法字符 '['")
             else:
                 # 继续拼接类型部分 (此时包含 CQ:)
                 now_segment_type += c
@@ -161,21 +241,21 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
         elif now_state == 2:  # 解析参数键 (key)
             if c == "=":  # 键名解析结束，进入值解析
                 if not now_key:
-                    raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码参数键不能为空")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码参数键不能为空")
 
                 # 检查键名重复 (键名通常不解码，或按需解码)
                 # decoded_key = cq_decode(now_key, in_cq=True) # 如果键名需要解码
                 decoded_key = now_key  # 假设键名不解码
                 if decoded_key in current_cq_data:
-                    raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码参数键 '{decoded_key}' 重复")
+                    raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码参数键 '{decoded_key}' 重复")
 
                 now_key = decoded_key  # 保存解码后（或原始）的键名
                 now_state = 3  # 进入参数值解析状态
                 now_value = ""  # 准备解析值
             elif c == "," or c == "]":  # 在键名后遇到逗号或方括号是错误的
-                raise ValueError(f"cq_2_array: {cq_error_context}: 在参数键 '{now_key}' 后期望 '='，但遇到 '{c}'")
+                raise ValueError(f"cq_2_array: {cq_error_context()}: 在参数键 '{now_key}' 后期望 '='，但遇到 '{c}'")
             elif c == '[':  # 键名中不应包含未转义的 '[' (根据规范，& 和 , 也应转义，但这里简化检查)
-                raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码参数键 '{now_key}' 中包含非法字符 '['")
+                raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码参数键 '{now_key}' 中包含非法字符 '['")
             else:
                 now_key += c  # 继续拼接键名
 
@@ -194,7 +274,7 @@ def cq_2_array(cq: str) -> list[dict[str, dict[str, str]]]:
                 now_state = 0  # 回到初始状态
                 cq_start_pos = -1  # 重置
             elif c == '[':  # 值中不应出现未转义的 '['
-                raise ValueError(f"cq_2_array: {cq_error_context}: CQ 码参数值 '{now_value}' 中包含非法字符 '['")
+                raise ValueError(f"cq_2_array: {cq_error_context()}: CQ 码参数值 '{now_value}' 中包含非法字符 '['")
             else:
                 now_value += c  # 继续拼接值 (转义由 cq_decode 处理)
 
@@ -232,6 +312,12 @@ def array_2_cq(cq_array: list[dict[str, dict[str, str]]] | dict[str, dict[str, s
     Returns:
         CQCode
     """
+    if _cqcode is not None:
+        # C扩展只处理常见的输入，其余情况（包括格式错误）返回None，交给下面的Python实现
+        text = _cqcode.array_2_cq(cq_array)
+        if text is not None:
+            return text
+
     # 特判
     if isinstance(cq_array, dict):
         cq_array = [cq_array]
@@ -336,6 +422,96 @@ def convert_to_fileurl(input_str: str | os.PathLike) -> str:
 
 segments = []
 segments_map: dict[str, type[Segment]] = {}
+# 各消息段类从seg_dict创建实例的函数，在SegmentMeta注册时预先计算
+_seg_dict_constructors: dict[type[Segment], Callable[[dict], Segment]] = {}
+
+class _MissingType:
+    """
+    表示消息段字典中不存在该键
+    消息段的槽中可能保存该对象，因此复制和序列化后必须仍是同一个对象，否则无法通过 is 判断
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return "_MISSING"
+
+    def __reduce__(self):
+        return "_MISSING"
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+_MISSING = _MissingType()
+
+# 可以直接共享而无需复制的值类型
+_IMMUTABLE_VALUE_TYPES = (str, int, float, bool, type(None))
+
+
+def _copy_seg_dict(seg_dict: dict) -> dict:
+    """
+    复制seg_dict
+    绝大多数消息段的值都是不可变的，此时只需复制两层字典，否则回退到深拷贝
+    Args:
+        seg_dict: 输入的seg_dict
+    Returns:
+        独立的seg_dict副本
+    """
+    res = {}
+    for key, value in seg_dict.items():
+        if isinstance(value, _IMMUTABLE_VALUE_TYPES):
+            res[key] = value
+        elif key == "data" and isinstance(value, dict) and all(
+                isinstance(v, _IMMUTABLE_VALUE_TYPES) for v in value.values()):
+            res[key] = value.copy()
+        else:
+            return deepcopy(seg_dict)
+    return res
+
+
+def _build_seg_dict_constructor(cls: type[Segment]) -> Callable[[dict], Segment]:
+    """
+    生成从seg_dict创建cls实例的函数
+    cls实现了creat_from_seg_dict时直接使用它，否则根据__init__的参数自动匹配（参数只在这里解析一次）
+    Args:
+        cls: 消息段类
+    Returns:
+        接收seg_dict并返回消息段对象的函数
+    """
+    creat_from_seg_dict = cls.creat_from_seg_dict
+    if getattr(creat_from_seg_dict, "__func__", creat_from_seg_dict) is not Segment.creat_from_seg_dict.__func__:
+        return cls.creat_from_seg_dict
+
+    logger.warning(f"{cls}的creat_from_seg_dict方法未实现，回退到__init__自动匹配初始化")
+
+    # (参数名, 参数名不在data中时使用的data键, 默认值)
+    plan = []
+    for name, param in inspect.signature(cls).parameters.items():
+        if name == "id_":
+            fallback_key = "id"
+        elif name == "type_":
+            fallback_key = "type"
+        else:
+            fallback_key = None
+        default = param.default if param.default is not param.empty else _MISSING
+        plan.append((name, fallback_key, default))
+
+    def constructor(seg_dict: dict) -> Segment:
+        data = seg_dict.get("data", {})
+        kwargs = {}
+        for name, fallback_key, default in plan:
+            if name in data:
+                kwargs[name] = data[name]
+            elif fallback_key is not None:
+                kwargs[name] = data.get(fallback_key)
+            elif default is not _MISSING:
+                kwargs[name] = default
+        return cls(**kwargs)
+
+    return constructor
 
 
 class SegmentMeta(type):
@@ -356,31 +532,90 @@ class SegmentMeta(type):
 
                 segments.append(cls)
                 segments_map[cls.segment_type] = cls
+                _seg_dict_constructors[cls] = _build_seg_dict_constructor(cls)
 
 
 class Segment(metaclass=SegmentMeta):
     """
     消息段
+    消息段在QQRichText之间是共享的（QQRichText的拼接、add、strip等操作不会复制消息段），
+    因此消息段放入QQRichText后会被冻结，无法再修改，如需修改请先使用copy()复制
     """
+    # 消息段数量可能很多（如插件缓存的历史消息），因此不保存完整的消息段字典，
+    # 而是把type和data分别存放在__slots__中，需要字典形式时再临时组装（见_seg_dict）
+    # 子类也应声明__slots__，否则仍会为实例创建__dict__
+    __slots__ = ("_type", "_data", "_extra", "_frozen")
     segment_type = None
     _register = True
 
     def __init__(self, cq: str | dict[str, dict[str, str]] | Segment):
-        # 统一处理输入，最终得到 _seg_dict
+        # 统一处理输入，最终得到消息段字典
         if isinstance(cq, str):
             array = cq_2_array(cq)
             if len(array) != 1:
                 raise ValueError("cq_2_array: 输入 CQ 码格式错误")
-            self._seg_dict = array[0]
+            self._load_seg_dict(array[0])
         elif isinstance(cq, dict):
-            # 进行深拷贝，防止外部修改传入的字典影响到对象内部状态
-            self._seg_dict = deepcopy(cq)
+            # 进行拷贝，防止外部修改传入的字典影响到对象内部状态
+            self._load_seg_dict(_copy_seg_dict(cq))
         elif isinstance(cq, Segment):
             # 访问seg_dict，创建一个完全独立的Segment副本
-            self._seg_dict = cq.seg_dict
+            self._load_seg_dict(cq.seg_dict)
         else:
             raise TypeError("Segment: 输入类型错误")
 
+    def _load_seg_dict(self, seg_dict: dict):
+        """
+        将消息段字典拆分保存到各个槽中，调用方需保证seg_dict不会再被外部修改
+        Args:
+            seg_dict: 消息段字典
+        """
+        self._type = seg_dict.get("type", _MISSING)
+        self._data = seg_dict.get("data", _MISSING)
+        if len(seg_dict) > (self._type is not _MISSING) + (self._data is not _MISSING):
+            # 除type和data外的其他键（很少见）
+            self._extra = {k: v for k, v in seg_dict.items() if k != "type" and k != "data"}
+        else:
+            self._extra = None
+        self._frozen = False
+
+    def _check_mutable(self):
+        """
+        检查消息段是否可以修改
+        Raises:
+            TypeError: 消息段已被冻结
+        """
+        if self._frozen:
+            raise TypeError("Segment: 消息段已被冻结（已放入QQRichText），无法修改，请先使用copy()复制")
+
+    @property
+    def frozen(self) -> bool:
+        """消息段是否已被冻结"""
+        return self._frozen
+
+    def freeze(self) -> Segment:
+        """
+        冻结消息段，冻结后无法再修改（放入QQRichText时会自动冻结）
+        Returns:
+            self
+        """
+        self._frozen = True
+        return self
+
+    @property
+    def _seg_dict(self) -> dict:
+        """
+        组装消息段字典，返回的字典与消息段共享data字典，仅供内部只读使用
+        """
+        seg_dict = {}
+        if self._type is not _MISSING:
+            seg_dict["type"] = self._type
+        if self._data is not _MISSING:
+            seg_dict["data"] = self._data
+        if self._extra:
+            seg_dict.update(self._extra)
+        return seg_dict
+
     @classmethod
     def creat_from_seg_dict(cls, seg_dict: dict[str, dict[str, str]]) -> Segment:
         """
@@ -407,22 +642,27 @@ class Segment(metaclass=SegmentMeta):
     def data(self) -> dict:
         """
         获取data字典。
-        直接返回底层字典中的data字典的引用。
+        直接返回底层字典中的data字典的引用，消息段已被冻结时返回只读视图。
         如果data不存在，则创建并返回一个空字典。
         """
-        return self._seg_dict.setdefault("data", {})
+        if self._frozen:
+            return MappingProxyType({} if self._data is _MISSING else self._data)
+        if self._data is _MISSING:
+            self._data = {}
+        return self._data
 
     @data.setter
     def data(self, value: dict):
         """设置data字典，直接修改底层字典。"""
+        self._check_mutable()
         if not isinstance(value, dict):
             raise TypeError("data 必须是一个字典")
-        self._seg_dict["data"] = value
+        self._data = value
 
     @property
     def seg_dict(self) -> dict:
         """获取当前Segment的字典的拷贝。"""
-        return deepcopy(self._seg_dict)
+        return _copy_seg_dict(self._seg_dict)
 
     def __str__(self):
         return array_2_cq(self._seg_dict)
@@ -439,19 +679,49 @@ class Segment(metaclass=SegmentMeta):
         return self._seg_dict == other._seg_dict
 
     def get(self, key, default=None):
-        return self._seg_dict.get(key, default)
+        if key == "type":
+            value = self._type
+        elif key == "data":
+            value = self._data
+            if self._frozen and value is not _MISSING:
+                value = MappingProxyType(value)
+        elif self._extra:
+            value = self._extra.get(key, _MISSING)
+        else:
+            value = _MISSING
+        return default if value is _MISSING else value
 
     def __getitem__(self, key):
-        return self._seg_dict[key]
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
 
     def __setitem__(self, key, value):
-        self._seg_dict[key] = value
+        self._check_mutable()
+        if key == "type":
+            self._type = value
+        elif key == "data":
+            self._data = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
 
     def __delitem__(self, key):
-        del self._seg_dict[key]
+        self._check_mutable()
+        if self.get(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+        if key == "type":
+            self._type = _MISSING
+        elif key == "data":
+            self._data = _MISSING
+        else:
+            del self._extra[key]
 
     def set_data(self, key, value):
         """设置消息段的Data项。"""
+        self._check_mutable()
         self.data[key] = value
 
     def get_data(self, key, default=None):
@@ -460,11 +730,13 @@ class Segment(metaclass=SegmentMeta):
 
     def copy(self):
         """
-        复制消息段，深拷贝
+        复制消息段，深拷贝，得到的副本未被冻结，可以修改
         Returns:
-            新的Segment对象
+            新的Segment对象（与原消息段类型相同）
         """
-        return Segment(self)
+        segment = copy(self)
+        segment._load_seg_dict(self.seg_dict)
+        return segment
 
     def render(self, group_id: int | None = None):
         """
@@ -484,6 +756,7 @@ class Text(Segment):
     """
     文本
     """
+    __slots__ = ()
     segment_type = "text"
 
     def __init__(self, text: str):
@@ -507,7 +780,7 @@ class Text(Segment):
 
     @text.setter
     def text(self, value: str):
-        self.data["text"] = str(value)
+        self.set_data("text", str(value))
 
     def __bool__(self):
         return bool(self.text)
@@ -520,6 +793,7 @@ class Face(Segment):
     """
     表情
     """
+    __slots__ = ()
     segment_type = "face"
 
     def __init__(self, id_: int | str):
@@ -543,7 +817,7 @@ class Face(Segment):
 
     @id.setter
     def id(self, value: int | str):
-        self.data["id"] = str(value)
+        self.set_data("id", str(value))
 
     def render(self, group_id: int | None = None) -> str:
         return f"[表情: {self.id}]"
@@ -553,6 +827,7 @@ class At(Segment):
     """
     At
     """
+    __slots__ = ()
     segment_type = "at"
 
     def __init__(self, qq: int | str):
@@ -576,7 +851,7 @@ class At(Segment):
 
     @qq.setter
     def qq(self, value: int | str):
-        self.data["qq"] = str(value)
+        self.set_data("qq", str(value))
 
     def render(self, group_id: int | None = None) -> str:
         if self.qq in ["all", "0"]:
@@ -595,6 +870,7 @@ class Image(Segment):
     """
     图片
     """
+    __slots__ = ()
     segment_type = "image"
 
     def __init__(self, file: str):
@@ -619,7 +895,7 @@ class Image(Segment):
 
     @file.setter
     def file(self, value: str):
-        self.data["file"] = convert_to_fileurl(value)
+        self.set_data("file", convert_to_fileurl(value))
 
     def render(self, group_id: int | None = None) -> str:
         return f"[图片: {self.file}]"
@@ -629,6 +905,7 @@ class Record(Segment):
     """
     语音
     """
+    __slots__ = ()
     segment_type = "record"
 
     def __init__(self, file: str):
@@ -652,7 +929,7 @@ class Record(Segment):
 
     @file.setter
     def file(self, value: str):
-        self.data["file"] = convert_to_fileurl(value)
+        self.set_data("file", convert_to_fileurl(value))
 
     def render(self, group_id: int | None = None) -> str:
         return f"[语音: {self.file}]"
@@ -662,6 +939,7 @@ class Video(Segment):
     """
     视频
     """
+    __slots__ = ()
     segment_type = "video"
 
     def __init__(self, file: str):
@@ -685,7 +963,7 @@ class Video(Segment):
 
     @file.setter
     def file(self, value: str):
-        self.data["file"] = convert_to_fileurl(value)
+        self.set_data("file", convert_to_fileurl(value))
 
     def render(self, group_id: int | None = None) -> str:
         return f"[视频: {self.file}]"
@@ -695,6 +973,7 @@ class Rps(Segment):
     """
     猜拳魔法表情
     """
+    __slots__ = ()
     segment_type = "rps"
 
     def __init__(self):
@@ -717,6 +996,7 @@ class Dice(Segment):
     """
     掷骰子魔法表情
     """
+    __slots__ = ()
     segment_type = "dice"
 
     def __init__(self):
@@ -740,6 +1020,7 @@ class Shake(Segment):
     窗口抖动
     (相当于戳一戳最基本类型的快捷方式。)
     """
+    __slots__ = ()
     segment_type = "shake"
 
     def __init__(self):
@@ -762,6 +1043,7 @@ class Poke(Segment):
     """
     戳一戳
     """
+    __slots__ = ()
     segment_type = "poke"
 
     def __init__(self, type_: str | int, id_: str | int):
@@ -786,7 +1068,7 @@ class Poke(Segment):
 
     @poke_type.setter
     def poke_type(self, value: str | int):
-        self.data["type"] = str(value)
+        self.set_data("type", str(value))
 
     @property
     def id(self) -> str:
@@ -794,7 +1076,7 @@ class Poke(Segment):
 
     @id.setter
     def id(self, value: str | int):
-        self.data["id"] = str(value)
+        self.set_data("id", str(value))
 
     def render(self, group_id: int | None = None) -> str:
         return f"[戳一戳: type={self.poke_type}, id={self.id}]"
@@ -804,6 +1086,7 @@ class Anonymous(Segment):
     """
     匿名消息
     """
+    __slots__ = ()
     segment_type = "anonymous"
 
     def __init__(self, ignore: bool = False):
@@ -830,13 +1113,14 @@ class Anonymous(Segment):
 
     @ignore.setter
     def ignore(self, value: bool):
-        self.data["ignore"] = "0" if value else "1"
+        self.set_data("ignore", "0" if value else "1")
 
 
 class Share(Segment):
     """
     链接分享
     """
+    __slots__ = ()
     segment_type = "share"
 
     def __init__(self, url: str, title: str, content: str = "", image: str = ""):
@@ -871,7 +1155,7 @@ class Share(Segment):
 
     @url.setter
     def url(self, value: str):
-        self.data["url"] = str(value)
+        self.set_data("url", str(value))
 
     @property
     def title(self) -> str:
@@ -879,7 +1163,7 @@ class Share(Segment):
 
     @title.setter
     def title(self, value: str):
-        self.data["title"] = str(value)
+        self.set_data("title", str(value))
 
     @property
     def content(self) -> str:
@@ -887,7 +1171,7 @@ class Share(Segment):
 
     @content.setter
     def content(self, value: str):
-        self.data["content"] = str(value)
+        self.set_data("content", str(value))
 
     @property
     def image(self) -> str:
@@ -895,13 +1179,14 @@ class Share(Segment):
 
     @image.setter
     def image(self, value: str):
-        self.data["image"] = str(value)
+        self.set_data("image", str(value))
 
 
 class Contact(Segment):
     """
     推荐好友/推荐群
     """
+    __slots__ = ()
     segment_type = "contact"
 
     def __init__(self, type_: str, id_: str | int):
@@ -924,16 +1209,17 @@ class Contact(Segment):
     def contact_type(self) -> str: return self.data.get("type")
 
     @contact_type.setter
-    def contact_type(self, value: str): self.data["type"] = str(value)
+    def contact_type(self, value: str): self.set_data("type", str(value))
 
     @property
     def id(self) -> str: return self.data.get("id")
 
     @id.setter
-    def id(self, value: str | int): self.data["id"] = str(value)
+    def id(self, value: str | int): self.set_data("id", str(value))
 
 
 class Location(Segment):
+    __slots__ = ()
     segment_type = "location"
 
     def __init__(self, lat: float | str, lon: float | str, title: str = "", content: str = ""):
@@ -968,7 +1254,7 @@ class Location(Segment):
 
     @lat.setter
     def lat(self, value: float | str):
-        self.data["lat"] = str(value)
+        self.set_data("lat", str(value))
 
     @property
     def lon(self) -> str:
@@ -976,7 +1262,7 @@ class Location(Segment):
 
     @lon.setter
     def lon(self, value: float | str):
-        self.data["lon"] = str(value)
+        self.set_data("lon", str(value))
 
     @property
     def title(self) -> str:
@@ -984,7 +1270,7 @@ class Location(Segment):
 
     @title.setter
     def title(self, value: str):
-        self.data["title"] = str(value)
+        self.set_data("title", str(value))
 
     @property
     def content(self) -> str:
@@ -992,7 +1278,7 @@ class Location(Segment):
 
     @content.setter
     def content(self, value: str):
-        self.data["content"] = str(value)
+        self.set_data("content", str(value))
 
 
 class Node(Segment):
@@ -1002,6 +1288,7 @@ class Node(Segment):
     接收时，此消息段不会直接出现在消息事件的 message 中，需通过 get_forward_msg API 获取。
     这是最阴间的消息段之一，tm的Onebot协议，各种转换的细节根本就没定义清楚，感觉CQ码的支持就像后加的，而且纯纯草台班子
     """
+    __slots__ = ("message_id",)
     segment_type = "node"
     _register = False  # 防止被注册
 
@@ -1049,7 +1336,7 @@ class Node(Segment):
 
     @id.setter
     def id(self, value: int):
-        self.data["id"] = str(value)
+        self.set_data("id", str(value))
 
     @property
     def nickname(self) -> str:
@@ -1057,7 +1344,7 @@ class Node(Segment):
 
     @nickname.setter
     def nickname(self, value: str):
-        self.data["nickname"] = str(value)
+        self.set_data("nickname", str(value))
 
     @property
     def user_id(self) -> int:
@@ -1065,7 +1352,7 @@ class Node(Segment):
 
     @user_id.setter
     def user_id(self, value: int):
-        self.data["user_id"] = str(value)
+        self.set_data("user_id", str(value))
 
     @property
     def content(self) -> QQRichText:
@@ -1073,7 +1360,7 @@ class Node(Segment):
 
     @content.setter
     def content(self, value: QQRichText):
-        self.data["content"] = value.get_array()
+        self.set_data("content", value.get_array())
 
     def get_content(self) -> QQRichText:
         return QQRichText(self.data.get("content"))
@@ -1097,6 +1384,7 @@ class Music(Segment):
     """
     音乐消息段
     """
+    __slots__ = ()
     segment_type = "music"
 
     def __init__(self, type_: Literal["qq", "163", "xm"], id_):
@@ -1129,7 +1417,7 @@ class Music(Segment):
 
     @type.setter
     def type(self, value: str):
-        self.data["type"] = str(value)
+        self.set_data("type", str(value))
 
     @property
     def id(self) -> str:
@@ -1137,13 +1425,14 @@ class Music(Segment):
 
     @id.setter
     def id(self, value: str):
-        self.data["id"] = str(value)
+        self.set_data("id", str(value))
 
 
 class CustomizeMusic(Segment):
     """
     自定义音乐消息段
     """
+    __slots__ = ()
     segment_type = "music"
 
     def __init__(self, url: str, audio: str, title: str, image: str = "", content: str = ""):
@@ -1197,7 +1486,7 @@ class CustomizeMusic(Segment):
 
     @url.setter
     def url(self, value: str):
-        self.data["url"] = str(value)
+        self.set_data("url", str(value))
 
     @property
     def title(self) -> str:
@@ -1205,7 +1494,7 @@ class CustomizeMusic(Segment):
 
     @title.setter
     def title(self, value: str):
-        self.data["title"] = str(value)
+        self.set_data("title", str(value))
 
     @property
     def audio(self) -> str:
@@ -1213,7 +1502,7 @@ class CustomizeMusic(Segment):
 
     @audio.setter
     def audio(self, value: str):
-        self.data["audio"] = str(value)
+        self.set_data("audio", str(value))
 
     @property
     def image(self) -> str:
@@ -1221,7 +1510,7 @@ class CustomizeMusic(Segment):
 
     @image.setter
     def image(self, value: str):
-        self.data["image"] = str(value)
+        self.set_data("image", str(value))
 
     @property
     def content(self) -> str:
@@ -1229,13 +1518,14 @@ class CustomizeMusic(Segment):
 
     @content.setter
     def content(self, value: str):
-        self.data["content"] = str(value)
+        self.set_data("content", str(value))
 
 
 class Reply(Segment):
     """
     回复
     """
+    __slots__ = ()
     segment_type = "reply"
 
     def __init__(self, id_: int | str):
@@ -1263,7 +1553,7 @@ class Reply(Segment):
 
     @id.setter
     def id(self, value: int):
-        self.data["id"] = value
+        self.set_data("id", value)
 
     def render(self, group_id: int | None = None):
         return f"[回复: {self.id}]"
@@ -1273,6 +1563,7 @@ class Forward(Segment):
     """
     合并转发
     """
+    __slots__ = ()
     segment_type = "forward"
 
     def __init__(self, id_: str):
@@ -1300,7 +1591,7 @@ class Forward(Segment):
 
     @id.setter
     def id(self, value: int):
-        self.data["id"] = value
+        self.set_data("id", value)
 
     def render(self, group_id: int | None = None):
         return f"[合并转发: {self.id}]"
@@ -1310,6 +1601,7 @@ class XML(Segment):
     """
     XML消息段
     """
+    __slots__ = ()
     segment_type = "xml"
 
     def __init__(self, data: str):
@@ -1333,18 +1625,19 @@ class XML(Segment):
 
     @xml.setter
     def xml(self, value):
-        self.data["data"] = str(value)
+        self.set_data("data", str(value))
 
 
 class JSON(Segment):
     """
     JSON消息段
     """
+    __slots__ = ()
     segment_type = "json"
 
     def __init__(self, data: str | dict | list):
         if isinstance(data, (dict, list)):
-            data = json.dumps(data)
+            data = JsonCodec.dumps(data)
         super().__init__({"type": self.segment_type, "data": {"data": data}})
 
     @classmethod
@@ -1370,7 +1663,7 @@ class JSON(Segment):
 
     @json.setter
     def json(self, value: str | dict | list):
-        self.data["data"] = value
+        self.set_data("data", value)
 
     def get_json(self):
         """
@@ -1378,7 +1671,22 @@ class JSON(Segment):
         Returns:
             json: json数据
         """
-        return json.loads(self.data["data"])
+        return JsonCodec.loads(self.data["data"])
+
+
+def _get_segment_class(segment_type, data: dict) -> type[Segment] | None:
+    """
+    获取_create_segment_from_dict会为消息段创建的类
+    Args:
+        segment_type: 消息段类型
+        data: 消息段的data字典
+    Returns:
+        消息段类，未注册的类型返回None
+    """
+    # 特别处理自定义音乐
+    if segment_type == "music" and data.get("type") == "custom":
+        return CustomizeMusic
+    return segments_map.get(segment_type)
 
 
 def _create_segment_from_dict(segment_dict: dict) -> Segment:
@@ -1391,29 +1699,14 @@ def _create_segment_from_dict(segment_dict: dict) -> Segment:
     if segment_type == "music" and data.get("type") == "custom":
         return CustomizeMusic.creat_from_seg_dict(segment_dict)
 
-    if segment_type in segments_map:
+    segment_class = segments_map.get(segment_type)
+    if segment_class is not None:
         try:
-            try:
-                segment = segments_map[segment_type].creat_from_seg_dict(segment_dict)
-            except NotImplementedError:
-                logger.warning(
-                    f"{segments_map[segment_type]}的creat_from_seg_dict方法未实现，回退到__init__自动匹配初始化"
-                )
-
-                params = inspect.signature(segments_map[segment_type]).parameters
-                kwargs = {}
-                data = segment_dict.get("data", {})
-                for param in params:
-                    if param in data:
-                        kwargs[param] = data[param]
-                    elif param == "id_":
-                        kwargs[param] = data.get("id")
-                    elif param == "type_":
-                        kwargs[param] = data.get("type")
-                    elif params[param].default != params[param].empty:
-                        kwargs[param] = params[param].default
-
-                segment = segments_map[segment_type](**kwargs)
+            constructor = _seg_dict_constructors.get(segment_class)
+            if constructor is None:
+                # segments_map被外部直接修改过
+                constructor = _seg_dict_constructors[segment_class] = _build_seg_dict_constructor(segment_class)
+            segment = constructor(segment_dict)
 
             # 为了兼容性，添加一下不包含的键
             for k, v in data.items():
@@ -1423,20 +1716,51 @@ def _create_segment_from_dict(segment_dict: dict) -> Segment:
             return segment
         except Exception as e:
             if ConfigManager.GlobalConfig().debug.save_dump:
-                dump_path = save_exc_dump(f"转换 {segment_dict} 到 {segments_map[segment_type]} 时失败")
+                dump_path = save_exc_dump(f"转换 {segment_dict} 到 {segment_class} 时失败")
             else:
                 dump_path = None
-            logger.warning(f"转换 {segment_dict} 到 {segments_map[segment_type]} 时失败，报错信息: {repr(e)}"
+            logger.warning(f"转换 {segment_dict} 到 {segment_class} 时失败，报错信息: {repr(e)}"
                            f"{f'\n已保存异常到 {dump_path}' if dump_path else ''}",
                            exc_info=True)
             return Segment(segment_dict)
     return Segment(segment_dict)
 
 
+# QQRichText的输入类型 -> 处理方式，未出现过的类型会由_get_input_kind判断后加入
+_input_kinds: dict[type, str] = {}
+
+
+def _get_input_kind(item) -> str:
+    """
+    判断QQRichText输入项的处理方式并缓存到_input_kinds
+    Args:
+        item: 输入项
+    Returns:
+        处理方式
+    Raises:
+        TypeError: 不支持的输入类型
+    """
+    if isinstance(item, QQRichText):
+        kind = "rich"
+    elif isinstance(item, Segment):
+        kind = "segment"
+    elif isinstance(item, str):
+        kind = "str"
+    elif isinstance(item, dict):
+        kind = "dict"
+    elif isinstance(item, (list, tuple)):
+        kind = "list"
+    else:
+        raise TypeError(f"QQRichText: 不支持的输入类型 {type(item)}")
+    _input_kinds[type(item)] = kind
+    return kind
+
+
 class QQRichText:
     """
     QQ富文本
     """
+    __slots__ = ("rich_array",)
 
     def __init__(
             self,
@@ -1449,6 +1773,9 @@ class QQRichText:
         """
         # 消费一个生成器来构建最终的列表
         self.rich_array: list[Segment] = list(self._iter_and_convert_segments(rich))
+        # 消息段会在QQRichText之间共享，冻结以防止一处修改影响到其他QQRichText
+        for segment in self.rich_array:
+            segment._frozen = True
 
     def _iter_and_convert_segments(self, rich_items) -> Generator[Segment, None, None]:
         """
@@ -1460,22 +1787,28 @@ class QQRichText:
 
         # 2. 单遍处理所有项目
         for item in rich_items:
-            # 分类处理，直接生成并yield Segment对象
-            if isinstance(item, Segment):
-                yield _create_segment_from_dict(item.seg_dict)
-            elif any(isinstance(item, segment) for segment in segments):
-                yield item
-            elif isinstance(item, QQRichText):
-                yield from item.rich_array
-            elif isinstance(item, str):
+            # 按类型分类处理，直接生成并yield Segment对象
+            kind = _input_kinds.get(type(item))
+            if kind is None:
+                kind = _get_input_kind(item)
+            if kind == "segment":
+                # 只有已是对应类的消息段才直接共享，
+                # 其他消息段（如Segment({"type": "text", ...})）仍需转换为对应的类，否则isinstance判断会失效
+                data = item._data
+                if type(item) is (_get_segment_class(item.get("type"), data if isinstance(data, dict) else {})
+                                  or Segment):
+                    yield item
+                else:
+                    yield _create_segment_from_dict(item.seg_dict)
+            elif kind == "dict":
+                yield _create_segment_from_dict(item)
+            elif kind == "str":
                 for arr in cq_2_array(item):
                     yield _create_segment_from_dict(arr)
-            elif isinstance(item, dict):
-                yield _create_segment_from_dict(item)
-            elif isinstance(item, (list, tuple)):
-                yield from self._iter_and_convert_segments(item)
+            elif kind == "rich":
+                yield from item.rich_array
             else:
-                raise TypeError(f"QQRichText: 不支持的输入类型 {type(item)}")
+                yield from self._iter_and_convert_segments(item)
 
     def render(self, group_id: int | None = None):
         """
@@ -1486,7 +1819,8 @@ class QQRichText:
         return "".join(rich.render(group_id=group_id) for rich in self.rich_array)
 
     def __str__(self):
-        return array_2_cq(self.get_array())
+        # array_2_cq不会修改输入，无需复制
+        return array_2_cq([segment._seg_dict for segment in self.rich_array])
 
     def __repr__(self):
         return self.__str__()
@@ -1543,7 +1877,7 @@ class QQRichText:
         res = QQRichText(self)
         for segment in segments:
             if isinstance(segment, Segment):
-                res.rich_array.append(segment)
+                res.rich_array.append(segment.freeze())
             else:
                 res.rich_array += QQRichText(segment).rich_array
         return res
@@ -1558,8 +1892,11 @@ class QQRichText:
 
         for index in [0, -1] if res.rich_array else [0]:
             if isinstance(res.rich_array[index], Text):
-                res.rich_array[index].text = res.rich_array[index].text.strip()
-                if not res.rich_array[index].text:
+                text = res.rich_array[index].text.strip()
+                if text != res.rich_array[index].text:
+                    # 替换为新的消息段而不是直接修改，原消息段可能仍被其他QQRichText使用
+                    res.rich_array[index] = Text(text).freeze()
+                if not text:
                     res.rich_array.pop(index)
                     if not res.rich_array:
                         break
@@ -1568,10 +1905,11 @@ class QQRichText:
     def copy(self):
         """
         复制一份新的QQRichText，会从array开始全部重新创建，所以是深拷贝
+        （新的消息段放入QQRichText后同样会被冻结，如需修改消息段请使用Segment.copy()）
         Returns:
             QQRichText
         """
-        return QQRichText(self)
+        return QQRichText([segment.seg_dict for segment in self.rich_array])
 
 
 # 使用示例
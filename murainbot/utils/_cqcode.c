@@ -0,0 +1,549 @@
+/*
+ * CQ码编解码与解析的C实现（可选）
+ * 未编译该扩展时QQRichText会自动使用纯Python实现，两者的结果必须完全一致
+ *
+ * cq_encode(text, in_cq=False) -> str  （仅支持位置参数）
+ * cq_decode(text, in_cq=False) -> str  （仅支持位置参数）
+ * cq_2_array(cq: str) -> list  格式错误时抛出不含位置信息的ValueError，由调用方重新解析以获得详细错误
+ * array_2_cq(cq_array) -> str | None  遇到不常见的输入时返回None，由调用方使用Python实现处理
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+/*
+ * 编码: & -> &amp;  [ -> &#91;  ] -> &#93;  （in_cq时）, -> &#44;
+ * 解码: 与之相反。Python实现是依次调用replace：先把&amp;替换为&，再替换&#91;、&#93;（和&#44;），
+ * 因此&amp;#91;最终会变为[，解码时在一遍扫描中模拟相同的结果
+ * 以下函数按字符串的存储宽度（1/2/4字节）分别生成
+ */
+#define IS_ENCODE_CHAR(c, in_cq) ((c) == '&' || (c) == '[' || (c) == ']' || ((c) == ',' && (in_cq)))
+
+#define WRITE_ENTITY(out, o, name) \
+    do { (out)[(o)++] = '&'; (out)[(o)++] = '#'; (out)[(o)++] = (name)[0]; (out)[(o)++] = (name)[1]; \
+         (out)[(o)++] = ';'; } while (0)
+
+#define MATCH_ENTITY(src, i, n, d1, d2) \
+    ((i) + 4 <= (n) && (src)[(i)] == '#' && (src)[(i) + 1] == (d1) && (src)[(i) + 2] == (d2) && (src)[(i) + 3] == ';')
+
+#define DEFINE_CODEC(TYPE, SUFFIX) \
+static Py_ssize_t \
+encode_count_##SUFFIX(const TYPE *src, Py_ssize_t n, int in_cq) \
+{ \
+    Py_ssize_t count = 0; \
+    for (Py_ssize_t i = 0; i < n; i++) { \
+        if (IS_ENCODE_CHAR(src[i], in_cq)) { \
+            count++; \
+        } \
+    } \
+    return count; \
+} \
+\
+static void \
+encode_write_##SUFFIX(const TYPE *src, Py_ssize_t n, int in_cq, TYPE *out) \
+{ \
+    Py_ssize_t o = 0; \
+    for (Py_ssize_t i = 0; i < n; i++) { \
+        TYPE c = src[i]; \
+        if (c == '&') { \
+            out[o++] = '&'; out[o++] = 'a'; out[o++] = 'm'; out[o++] = 'p'; out[o++] = ';'; \
+        } \
+        else if (c == '[') { \
+            WRITE_ENTITY(out, o, "91"); \
+        } \
+        else if (c == ']') { \
+            WRITE_ENTITY(out, o, "93"); \
+        } \
+        else if (c == ',' && in_cq) { \
+            WRITE_ENTITY(out, o, "44"); \
+        } \
+        else { \
+            out[o++] = c; \
+        } \
+    } \
+} \
+\
+static Py_ssize_t \
+decode_write_##SUFFIX(const TYPE *src, Py_ssize_t n, int in_cq, TYPE *out) \
+{ \
+    Py_ssize_t o = 0; \
+    Py_ssize_t i = 0; \
+    while (i < n) { \
+        TYPE c = src[i]; \
+        Py_ssize_t next = i + 1; \
+        if (c == '&') { \
+            Py_ssize_t entity = i + 1; \
+            if (i + 5 <= n && src[i + 1] == 'a' && src[i + 2] == 'm' && src[i + 3] == 'p' && src[i + 4] == ';') { \
+                /* 替换得到的&可能与之后的内容组成新的转义序列 */ \
+                entity = i + 5; \
+                next = entity; \
+            } \
+            if (MATCH_ENTITY(src, entity, n, '9', '1')) { \
+                c = '['; \
+                next = entity + 4; \
+            } \
+            else if (MATCH_ENTITY(src, entity, n, '9', '3')) { \
+                c = ']'; \
+                next = entity + 4; \
+            } \
+            else if (in_cq && MATCH_ENTITY(src, entity, n, '4', '4')) { \
+                c = ','; \
+                next = entity + 4; \
+            } \
+        } \
+        out[o++] = c; \
+        i = next; \
+    } \
+    return o; \
+}
+
+DEFINE_CODEC(Py_UCS1, ucs1)
+DEFINE_CODEC(Py_UCS2, ucs2)
+DEFINE_CODEC(Py_UCS4, ucs4)
+
+/* 字符宽度 */
+static size_t
+kind_size(int kind)
+{
+    return kind == PyUnicode_1BYTE_KIND ? 1 : kind == PyUnicode_2BYTE_KIND ? 2 : 4;
+}
+
+/* 编码text[start:end] */
+static PyObject *
+encode_range(PyObject *text, Py_ssize_t start, Py_ssize_t end, int in_cq)
+{
+    int kind = PyUnicode_KIND(text);
+    const char *src = (const char *)PyUnicode_DATA(text) + start * kind_size(kind);
+    Py_ssize_t n = end - start;
+    Py_ssize_t count;
+    switch (kind) {
+        case PyUnicode_1BYTE_KIND: count = encode_count_ucs1((const Py_UCS1 *)src, n, in_cq); break;
+        case PyUnicode_2BYTE_KIND: count = encode_count_ucs2((const Py_UCS2 *)src, n, in_cq); break;
+        default: count = encode_count_ucs4((const Py_UCS4 *)src, n, in_cq); break;
+    }
+    if (count == 0) {
+        return PyUnicode_Substring(text, start, end);
+    }
+    /* 每个字符都会被替换为5个字符 */
+    Py_ssize_t length = n + count * 4;
+    void *out = PyMem_Malloc(length * kind_size(kind));
+    if (out == NULL) {
+        return PyErr_NoMemory();
+    }
+    switch (kind) {
+        case PyUnicode_1BYTE_KIND: encode_write_ucs1((const Py_UCS1 *)src, n, in_cq, out); break;
+        case PyUnicode_2BYTE_KIND: encode_write_ucs2((const Py_UCS2 *)src, n, in_cq, out); break;
+        default: encode_write_ucs4((const Py_UCS4 *)src, n, in_cq, out); break;
+    }
+    /* PyUnicode_FromKindAndData会按实际的最大字符选择存储宽度 */
+    PyObject *result = PyUnicode_FromKindAndData(kind, out, length);
+    PyMem_Free(out);
+    return result;
+}
+
+/* 解码text[start:end] */
+static PyObject *
+decode_range(PyObject *text, Py_ssize_t start, Py_ssize_t end, int in_cq)
+{
+    int kind = PyUnicode_KIND(text);
+    const char *src = (const char *)PyUnicode_DATA(text) + start * kind_size(kind);
+    Py_ssize_t n = end - start;
+    if (PyUnicode_FindChar(text, '&', start, end, 1) == -1) {
+        return PyUnicode_Substring(text, start, end);
+    }
+    /* 解码后不会变长 */
+    void *out = PyMem_Malloc((n > 0 ? n : 1) * kind_size(kind));
+    if (out == NULL) {
+        return PyErr_NoMemory();
+    }
+    Py_ssize_t length;
+    switch (kind) {
+        case PyUnicode_1BYTE_KIND: length = decode_write_ucs1((const Py_UCS1 *)src, n, in_cq, out); break;
+        case PyUnicode_2BYTE_KIND: length = decode_write_ucs2((const Py_UCS2 *)src, n, in_cq, out); break;
+        default: length = decode_write_ucs4((const Py_UCS4 *)src, n, in_cq, out); break;
+    }
+    PyObject *result;
+    if (length == n) {
+        result = PyUnicode_Substring(text, start, end);
+    }
+    else {
+        result = PyUnicode_FromKindAndData(kind, out, length);
+    }
+    PyMem_Free(out);
+    return result;
+}
+
+/* 解析 (text, in_cq=False) 参数，仅支持位置参数 */
+static PyObject *
+parse_codec_args(PyObject *const *args, Py_ssize_t nargs, const char *name, int *in_cq)
+{
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "%s() takes 1 or 2 positional arguments but %zd were given", name, nargs);
+        return NULL;
+    }
+    *in_cq = 0;
+    if (nargs == 2 && (*in_cq = PyObject_IsTrue(args[1])) < 0) {
+        return NULL;
+    }
+    return PyObject_Str(args[0]);
+}
+
+static PyObject *
+cqcode_cq_encode(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    int in_cq;
+    PyObject *text = parse_codec_args(args, nargs, "cq_encode", &in_cq);
+    if (text == NULL) {
+        return NULL;
+    }
+    PyObject *result = encode_range(text, 0, PyUnicode_GET_LENGTH(text), in_cq);
+    Py_DECREF(text);
+    return result;
+}
+
+static PyObject *
+cqcode_cq_decode(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    int in_cq;
+    PyObject *text = parse_codec_args(args, nargs, "cq_decode", &in_cq);
+    if (text == NULL) {
+        return NULL;
+    }
+    PyObject *result = decode_range(text, 0, PyUnicode_GET_LENGTH(text), in_cq);
+    Py_DECREF(text);
+    return result;
+}
+
+/* 检查text[pos:end]是否以ASCII字符串pattern开头 */
+static int
+match_ascii(PyObject *text, Py_ssize_t pos, Py_ssize_t end, const char *pattern)
+{
+    int kind = PyUnicode_KIND(text);
+    const void *data = PyUnicode_DATA(text);
+    for (; *pattern; pattern++, pos++) {
+        if (pos >= end || PyUnicode_READ(kind, data, pos) != (Py_UCS4)(unsigned char)*pattern) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+/* 创建 {"type": segment_type, "data": data} 并追加到列表，会释放segment_type与data的引用 */
+static int
+append_segment(PyObject *cq_array, PyObject *segment_type, PyObject *data)
+{
+    if (segment_type == NULL || data == NULL) {
+        Py_XDECREF(segment_type);
+        Py_XDECREF(data);
+        return -1;
+    }
+    PyObject *segment = PyDict_New();
+    int res = -1;
+    if (segment != NULL
+        && PyDict_SetItemString(segment, "type", segment_type) == 0
+        && PyDict_SetItemString(segment, "data", data) == 0) {
+        res = PyList_Append(cq_array, segment);
+    }
+    Py_XDECREF(segment);
+    Py_DECREF(segment_type);
+    Py_DECREF(data);
+    return res;
+}
+
+static PyObject *
+format_error(void)
+{
+    PyErr_SetString(PyExc_ValueError, "cq_2_array: CQ 码格式错误");
+    return NULL;
+}
+
+/* 解析 [ 与 ] 之间的CQ码内容 cq[start:end] 并追加到列表 */
+static int
+parse_cq_body(PyObject *cq, Py_ssize_t start, Py_ssize_t end, PyObject *cq_array)
+{
+    if (PyUnicode_FindChar(cq, '[', start, end, 1) != -1) {
+        format_error();
+        return -1;
+    }
+    Py_ssize_t type_end = PyUnicode_FindChar(cq, ',', start, end, 1);
+    if (type_end == -1) {
+        type_end = end;
+    }
+    if (!match_ascii(cq, start, type_end, "CQ:") || type_end - start == 3) {
+        format_error();
+        return -1;
+    }
+
+    PyObject *cq_data = PyDict_New();
+    if (cq_data == NULL) {
+        return -1;
+    }
+    Py_ssize_t pos = type_end;
+    while (pos < end) {
+        /* pos指向分隔参数的逗号 */
+        Py_ssize_t param_start = pos + 1;
+        Py_ssize_t param_end = PyUnicode_FindChar(cq, ',', param_start, end, 1);
+        if (param_end == -1) {
+            param_end = end;
+        }
+        Py_ssize_t eq = PyUnicode_FindChar(cq, '=', param_start, param_end, 1);
+        if (eq == -1 || eq == param_start) {
+            Py_DECREF(cq_data);
+            format_error();
+            return -1;
+        }
+        PyObject *key = PyUnicode_Substring(cq, param_start, eq);
+        if (key == NULL) {
+            Py_DECREF(cq_data);
+            return -1;
+        }
+        int contains = PyDict_Contains(cq_data, key);
+        if (contains != 0) {
+            Py_DECREF(key);
+            Py_DECREF(cq_data);
+            if (contains > 0) {
+                format_error();
+            }
+            return -1;
+        }
+        PyObject *value = decode_range(cq, eq + 1, param_end, 1);
+        if (value == NULL || PyDict_SetItem(cq_data, key, value) < 0) {
+            Py_DECREF(key);
+            Py_XDECREF(value);
+            Py_DECREF(cq_data);
+            return -1;
+        }
+        Py_DECREF(key);
+        Py_DECREF(value);
+        pos = param_end;
+    }
+    return append_segment(cq_array, PyUnicode_Substring(cq, start + 3, type_end), cq_data);
+}
+
+static PyObject *
+cqcode_cq_2_array(PyObject *module, PyObject *cq)
+{
+    if (!PyUnicode_Check(cq)) {
+        PyErr_SetString(PyExc_TypeError, "cq_2_array: 输入类型错误");
+        return NULL;
+    }
+    PyObject *cq_array = PyList_New(0);
+    if (cq_array == NULL) {
+        return NULL;
+    }
+    Py_ssize_t length = PyUnicode_GET_LENGTH(cq);
+    Py_ssize_t pos = 0;
+    while (pos < length) {
+        Py_ssize_t cq_start = PyUnicode_FindChar(cq, '[', pos, length, 1);
+        if (cq_start == -2) {
+            goto error;
+        }
+        if (cq_start == -1) {
+            cq_start = length;
+        }
+        if (cq_start > pos) {
+            if (PyUnicode_FindChar(cq, ']', pos, cq_start, 1) != -1) {
+                format_error();
+                goto error;
+            }
+            PyObject *text_data = PyDict_New();
+            PyObject *text = decode_range(cq, pos, cq_start, 0);
+            if (text_data == NULL || text == NULL || PyDict_SetItemString(text_data, "text", text) < 0) {
+                Py_XDECREF(text_data);
+                Py_XDECREF(text);
+                goto error;
+            }
+            Py_DECREF(text);
+            if (append_segment(cq_array, PyUnicode_FromString("text"), text_data) < 0) {
+                goto error;
+            }
+        }
+        if (cq_start == length) {
+            break;
+        }
+        Py_ssize_t cq_end = PyUnicode_FindChar(cq, ']', cq_start + 1, length, 1);
+        if (cq_end == -1) {
+            format_error();
+            goto error;
+        }
+        if (cq_end == -2 || parse_cq_body(cq, cq_start + 1, cq_end, cq_array) < 0) {
+            goto error;
+        }
+        pos = cq_end + 1;
+    }
+    return cq_array;
+
+error:
+    Py_DECREF(cq_array);
+    return NULL;
+}
+
+/* 值转为字符串，不常见的类型返回NULL且不设置异常（交给Python实现处理） */
+static PyObject *
+value_to_str(PyObject *value)
+{
+    if (value == Py_True) {
+        return PyUnicode_FromString("1");
+    }
+    if (value == Py_False) {
+        return PyUnicode_FromString("0");
+    }
+    if (PyUnicode_CheckExact(value)) {
+        Py_INCREF(value);
+        return value;
+    }
+    if (PyLong_CheckExact(value) || PyFloat_CheckExact(value)) {
+        return PyObject_Str(value);
+    }
+    return NULL;
+}
+
+/* 返回1表示已处理，0表示需要交给Python实现，-1表示出错 */
+static int
+append_cq_pieces(PyObject *segment, PyObject *pieces)
+{
+    if (!PyDict_CheckExact(segment)) {
+        return 0;
+    }
+    PyObject *segment_type = PyDict_GetItemString(segment, "type");
+    if (segment_type == NULL || !PyUnicode_CheckExact(segment_type)) {
+        return 0;
+    }
+    PyObject *data = PyDict_GetItemString(segment, "data");
+
+    if (PyUnicode_CompareWithASCIIString(segment_type, "text") == 0) {
+        if (data == NULL || !PyDict_CheckExact(data)) {
+            return 0;
+        }
+        PyObject *text = PyDict_GetItemString(data, "text");
+        if (text == NULL || !PyUnicode_CheckExact(text)) {
+            return 0;
+        }
+        PyObject *encoded = encode_range(text, 0, PyUnicode_GET_LENGTH(text), 0);
+        if (encoded == NULL) {
+            return -1;
+        }
+        int res = PyList_Append(pieces, encoded);
+        Py_DECREF(encoded);
+        return res < 0 ? -1 : 1;
+    }
+
+    PyObject *head = PyUnicode_FromFormat("[CQ:%U", segment_type);
+    if (head == NULL) {
+        return -1;
+    }
+    int res = PyList_Append(pieces, head);
+    Py_DECREF(head);
+    if (res < 0) {
+        return -1;
+    }
+    if (data != NULL && PyDict_Check(data)) {
+        if (!PyDict_CheckExact(data)) {
+            return 0;
+        }
+        Py_ssize_t dict_pos = 0;
+        PyObject *key, *value;
+        while (PyDict_Next(data, &dict_pos, &key, &value)) {
+            if (!PyUnicode_CheckExact(key)) {
+                return 0;
+            }
+            if (value == Py_None) {
+                continue;
+            }
+            PyObject *value_str = value_to_str(value);
+            if (value_str == NULL) {
+                return PyErr_Occurred() ? -1 : 0;
+            }
+            PyObject *encoded_key = encode_range(key, 0, PyUnicode_GET_LENGTH(key), 1);
+            PyObject *encoded_value = encode_range(value_str, 0, PyUnicode_GET_LENGTH(value_str), 1);
+            Py_DECREF(value_str);
+            PyObject *param = NULL;
+            if (encoded_key != NULL && encoded_value != NULL) {
+                param = PyUnicode_FromFormat(",%U=%U", encoded_key, encoded_value);
+            }
+            Py_XDECREF(encoded_key);
+            Py_XDECREF(encoded_value);
+            if (param == NULL) {
+                return -1;
+            }
+            res = PyList_Append(pieces, param);
+            Py_DECREF(param);
+            if (res < 0) {
+                return -1;
+            }
+        }
+    }
+    PyObject *tail = PyUnicode_FromString("]");
+    if (tail == NULL) {
+        return -1;
+    }
+    res = PyList_Append(pieces, tail);
+    Py_DECREF(tail);
+    return res < 0 ? -1 : 1;
+}
+
+static PyObject *
+cqcode_array_2_cq(PyObject *module, PyObject *cq_array)
+{
+    PyObject *seq;
+    if (PyDict_CheckExact(cq_array)) {
+        seq = PyTuple_Pack(1, cq_array);
+    }
+    else if (PyList_CheckExact(cq_array) || PyTuple_CheckExact(cq_array)) {
+        seq = PySequence_Tuple(cq_array);
+    }
+    else {
+        Py_RETURN_NONE;
+    }
+    if (seq == NULL) {
+        return NULL;
+    }
+    PyObject *pieces = PyList_New(0);
+    if (pieces == NULL) {
+        Py_DECREF(seq);
+        return NULL;
+    }
+    PyObject *result = NULL;
+    for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(seq); i++) {
+        int res = append_cq_pieces(PyTuple_GET_ITEM(seq, i), pieces);
+        if (res < 0) {
+            goto done;
+        }
+        if (res == 0) {
+            result = Py_None;
+            Py_INCREF(result);
+            goto done;
+        }
+    }
+    PyObject *empty = PyUnicode_FromString("");
+    if (empty != NULL) {
+        result = PyUnicode_Join(empty, pieces);
+        Py_DECREF(empty);
+    }
+
+done:
+    Py_DECREF(pieces);
+    Py_DECREF(seq);
+    return result;
+}
+
+static PyMethodDef cqcode_methods[] = {
+    {"cq_encode", (PyCFunction)(void (*)(void))cqcode_cq_encode, METH_FASTCALL, "CQ编码"},
+    {"cq_decode", (PyCFunction)(void (*)(void))cqcode_cq_decode, METH_FASTCALL, "CQ解码"},
+    {"cq_2_array", cqcode_cq_2_array, METH_O, "将CQCode格式的字符串转换为消息段数组"},
+    {"array_2_cq", cqcode_array_2_cq, METH_O, "array消息段转CQCode，不常见的输入返回None"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef cqcode_module = {
+    PyModuleDef_HEAD_INIT,
+    "_cqcode",
+    "CQ码编解码与解析的C实现",
+    -1,
+    cqcode_methods
+};
+
+PyMODINIT_FUNC
+PyInit__cqcode(void)
+{
+    return PyModule_Create(&cqcode_module);
+}
@@ -25,7 +25,7 @@ class MFace(QQRichText.Segment):
                                                     "emoji_id": str(emoji_id),
                                                     "key": key, "summary": summary}})
         if url:
-            self.data["url"] = url
+            self.set_data("url", url)
 
     @classmethod
     def creat_from_seg_dict(cls, seg_dict: dict[str, dict[str, str]]) -> "MFace":
@@ -43,7 +43,7 @@ class MFace(QQRichText.Segment):
 
     @summary.setter
     def summary(self, summary: str):
-        self.data["summary"] = summary
+        self.set_data("summary", summary)
 
     @property
     def emoji_package_id(self):
@@ -51,7 +51,7 @@ class MFace(QQRichText.Segment):
 
     @emoji_package_id.setter
     def emoji_package_id(self, emoji_package_id: int):
-        self.data["emoji_package_id"] = emoji_package_id
+        self.set_data("emoji_package_id", emoji_package_id)
 
     @property
     def emoji_id(self):
@@ -59,7 +59,7 @@ class MFace(QQRichText.Segment):
 
     @emoji_id.setter
     def emoji_id(self, emoji_id: int):
-        self.data["emoji_id"] = emoji_id
+        self.set_data("emoji_id", emoji_id)
 
     @property
     def key(self):
@@ -67,7 +67,7 @@ class MFace(QQRichText.Segment):
 
     @key.setter
     def key(self, key: str):
-        self.data["key"] = key
+        self.set_data("key", key)
 
     @property
     def url(self):
@@ -75,7 +75,7 @@ class MFace(QQRichText.Segment):
 
     @url.setter
     def url(self, url: str):
-        self.data["url"] = url
+        self.set_data("url", url)
 
     def render(self, group_id: int | None = None):
         return f"[mface: {self.summary}({self.emoji_package_id}:{self.emoji_id}:{self.key}):{self.url}]"
@@ -114,7 +114,7 @@ class File(QQRichText.Segment):
 
     @file_name.setter
     def file_name(self, file_name: str):
-        self.data["file_name"] = file_name
+        self.set_data("file_name", file_name)
 
     @property
     def file_id(self):
@@ -122,7 +122,7 @@ class File(QQRichText.Segment):
 
     @file_id.setter
     def file_id(self, file_id: str):
-        self.data["file_id"] = file_id
+        self.set_data("file_id", file_id)
 
     @property
     def file_hash(self):
@@ -130,7 +130,7 @@ class File(QQRichText.Segment):
 
     @file_hash.setter
     def file_hash(self, file_hash: int):
-        self.data["file_hash"] = file_hash
+        self.set_data("file_hash", file_hash)
 
     @property
     def url(self):
@@ -138,7 +138,7 @@ class File(QQRichText.Segment):
 
     @url.setter
     def url(self, url: str):
-        self.data["url"] = url
+        self.set_data("url", url)
 
     def render(self, group_id: int | None = None):
         return f"[file: {self.file_name}({self.file_id}:{self.file_hash}):{self.url}]"
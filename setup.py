@@ -1,6 +1,6 @@
 import os
 import shutil
-from setuptools import setup
+from setuptools import setup, Extension
 from setuptools.command.build_py import build_py
 
 # --- 自定义构建逻辑 ---
@@ -57,8 +57,22 @@ class CustomBuildPy(build_py):
                 print(f"Copied file: {plugin_name}")
 
 
+# 可选的CQ码加速扩展，默认不编译，以保证发布的wheel仍是与平台无关的py3-none-any
+# 设置环境变量 MURAINBOT_BUILD_CEXT=1 后从源码安装即可编译（如 MURAINBOT_BUILD_CEXT=1 pip install --no-binary murainbot murainbot）
+# 编译失败时仍可正常安装，运行时未找到扩展会自动使用纯Python实现
+ext_modules = []
+if os.environ.get('MURAINBOT_BUILD_CEXT', '').strip() in ('1', 'true', 'True', 'yes'):
+    ext_modules.append(
+        Extension(
+            'murainbot.utils._cqcode',
+            sources=['murainbot/utils/_cqcode.c'],
+            optional=True
+        )
+    )
+
 setup(
     cmdclass={
         'build_py': CustomBuildPy
-    }
+    },
+    ext_modules=ext_modules
 )
@@ -0,0 +1,74 @@
+"""
+测试环境初始化
+在临时工作目录中运行，避免读写仓库中的配置文件、日志和数据
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_work_path = tempfile.mkdtemp(prefix="murainbot-tests-")
+os.chdir(_work_path)
+
+from murainbot import paths as _paths  # noqa: E402
+
+_paths.init_paths(_work_path)
+_paths.paths.ensure_all_dirs_exist()
+
+
+@pytest.fixture
+def set_config():
+    """
+    临时修改全局配置项，测试结束后恢复
+    GlobalConfig每次实例化都会从配置字典重新生成各配置对象，因此需要修改配置字典而非配置对象
+    """
+    from murainbot.core.ConfigManager import GlobalConfig
+
+    missing = object()
+    changed = []
+
+    def setter(section: str, key: str, value):
+        config = GlobalConfig()
+        section_dict = config.config.setdefault(section, {})
+        changed.append((section_dict, key, section_dict.get(key, missing)))
+        section_dict[key] = value
+        config.init()
+
+    yield setter
+
+    for section_dict, key, old_value in reversed(changed):
+        if old_value is missing:
+            section_dict.pop(key, None)
+        else:
+            section_dict[key] = old_value
+    GlobalConfig().init()
+
+
+@pytest.fixture
+def plugin_data(monkeypatch, tmp_path):
+    """
+    伪造调用者的插件数据，测试结束后注销该插件注册的事件处理器
+    """
+    from murainbot.core import EventManager, PluginManager
+    from murainbot.utils import EventHandlers
+
+    data = {
+        "name": "test_plugin",
+        "plugin": None,
+        "info": None,
+        "file_path": str(tmp_path / "test_plugin.py"),
+        "path": str(tmp_path / "test_plugin"),
+    }
+    monkeypatch.setattr(PluginManager, "get_caller_plugin_data", lambda *args, **kwargs: data)
+    yield data
+
+    for event_class in EventHandlers.events_matchers.pop(data["path"], {}):
+        with EventManager._event_lock:
+            listeners = EventManager.event_listeners.get(event_class, [])
+            listeners[:] = [listener for listener in listeners if listener.kwargs.get("path") != data["path"]]
+            if not listeners:
+                EventManager.event_listeners.pop(event_class, None)
+            EventManager._rebuild_snapshot(event_class)
@@ -0,0 +1,159 @@
+"""
+CommandManager 的测试
+"""
+import pytest
+
+from murainbot.utils import CommandManager, EventHandlers, QQRichText
+from murainbot.utils.CommandManager import matcher as command_matcher
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    替换令牌桶使用的时钟，返回用于推进时间的函数
+    """
+    now = [1000.0]
+    monkeypatch.setattr(CommandManager.time, "monotonic", lambda: now[0])
+
+    def advance(seconds: float):
+        now[0] += seconds
+
+    return advance
+
+
+@pytest.mark.parametrize("rate, allowed", [(0.5, 1), (3, 3)])
+def test_suggestion_rate_limit(monkeypatch, set_config, clock, rate, allowed):
+    set_config("command", "suggestion_rate", rate)
+    monkeypatch.setattr(CommandManager, "_suggestion_bucket", None)
+
+    assert [CommandManager._can_suggest() for _ in range(allowed + 1)] == [True] * allowed + [False]
+    clock(1 / rate)
+    assert CommandManager._can_suggest()
+    assert not CommandManager._can_suggest()
+
+
+def test_suggestion_rate_unlimited(monkeypatch, set_config):
+    set_config("command", "suggestion_rate", 0)
+    monkeypatch.setattr(CommandManager, "_suggestion_bucket", None)
+
+    assert all(CommandManager._can_suggest() for _ in range(100))
+
+
+def _command_event(text: str) -> command_matcher.CommandEvent:
+    return command_matcher.CommandEvent({
+        "time": 0, "self_id": 1, "post_type": "message", "message_type": "group", "sub_type": "normal",
+        "message_id": 1, "group_id": 2, "user_id": 3, "anonymous": None,
+        "message": [{"type": "text", "data": {"text": text}}], "raw_message": text,
+        "font": 0, "sender": {"user_id": 3, "nickname": "n"}
+    })
+
+
+@pytest.fixture
+def command(plugin_data):
+    """
+    创建只记录调用的命令匹配器，测试结束后注销
+    """
+    calls = []
+    created = []
+
+    def create(name: str, register: bool = True):
+        if register:
+            matcher = command_matcher.on_command(name)
+        else:
+            matcher = command_matcher.CommandMatcher(plugin_data, [EventHandlers.CommandRule(name)])
+        matcher.match = lambda event_data, rules_kwargs: calls.append(name)
+        created.append(matcher)
+        return matcher
+
+    yield create, calls
+
+    registered = {id(matcher) for _, matcher in command_matcher.get_matchers()}
+    for matcher in created:
+        if id(matcher) in registered:
+            command_matcher.unregister_matcher(matcher)
+
+
+def test_command_unregister_and_register(command):
+    create, calls = command
+    first = create("test_first")
+    create("test_second")
+    command_matcher._on_event(_command_event("/test_first"))
+    assert calls == ["test_first"]
+
+    # 注销一个匹配器后再注册一个，匹配器数量不变
+    count = len(command_matcher.get_matchers())
+    command_matcher.unregister_matcher(first)
+    command_matcher.register_matcher(create("test_third", register=False))
+    assert len(command_matcher.get_matchers()) == count
+    assert first not in command_matcher._command_trie.matchers
+
+    calls.clear()
+    for name in ("test_first", "test_second", "test_third"):
+        command_matcher._on_event(_command_event(f"/{name}"))
+    assert calls == ["test_second", "test_third"]
+
+    with pytest.raises(ValueError):
+        command_matcher.unregister_matcher(first)
+
+
+def test_command_trie_remove_prunes_nodes():
+    trie = command_matcher._CommandTrie()
+    rule = EventHandlers.CommandRule("abc", {"abd"}, ["/"])
+    first, second = object(), object()
+    trie.add_command_rule(rule, first)
+    trie.add_command_rule(EventHandlers.CommandRule("ab", command_start=["/"]), second)
+
+    trie.remove(first)
+    assert first not in trie.matchers
+    # 只剩下 "/ab" 与 "ab" 两条路径
+    assert set(trie.root.children) == {"/", "a"}
+    assert trie.root.children["a"].children["b"].children == {}
+    assert [entry[0] for entry in trie.root.children["/"].children["a"].children["b"].entries] == [second]
+
+    trie.remove(second)
+    assert trie.root.children == {}
+    assert not trie.matchers
+
+
+def _run_command(manager: CommandManager.CommandManager, text: str):
+    _, _, last_command_def = manager.run_command(QQRichText.QQRichText(text))
+    return last_command_def
+
+
+def test_arg_table_after_replacing_next_arg():
+    old, new = CommandManager.Literal("old"), CommandManager.Literal("new")
+    root = CommandManager.Literal("cmd").add_next_arg(old)
+    manager = CommandManager.CommandManager().register_command(root)
+    assert _run_command(manager, "cmd old") is old
+
+    # 替换参数，参数数量不变
+    root.next_arg_list = [new]
+    assert _run_command(manager, "cmd new") is new
+    with pytest.raises(CommandManager.CommandMatchError):
+        _run_command(manager, "cmd old")
+
+
+def test_arg_table_after_adding_to_wrapped_arg():
+    wrapped = CommandManager.Literal("sub")
+    optional = CommandManager.OptionalArg(wrapped)
+    root = CommandManager.Literal("cmd").add_next_arg(optional)
+    manager = CommandManager.CommandManager().register_command(root)
+    assert _run_command(manager, "cmd sub") is optional
+
+    first, second = CommandManager.Literal("first"), CommandManager.Literal("second")
+    wrapped.add_next_arg(first)
+    assert _run_command(manager, "cmd sub first") is first
+    optional.add_next_arg(second)
+    assert _run_command(manager, "cmd sub second") is second
+    assert wrapped.next_arg_list == [first, second]
+
+
+def test_command_table_after_replacing_command():
+    old, new = CommandManager.Literal("old"), CommandManager.Literal("new")
+    manager = CommandManager.CommandManager().register_command(old)
+    assert _run_command(manager, "old") is old
+
+    manager.command_list = [new]
+    assert _run_command(manager, "new") is new
+    with pytest.raises(CommandManager.NotMatchCommandError):
+        _run_command(manager, "old")
@@ -0,0 +1,42 @@
+"""
+EventHandlers 的测试
+"""
+import pytest
+
+from murainbot.core import ListenerServer
+from murainbot.utils import EventClassifier, EventHandlers
+
+
+def _group_message(text="hello"):
+    return {
+        "time": 0, "self_id": 1, "post_type": "message", "message_type": "group", "sub_type": "normal",
+        "message_id": 1, "group_id": 2, "user_id": 3, "anonymous": None,
+        "message": [{"type": "text", "data": {"text": text}}], "raw_message": text,
+        "font": 0, "sender": {"user_id": 3, "nickname": "n"}
+    }
+
+
+@pytest.mark.parametrize("mro_dispatch", [False, True], ids=["classic", "mro_dispatch"])
+def test_on_event_dispatches_group_message(plugin_data, set_config, mro_dispatch):
+    set_config("event", "mro_dispatch", mro_dispatch)
+    calls = []
+
+    group_matcher = EventHandlers.on_event(EventClassifier.GroupMessageEvent)
+    message_matcher = EventHandlers.on_event(EventClassifier.MessageEvent)
+
+    @group_matcher.register_handler()
+    def on_group_message(event_data):
+        calls.append(("group", event_data))
+
+    @message_matcher.register_handler()
+    def on_message(event_data):
+        calls.append(("message", event_data))
+
+    EventClassifier.on_escalation(ListenerServer.EscalationEvent(_group_message()))
+
+    assert sorted(name for name, _ in calls) == ["group", "message"]
+    for name, event_data in calls:
+        assert isinstance(event_data, EventClassifier.MessageEvent)
+        assert str(event_data.message) == "hello"
+        if name == "group":
+            assert isinstance(event_data, EventClassifier.GroupMessageEvent)
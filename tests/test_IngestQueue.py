@@ -0,0 +1,135 @@
+"""
+IngestQueue 的测试
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from murainbot.core.IngestQueue import IngestQueue
+
+
+class _Dispatcher:
+    """
+    记录分发顺序的dispatch，每个上报返回一个由测试控制何时完成的Future（完成前一直占用处理名额）
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.pending: list[Future] = []
+        self.cond = threading.Condition()
+
+    def __call__(self, data: dict) -> Future:
+        future = Future()
+        with self.cond:
+            self.calls.append(data["id"])
+            self.pending.append(future)
+            self.cond.notify_all()
+        return future
+
+    def wait_calls(self, count: int):
+        with self.cond:
+            assert self.cond.wait_for(lambda: len(self.calls) >= count, timeout=5), self.calls
+
+    def drain(self, count: int) -> list:
+        """
+        依次完成上报，直到共分发了count个上报
+        Returns:
+            分发顺序
+        """
+        for index in range(count):
+            self.wait_calls(index + 1)
+            if not self.pending[index].done():
+                self.pending[index].set_result(None)
+        return self.calls
+
+
+def _message(id_, group_id=1):
+    return {"post_type": "message", "message_type": "group", "group_id": group_id, "user_id": 10, "id": id_}
+
+
+def _notice(id_):
+    return {"post_type": "notice", "notice_type": "group_increase", "group_id": 1, "user_id": 10, "id": id_}
+
+
+def _meta(id_):
+    return {"post_type": "meta_event", "meta_event_type": "heartbeat", "id": id_}
+
+
+@pytest.fixture
+def make_queue():
+    """
+    创建只有一个处理名额的上报队列，并先放入一个上报占住名额，之后放入的上报都会留在队列中
+    """
+
+    def make(capacity: int, overflow_policy: str) -> tuple[IngestQueue, _Dispatcher]:
+        dispatcher = _Dispatcher()
+        ingest_queue = IngestQueue(dispatcher, capacity=capacity, overflow_policy=overflow_policy,
+                                   max_workers=1, ordered=False)
+        ingest_queue.put(_message("blocker"))
+        dispatcher.wait_calls(1)
+        return ingest_queue, dispatcher
+
+    return make
+
+
+def test_drop_oldest(make_queue):
+    ingest_queue, dispatcher = make_queue(2, "drop_oldest")
+    first = ingest_queue.put(_message("m1"))
+    ingest_queue.put(_message("m2"))
+    ingest_queue.put(_message("m3", group_id=2))
+
+    assert first.cancelled()
+    assert dispatcher.drain(3) == ["blocker", "m2", "m3"]
+    assert ingest_queue.get_stats()["dropped"] == 1
+
+
+def test_drop_by_group(make_queue):
+    ingest_queue, dispatcher = make_queue(3, "drop_by_group")
+    ingest_queue.put(_message("b1", group_id=2))
+    first = ingest_queue.put(_message("a1"))
+    ingest_queue.put(_message("a2"))
+    # 丢弃排队最多的会话（群1）中最早的上报，而不是整个队列中最早的上报
+    ingest_queue.put(_message("c1", group_id=3))
+
+    assert first.cancelled()
+    assert dispatcher.drain(4) == ["blocker", "b1", "a2", "c1"]
+
+
+def test_reject(make_queue):
+    ingest_queue, dispatcher = make_queue(2, "reject")
+    first = ingest_queue.put(_message("m1"))
+    ingest_queue.put(_message("m2"))
+    with pytest.raises(queue.Full):
+        ingest_queue.put(_message("m3"))
+    assert ingest_queue.get_stats()["rejected"] == 1
+
+    # 高优先级的上报仍可以挤掉消息
+    ingest_queue.put(_notice("n1"))
+    assert first.cancelled()
+    assert dispatcher.drain(3) == ["blocker", "n1", "m2"]
+
+
+def test_high_priority_first(make_queue):
+    ingest_queue, dispatcher = make_queue(10, "drop_oldest")
+    ingest_queue.put(_message("m1"))
+    ingest_queue.put(_message("m2"))
+    ingest_queue.put(_notice("n1"))
+    ingest_queue.put(_meta("e1"))
+
+    assert dispatcher.drain(5) == ["blocker", "n1", "e1", "m1", "m2"]
+
+
+def test_cancelled_future_skipped(make_queue):
+    ingest_queue, dispatcher = make_queue(10, "drop_oldest")
+    cancelled = ingest_queue.put(_message("m1"))
+    future = ingest_queue.put(_message("m2"))
+    assert cancelled.cancel()
+
+    assert dispatcher.drain(2) == ["blocker", "m2"]
+    assert future.result(timeout=5) is None
+    # 分发线程仍在工作
+    ingest_queue.put(_message("m3"))
+    assert dispatcher.drain(3) == ["blocker", "m2", "m3"]
+    assert cancelled.cancelled()
@@ -0,0 +1,195 @@
+"""
+QQRichText 的测试
+"""
+import copy
+import operator
+import pickle
+import random
+
+import pytest
+
+from murainbot.utils import QQRichText
+
+
+@pytest.mark.parametrize("segment", [
+    QQRichText.Segment({"type": "shake"}),
+    QQRichText.Segment({"type": "x", "extra": "e"}),
+    QQRichText.Segment({"type": "x", "data": {"a": "1"}, "extra": "e"}),
+    QQRichText.Text("hello"),
+    QQRichText.At(123),
+    QQRichText.Reply(1),
+], ids=repr)
+@pytest.mark.parametrize("clone", [
+    copy.copy,
+    copy.deepcopy,
+    lambda obj: pickle.loads(pickle.dumps(obj)),
+], ids=["copy", "deepcopy", "pickle"])
+def test_segment_clone_keeps_missing_keys(segment, clone):
+    cloned = clone(segment)
+    assert type(cloned) is type(segment)
+    assert cloned.seg_dict == segment.seg_dict
+    assert str(cloned) == str(segment)
+    assert QQRichText.array_2_cq(cloned.seg_dict) == QQRichText.array_2_cq(segment.seg_dict)
+
+
+def test_missing_sentinel_identity():
+    assert copy.deepcopy(QQRichText._MISSING) is QQRichText._MISSING
+    assert pickle.loads(pickle.dumps(QQRichText._MISSING)) is QQRichText._MISSING
+
+
+def test_rich_text_clone():
+    rich = QQRichText.QQRichText(QQRichText.Reply(1), QQRichText.Segment({"type": "shake"}), "hello")
+    for cloned in (copy.deepcopy(rich), pickle.loads(pickle.dumps(rich))):
+        assert cloned == rich
+        assert cloned.get_array() == rich.get_array()
+
+
+def test_generic_segment_converted():
+    rich = QQRichText.QQRichText(QQRichText.Segment({"type": "text", "data": {"text": " hi "}}),
+                                 QQRichText.Segment({"type": "at", "data": {"qq": "123"}}))
+    assert type(rich.rich_array[0]) is QQRichText.Text
+    assert type(rich.rich_array[1]) is QQRichText.At
+    assert str(rich.strip()) == "hi[CQ:at,qq=123]"
+
+
+def test_registered_segment_shared():
+    text = QQRichText.Text("hi")
+    unknown = QQRichText.Segment({"type": "unknown", "data": {"a": "1"}})
+    rich = QQRichText.QQRichText(text, unknown)
+    assert rich.rich_array[0] is text
+    assert rich.rich_array[1] is unknown
+    assert QQRichText.QQRichText(rich).rich_array[0] is text
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda seg: setattr(seg, "text", "changed"),
+    lambda seg: seg.set_data("text", "changed"),
+    lambda seg: operator.setitem(seg.data, "text", "changed"),
+    lambda seg: operator.setitem(seg.get("data"), "text", "changed"),
+    lambda seg: setattr(seg, "data", {"text": "changed"}),
+    lambda seg: operator.setitem(seg, "type", "at"),
+    lambda seg: operator.delitem(seg, "data"),
+], ids=["property", "set_data", "data", "get_data", "data_setter", "setitem", "delitem"])
+def test_segment_frozen_in_rich_text(mutate):
+    text = QQRichText.Text("hello")
+    mutate(QQRichText.Text("hello"))  # 未放入QQRichText的消息段可以修改
+
+    rich = QQRichText.QQRichText(text)
+    other = QQRichText.QQRichText(rich, "!")
+    assert text.frozen
+    with pytest.raises(TypeError):
+        mutate(text)
+    assert str(rich) == "hello"
+    assert str(other) == "hello!"
+
+
+def test_segment_frozen_by_add_and_strip():
+    at = QQRichText.At(123)
+    rich = QQRichText.QQRichText(" hi ").add(at)
+    assert at.frozen
+    assert all(segment.frozen for segment in rich.strip().rich_array)
+
+
+def test_segment_copy_is_mutable():
+    text = QQRichText.Text("hello")
+    rich = QQRichText.QQRichText(text)
+    copied = text.copy()
+    assert type(copied) is QQRichText.Text
+    assert not copied.frozen
+    copied.text = "changed"
+    assert str(copied) == "changed"
+    assert str(rich) == "hello"
+
+
+def test_frozen_segment_keeps_extra_data():
+    rich = QQRichText.QQRichText({"type": "text", "data": {"text": "hi", "extra": "1"}})
+    assert rich.rich_array[0].get_data("extra") == "1"
+    assert rich.get_array() == [{"type": "text", "data": {"text": "hi", "extra": "1"}}]
+
+
+CQ_2_ARRAY_CASES = [
+    "",
+    "只有文本",
+    "/help",
+    "[CQ:shake]",
+    "[CQ:reply,id=123456][CQ:at,qq=10001] 你好啊[CQ:face,id=178]今天吃什么",
+    "[CQ:image,file=https://example.com/1.png,url=https://a.com/b?c=1&amp;d=2]看看",
+    "[CQ:json,data={&#91;1&#93;&#44;2}]",
+    "&#91;不是CQ码&#93; &amp; 测试",
+    "[CQ:at,qq=123][CQ:at,qq=456]",
+]
+
+CQ_2_ARRAY_ERRORS = [
+    ("123[CQ:at,qq=123", "cq_2_array: 在字符串末尾，起始于字符 3 的 CQ 码未正确结束 (参数值 '123' 未结束)"),
+    ("[", "cq_2_array: 在字符串末尾，起始于字符 0 的 CQ 码未正确结束 (类型部分 '' 未完成)"),
+    ("[CQ:", "cq_2_array: 在字符串末尾，起始于字符 0 的 CQ 码未正确结束 (类型部分 'CQ:' 未完成)"),
+    ("[CQ:type,", "cq_2_array: 在字符串末尾，起始于字符 0 的 CQ 码未正确结束 (参数键 '' 未完成或缺少 '=')"),
+    ("[CQ:type,key", "cq_2_array: 在字符串末尾，起始于字符 0 的 CQ 码未正确结束 (参数键 'key' 未完成或缺少 '=')"),
+    ("[CQ:type,key=", "cq_2_array: 在字符串末尾，起始于字符 0 的 CQ 码未正确结束 (参数值 '' 未结束)"),
+    ("文本[CQ:face,id]", "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 13 (']') 附近: 在参数键 'id' 后期望 '='，但遇到 ']'"),
+    ("文本[CQ:,id=123]", "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 6 (',') 附近: CQ 码类型不能为空"),
+    ("文本[NotCQ:face,id=123]",
+     "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 13 (',') 附近: 期望 'CQ:' 前缀，但得到 'NotCQ:face'"),
+    ("文本[CQ:face,id=123,id=456]", "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 20 ('=') 附近: CQ 码参数键 'id' 重复"),
+    ("文本[CQ:face,,id=123]", "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 11 (',') 附近: 在参数键 '' 后期望 '='，但遇到 ','"),
+    ("文本[CQ:fa[ce,id=123]",
+     "cq_2_array: 在起始于字符 2 的 CQ 码中，在字符 8 ('[') 附近: CQ 码类型 'CQ:fa' 中包含非法字符 '['"),
+    ("文本[CQ:face,key=val]ue]", "cq_2_array: 在字符 21 (']') 附近: 文本块中包含非法字符: ']'"),
+]
+
+
+def _parse(func, cq: str):
+    """
+    调用解析函数，返回结果或异常的类型与信息
+    """
+    try:
+        return "ok", func(cq)
+    except Exception as e:
+        return type(e).__name__, str(e)
+
+
+@pytest.mark.parametrize("cq", CQ_2_ARRAY_CASES)
+def test_cq_2_array_parity(cq):
+    expected = QQRichText._cq_2_array_by_char(cq)
+    assert QQRichText._cq_2_array_fast(cq) == expected
+    assert QQRichText.cq_2_array(cq) == expected
+
+
+@pytest.mark.parametrize("cq, message", CQ_2_ARRAY_ERRORS)
+def test_cq_2_array_errors(cq, message):
+    assert _parse(QQRichText._cq_2_array_by_char, cq) == ("ValueError", message)
+    assert _parse(QQRichText.cq_2_array, cq) == ("ValueError", message)
+    # 按块扫描只负责发现错误，详细的错误信息由逐字符解析给出
+    assert _parse(QQRichText._cq_2_array_fast, cq)[0] == "ValueError"
+
+
+def test_cq_2_array_random():
+    rng = random.Random(5)
+    alphabet = list("ab ,=[]&;#:CQ你") + ["CQ:", "[CQ:", "[CQ:at,qq=1]", "&#91;", "&#93;", "&#44;", "&amp;"]
+    for _ in range(5000):
+        cq = "".join(rng.choices(alphabet, k=rng.randint(0, 25)))
+        expected = _parse(QQRichText._cq_2_array_by_char, cq)
+        assert _parse(QQRichText.cq_2_array, cq) == expected, cq
+        if expected[0] == "ok":
+            assert _parse(QQRichText._cq_2_array_fast, cq) == expected, cq
+        else:
+            assert _parse(QQRichText._cq_2_array_fast, cq)[0] == "ValueError", cq
+
+
+def test_plugin_segment_setters():
+    segments = pytest.importorskip("plugins.LagrangeExtension.Segments")
+    face = segments.MFace(1, 2, "key", "summary")
+    file = segments.File("a.txt", "id", 123, "https://example.com/a.txt")
+    face.summary = "changed"  # 未放入QQRichText的消息段可以修改
+
+    rich = QQRichText.QQRichText(face, file)
+    with pytest.raises(TypeError, match="已被冻结"):
+        face.summary = "again"
+    with pytest.raises(TypeError, match="已被冻结"):
+        file.url = "https://example.com/b.txt"
+
+    copied = rich[1].copy()
+    copied.url = "https://example.com/b.txt"
+    assert copied.url == "https://example.com/b.txt"
+    assert rich[1].url == "https://example.com/a.txt"
+    assert rich[0].summary == "changed"
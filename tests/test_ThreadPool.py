@@ -0,0 +1,103 @@
+"""
+ThreadPool 的测试
+"""
+import collections
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from murainbot.core import ThreadPool
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """
+    使用临时的线程池，测试结束后关闭
+    """
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(ThreadPool, "thread_pool", executor)
+    yield executor
+    executor.shutdown()
+
+
+def test_keyed_executor_order(thread_pool):
+    executor = ThreadPool.KeyedExecutor()
+    rng = random.Random(9)
+    lock = threading.Lock()
+    results = collections.defaultdict(list)
+    running = collections.Counter()
+    overlapped = []
+
+    def task(key, index, delay):
+        with lock:
+            running[key] += 1
+            if running[key] > 1:
+                overlapped.append(key)
+        time.sleep(delay)
+        with lock:
+            running[key] -= 1
+            results[key].append(index)
+        return key, index
+
+    futures = []
+    for index in range(30):
+        for key in ("a", "b", "c"):
+            futures.append(executor.submit(key, task, key, index, rng.random() / 1000))
+    assert [future.result(timeout=10) for future in futures] == [
+        (key, index) for index in range(30) for key in ("a", "b", "c")
+    ]
+    # 同一key的任务按提交顺序依次执行，不会同时执行
+    assert results == {key: list(range(30)) for key in ("a", "b", "c")}
+    assert not overlapped
+    assert not executor._queues
+
+
+def test_keyed_executor_runs_keys_in_parallel(thread_pool):
+    executor = ThreadPool.KeyedExecutor()
+    started = threading.Event()
+
+    first = executor.submit("a", lambda: started.wait(timeout=5))
+    second = executor.submit("b", started.set)
+    # 若不同key的任务也被串行执行，第一个任务会一直等到超时
+    assert first.result(timeout=10) is True
+    assert second.result(timeout=10) is None
+
+
+def test_keyed_executor_exception_and_cancel(thread_pool):
+    executor = ThreadPool.KeyedExecutor()
+    gate = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    blocker = executor.submit("a", gate.wait, 5)
+    failed = executor.submit("a", fail)
+    cancelled = executor.submit("a", lambda: "never")
+    after = executor.submit("a", lambda: "after")
+    assert cancelled.cancel()
+    gate.set()
+
+    assert blocker.result(timeout=10) is True
+    # 任务中的异常会被记录，结果为None，不影响同一key之后的任务
+    assert failed.result(timeout=10) is None
+    assert after.result(timeout=10) == "after"
+    assert cancelled.cancelled()
+
+
+def test_keyed_async_task(thread_pool):
+    order = []
+
+    @ThreadPool.keyed_async_task(key=lambda event: event.get("group_id"))
+    def handle(event):
+        time.sleep(random.random() / 1000)
+        order.append(event["id"])
+        return event["id"]
+
+    futures = [handle({"group_id": 1, "id": index}) for index in range(20)]
+    assert [future.result(timeout=10) for future in futures] == list(range(20))
+    assert order == list(range(20))
+    # key为None时直接提交到线程池
+    assert handle({"id": "no key"}).result(timeout=10) == "no key"
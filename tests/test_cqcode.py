@@ -0,0 +1,182 @@
+"""
+CQ码C扩展（murainbot.utils._cqcode）与纯Python实现的一致性测试
+未编译C扩展时跳过（编译方法见setup.py）
+"""
+import random
+
+import pytest
+
+from murainbot.utils import QQRichText
+
+_cqcode = pytest.importorskip("murainbot.utils._cqcode")
+
+ALPHABET = list("ab ,=[]&;#:CQ") + ["é", "你", "😀", "&amp;", "&#91;", "&#93;", "&#44;", "#91;", "#44;", "amp;",
+                                    "[CQ:", "CQ:", "[CQ:at,qq=1]"]
+
+
+def _random_text(rng: random.Random, max_length: int = 25) -> str:
+    return "".join(rng.choices(ALPHABET, k=rng.randint(0, max_length)))
+
+
+def _run(func, *args):
+    """
+    调用函数，返回结果或异常的类型与信息
+    """
+    try:
+        return "ok", func(*args)
+    except Exception as e:
+        return type(e).__name__, str(e)
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    """
+    返回一个在禁用C扩展的情况下调用函数的函数
+    """
+
+    def call(func, *args):
+        with monkeypatch.context() as m:
+            m.setattr(QQRichText, "_cqcode", None)
+            return _run(func, *args)
+
+    return call
+
+
+CODEC_CASES = [
+    "",
+    "plain text",
+    "&",
+    "&amp;",
+    "&amp;amp;",
+    "&amp;#91;",
+    "&amp;#44;",
+    "&#91;&#93;&#44;",
+    "&#91",
+    "&#9",
+    "a[b]c,d&e",
+    "[CQ:at,qq=1]",
+    "中文&#91;测试&#93;",
+    "😀[😀]&amp;😀",
+    "é" * 10 + "&#44;",
+]
+
+
+@pytest.mark.parametrize("text", CODEC_CASES)
+@pytest.mark.parametrize("in_cq", [False, True])
+@pytest.mark.parametrize("name", ["cq_encode", "cq_decode"])
+def test_codec_cases(pure_python, name, text, in_cq):
+    func = getattr(QQRichText, name)
+    assert _run(func, text, in_cq) == pure_python(func, text, in_cq)
+    assert _run(getattr(_cqcode, name), text, in_cq) == pure_python(func, text, in_cq)
+
+
+def test_codec_converts_non_str(pure_python):
+    for value in (123, 1.5, None, True):
+        assert _run(QQRichText.cq_encode, value) == pure_python(QQRichText.cq_encode, value)
+        assert _run(QQRichText.cq_decode, value) == pure_python(QQRichText.cq_decode, value)
+
+
+def test_codec_random(pure_python):
+    rng = random.Random(6)
+    for _ in range(3000):
+        text = _random_text(rng)
+        for in_cq in (False, True):
+            for func in (QQRichText.cq_encode, QQRichText.cq_decode):
+                assert _run(func, text, in_cq) == pure_python(func, text, in_cq), (func.__name__, text, in_cq)
+
+
+CQ_2_ARRAY_CASES = [
+    "",
+    "只有文本",
+    "你好[CQ:face,id=123]世界[CQ:image,file=abc.jpg,url=https://a.com/b?c=1&amp;d=2]",
+    "[CQ:shake]",
+    "[CQ:at,qq=123][CQ:at,qq=456]",
+    "[CQ:json,data={&#91;1&#93;&#44;2}]",
+    "&#91;不是CQ码&#93;",
+    # 格式错误
+    "文本[CQ:face,id=123",
+    "文本[CQ:face,id]",
+    "文本[CQ:,id=123]",
+    "文本[NotCQ:face,id=123]",
+    "文本[CQ:face,id=123,id=456]",
+    "文本[CQ:face,,id=123]",
+    "文本[CQ:fa[ce,id=123]",
+    "文本[CQ:face,key=val]ue]",
+    "[",
+    "[CQ:",
+    "[CQ:type,key=value",
+]
+
+
+@pytest.mark.parametrize("cq", CQ_2_ARRAY_CASES)
+def test_cq_2_array_cases(pure_python, cq):
+    assert _run(QQRichText.cq_2_array, cq) == pure_python(QQRichText.cq_2_array, cq)
+
+    expected = pure_python(QQRichText.cq_2_array, cq)
+    result = _run(_cqcode.cq_2_array, cq)
+    if expected[0] == "ok":
+        assert result == expected
+    else:
+        # C扩展只抛出不含位置信息的ValueError，由调用方重新解析得到详细的错误信息
+        assert result[0] == "ValueError"
+
+
+def test_cq_2_array_random(pure_python):
+    rng = random.Random(7)
+    for _ in range(3000):
+        cq = _random_text(rng)
+        assert _run(QQRichText.cq_2_array, cq) == pure_python(QQRichText.cq_2_array, cq), cq
+
+
+class _DictSubclass(dict):
+    pass
+
+
+def _random_value(rng: random.Random):
+    return rng.choice([_random_text(rng, 8), _random_text(rng, 8), rng.randint(-5, 10 ** 20), 1.5, True, False,
+                       None, [1], object, b"x"])
+
+
+def _random_segment(rng: random.Random):
+    r = rng.random()
+    if r < 0.4:
+        return {"type": "text", "data": {"text": _random_text(rng, 15)}}
+    if r < 0.8:
+        data = {rng.choice(["id", "qq", "file", "u,rl", "k[", "&"]): _random_value(rng) for _ in range(rng.randint(0, 3))}
+        return {"type": rng.choice(["at", "image", "face", "x,y", "é"]), "data": data}
+    # 格式错误或不常见的输入
+    return rng.choice([
+        {"type": 1}, {"data": {}}, {"type": "text", "data": None}, {"type": "text", "data": {"text": 1}},
+        {"type": "at", "data": None}, {"type": "at", "data": [1]}, {"type": "at", "data": {1: "a"}},
+        _DictSubclass(type="at", data={}), {"type": "at", "data": _DictSubclass(qq="1")}, "notadict", {"type": "text"}
+    ])
+
+
+def test_array_2_cq_random(pure_python):
+    rng = random.Random(8)
+    for _ in range(3000):
+        array = [_random_segment(rng) for _ in range(rng.randint(0, 5))]
+        array = rng.choice([array, tuple(array), array[0] if array else {}, "str", None])
+        expected = pure_python(QQRichText.array_2_cq, array)
+        assert _run(QQRichText.array_2_cq, array) == expected, array
+
+        # C扩展遇到不常见的输入时返回None，否则结果必须与Python实现一致
+        result = _run(_cqcode.array_2_cq, array)
+        assert result == ("ok", None) or result == expected, array
+
+
+@pytest.mark.parametrize("array, message", [
+    ([{"type": 1}], "array_2_cq: 消息段缺少有效的 'type'"),
+    ([{"type": "text", "data": None}], "array_2_cq: 'text' 类型的消息段缺少有效的 'data' 字典"),
+    ([{"type": "text", "data": {"text": 1}}], "array_2_cq: 'text' 类型的消息段 'data' 字典缺少有效的 'text' 字符串"),
+    ([{"type": "at", "data": {1: "a"}}], "array_2_cq: 'at' 类型的消息段 'data' 字典的键 '1' 不是字符串"),
+])
+def test_array_2_cq_errors(pure_python, array, message):
+    kind, text = _run(QQRichText.array_2_cq, array)
+    assert kind == "ValueError" and text.startswith(message)
+    assert (kind, text) == pure_python(QQRichText.array_2_cq, array)
+
+
+def test_array_2_cq_type_error(pure_python):
+    assert _run(QQRichText.array_2_cq, "str")[0] == "TypeError"
+    assert _run(QQRichText.array_2_cq, "str") == pure_python(QQRichText.array_2_cq, "str")